@@ -0,0 +1,1030 @@
+import asyncio
+import functools
+import gzip
+import ipaddress
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Optional
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from benchmark.config import CSV_PATH, PLOT_PATH, INCREMENTAL_SIZES
+from benchmark.runner import Measurement, measure, register_experiment
+from benchmark.util import levenshtein_distance, misspell, synthetic_routes, zipf_queries
+from trie import DurableTrie, PrefixTrie, PatriciaTrie, RoutingTable, ShardedTrie, SuffixIndex, load
+from trie.children import CHILD_MAPS
+from trie.ingest import read_keys
+from trie.server import TrieClient, TrieServer
+
+
+def experiment_with_trie(trie_class, words, prefixes_for_range_search, warmup: int = 1, repeat: int = 5):
+	"""
+	Run an experiment with a given trie implementation.
+	Every operation is timed over repeated runs after a warmup, on a fresh trie whenever it mutates one,
+	and its peak memory is measured in a separate run (see benchmark.runner.measure).
+	:param trie_class: Trie class to use (PrefixTrie or PatriciaTrie).
+	:param words: List of words to use.
+	:param prefixes_for_range_search: List of prefixes to use for range search.
+	:param warmup: Number of untimed runs of every operation.
+	:param repeat: Number of timed runs of every operation.
+	:return: List of measurements of insertion, bulk insertion, search, range search, first page of a range search
+		and deletion.
+	"""
+	def build():
+		trie = trie_class()
+		for word in words:
+			trie.insert(word)
+		return trie
+
+	trie = build()  # shared by the read-only operations
+	run = functools.partial(measure, warmup=warmup, repeat=repeat, Trie=trie_class.__name__, Size=len(words))
+	return [
+		# Experiment 1: Insertion
+		run("Insertion", lambda empty: [empty.insert(word) for word in words], trie_class),
+		# Experiment 1b: Bulk insertion (including sorting the words)
+		run("Bulk_insertion", lambda _: trie_class.from_sorted(words, presorted=False)),
+		# Experiment 2: Search
+		run("Search", lambda t: [t.search(word) for word in words], lambda: trie),
+		# Experiment 3: Range search
+		run(
+			"Range_search", lambda t: [t.range_search(prefix) for prefix in prefixes_for_range_search],
+			lambda: trie
+		),
+		# Experiment 4: First page (10 strings) of an ordered, lazy range search
+		run(
+			"First_page", lambda t: [list(t.iter_prefix(prefix, limit=10)) for prefix in prefixes_for_range_search],
+			lambda: trie
+		),
+		# Experiment 5: Deletion
+		run("Deletion", lambda full: [full.remove(word) for word in words], build),
+	]
+
+
+def footprint_of_trie(trie_class, child_map, words):
+	"""
+	Build a trie with the given child map representation and measure its steady-state footprint and shape.
+	:param trie_class: Trie class to use (PrefixTrie or PatriciaTrie).
+	:param child_map: Name of the child map representation, or "frozen" for the frozen copy of the trie.
+	:param words: List of words to insert.
+	:return: Dictionary with the total size in bytes, the size per key, the number of nodes
+		and the average depth of the keys.
+	"""
+	trie = trie_class(child_map if child_map != "frozen" else "sorted")
+	for word in words:
+		trie.insert(word)
+	stats = trie.stats()
+	size, nodes = stats["bytes"], stats["nodes"]
+	if child_map == "frozen":
+		frozen = trie.freeze()
+		size, nodes = sys.getsizeof(frozen), frozen.node_count
+	return {
+		"Bytes": size,
+		"Bytes_per_key": size / len(words) if words else 0.0,
+		"Nodes": nodes,
+		"Average_depth": stats["average_depth"],
+	}
+
+
+def lookup_time(mapping_class, words, warmup: int = 1, repeat: int = 5) -> Measurement:
+	"""
+	Measure the time of point lookups of every word in a mapping built from the words.
+	:param mapping_class: Mapping class to use (PrefixTrie, PatriciaTrie or dict).
+	:param words: List of words to use as keys.
+	:param warmup: Number of untimed runs.
+	:param repeat: Number of timed runs.
+	:return: Measurement of the total lookup time.
+	"""
+	mapping = mapping_class()
+	for i, word in enumerate(words):
+		mapping[word] = i
+
+	def lookup(m):
+		for word in words:
+			_ = m[word]
+
+	return measure(
+		"Lookup", lookup, lambda: mapping, warmup, repeat, memory=False, Trie=mapping_class.__name__, Size=len(words)
+	)
+
+
+class Length(Enum):
+	"""
+	Enum class for different sizes of the dataset.
+	"""
+	ALL = ""
+	SHORT = "-short"
+	MEDIUM = "-medium"
+	LONG = "-long"
+
+
+@register_experiment("base")
+def run_base_experiments(words, prefixes_for_range_search):
+	"""
+	Measure insertion, bulk insertion, search, range search, the first page of a range search and deletion
+	of both tries over incremental dataset sizes.
+	Save the results to a CSV file and plot the performance.
+	:param words: List of words to use.
+	:param prefixes_for_range_search: List of prefixes to use for range search.
+	:return: Pandas DataFrame containing the experiment results.
+	"""
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			measurements = experiment_with_trie(trie_class, subset_words, prefixes_for_range_search)
+			results += [measurement.summary() for measurement in measurements]
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "experiment_results.csv")
+	plot_results(results_df)
+	return results_df
+
+
+@register_experiment("footprint", ("words",))
+def run_footprint_experiments(words):
+	"""
+	Report the bytes per key of every child map representation over incremental dataset sizes.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use.
+	:return: Pandas DataFrame containing the footprint results.
+	"""
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			for child_map in CHILD_MAPS:
+				metrics = footprint_of_trie(trie_class, child_map, subset_words)
+				results.append({"Trie": trie_class.__name__, "Child_map": child_map, "Size": size, **metrics})
+			metrics = footprint_of_trie(trie_class, "frozen", subset_words)
+			results.append({"Trie": trie_class.__name__, "Child_map": "frozen", "Size": size, **metrics})
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "footprint_results.csv")
+
+	summary = results_df[results_df["Size"] == results_df["Size"].max()]
+	for _, row in summary.iterrows():
+		print(f"{row['Trie']:>12} {row['Child_map']:>8}: {row['Bytes_per_key']:8.1f} bytes per key")
+
+	plot_footprint(results_df)
+	plot_structure(results_df[results_df["Child_map"] == "sorted"])
+	return results_df
+
+
+@register_experiment("lookup", ("words",))
+def run_lookup_experiments(words, warmup: int = 1, repeat: int = 5):
+	"""
+	Compare point lookups (mapping[key]) of both tries against the built-in dictionary.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the lookup results.
+	"""
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		for mapping_class in [PrefixTrie, PatriciaTrie, dict]:
+			results.append(lookup_time(mapping_class, subset_words, warmup, repeat).summary())
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "lookup_results.csv")
+	plot_time_comparison(results_df, "Lookup")
+	return results_df
+
+
+@register_experiment("count_prefix")
+def run_count_prefix_experiments(words, prefixes_for_range_search, warmup: int = 1, repeat: int = 5):
+	"""
+	Compare counting the words with every prefix using the cached subtree counts (count_prefix)
+	against materializing a range search and taking its length.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use.
+	:param prefixes_for_range_search: List of prefixes to count.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the prefix count results.
+	"""
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			trie = trie_class()
+			for word in subset_words:
+				trie.insert(word)
+			run = functools.partial(measure, "Count_prefix", setup=lambda: trie, warmup=warmup, repeat=repeat, memory=False)
+			measurements = [
+				run(
+					lambda t: [len(t.range_search(prefix)) for prefix in prefixes_for_range_search],
+					Trie=f"{trie_class.__name__} (len of range_search)", Size=size
+				),
+				run(
+					lambda t: [t.count_prefix(prefix) for prefix in prefixes_for_range_search],
+					Trie=f"{trie_class.__name__} (count_prefix)", Size=size
+				),
+			]
+			results += [measurement.summary() for measurement in measurements]
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "count_prefix_results.csv")
+	plot_time_comparison(results_df, "Count_prefix")
+	return results_df
+
+
+@register_experiment("batch_lookup", ("words",))
+def run_batch_lookup_experiments(words, warmup: int = 1, repeat: int = 5):
+	"""
+	Compare one batch lookup (contains_many) of all words in a frozen trie against single lookups of every word.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the batch lookup results.
+	"""
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			trie = trie_class()
+			for word in subset_words:
+				trie.insert(word)
+			frozen = trie.freeze()
+			frozen.contains_many(subset_words[:1])  # build the batch arrays outside of the measurement
+
+			run = functools.partial(measure, "Batch_lookup", warmup=warmup, repeat=repeat, memory=False, Size=size)
+			measurements = [
+				run(lambda t: [t.search(word) for word in subset_words], lambda: trie, Trie=trie_class.__name__),
+				run(
+					lambda f: f.contains_many(subset_words), lambda: frozen,
+					Trie=f"{trie_class.__name__} (frozen, contains_many)"
+				),
+			]
+			results += [measurement.summary() for measurement in measurements]
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "batch_lookup_results.csv")
+	plot_time_comparison(results_df, "Batch_lookup")
+	return results_df
+
+
+@register_experiment("top_k")
+def run_top_k_experiments(words, prefixes_for_range_search, k: int = 10, warmup: int = 1, repeat: int = 5):
+	"""
+	Compare a top-k query of a weighted trie against a range search followed by sorting by weight.
+	The words are weighted by their frequency rank, since the dataset is ordered from the most frequent word.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use, from the most to the least frequent.
+	:param prefixes_for_range_search: List of prefixes to query.
+	:param k: Number of completions per prefix.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the top-k results.
+	"""
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		weights = {word: size - rank for rank, word in enumerate(subset_words)}
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			trie = trie_class(weighted=True)
+			for word, weight in weights.items():
+				trie.insert(word, weight=weight)
+
+			run = functools.partial(measure, "Top_k", setup=lambda: trie, warmup=warmup, repeat=repeat, memory=False)
+			measurements = [
+				run(lambda t: [t.top_k(prefix, k) for prefix in prefixes_for_range_search], Trie=trie_class.__name__, Size=size),
+				run(
+					lambda t: [
+						sorted(t.range_search(prefix), key=lambda word: (-weights[word], word))[:k]
+						for prefix in prefixes_for_range_search
+					],
+					Trie=f"{trie_class.__name__} (range search + sort)", Size=size
+				),
+			]
+			results += [measurement.summary() for measurement in measurements]
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "top_k_results.csv")
+	plot_time_comparison(results_df, "Top_k")
+	return results_df
+
+
+@register_experiment("fuzzy", ("words",))
+def run_fuzzy_experiments(
+		words, num_queries: int = 20, distances: tuple[int, ...] = (1, 2), warmup: int = 0, repeat: int = 3
+):
+	"""
+	Compare the throughput of fuzzy searches in both tries against a brute-force scan of the word list,
+	which computes the edit distance of the query to every word.
+	The queries are misspelled words of the dataset.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use.
+	:param num_queries: Number of queries per dataset size.
+	:param distances: Maximum edit distances to compare.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement; the brute-force scans take seconds each.
+	:return: Pandas DataFrame containing the fuzzy search results.
+	"""
+	rng = random.Random(42)
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		queries = [misspell(rng.choice(subset_words), rng) for _ in range(num_queries)]
+		tries = {}
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			tries[trie_class.__name__] = trie_class()
+			for word in subset_words:
+				tries[trie_class.__name__].insert(word)
+
+		for distance in distances:
+			run = functools.partial(
+				measure, f"Fuzzy_search_{distance}", warmup=warmup, repeat=repeat, memory=False, Size=size
+			)
+			measurements = [
+				run(lambda t: [t.fuzzy_search(query, distance) for query in queries], lambda: trie, Trie=name)
+				for name, trie in tries.items()
+			]
+			measurements.append(run(
+				lambda _: [
+					[word for word in subset_words if levenshtein_distance(query, word) <= distance] for query in queries
+				],
+				Trie="Brute force"
+			))
+			for measurement in measurements:
+				results.append({**measurement.summary(), "Queries_per_second": num_queries / measurement.median})
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "fuzzy_results.csv")
+	for distance in distances:
+		operation = f"Fuzzy_search_{distance}"
+		plot_time_comparison(results_df[results_df["Operation"] == operation], operation)
+		summary = results_df[(results_df["Operation"] == operation) & (results_df["Size"] == results_df["Size"].max())]
+		for _, row in summary.iterrows():
+			print(f"{operation}: {row['Trie']:>12}: {row['Queries_per_second']:10.1f} queries per second")
+	return results_df
+
+
+@register_experiment("substring")
+def run_substring_experiments(words, substrings, warmup: int = 1, repeat: int = 5):
+	"""
+	Compare substring searches in a suffix index against scanning the word list with the in operator.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use.
+	:param substrings: List of substrings to search for.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the substring search results.
+	"""
+	results = []
+	for size in INCREMENTAL_SIZES:
+		subset_words = words[:size]
+		index = SuffixIndex(subset_words)
+		run = functools.partial(measure, warmup=warmup, repeat=repeat, memory=False, Size=size)
+		measurements = [
+			run(
+				"Substring_search", lambda i: [i.substring_search(substring) for substring in substrings], lambda: index,
+				Trie="SuffixIndex"
+			),
+			run(
+				"Substring_search",
+				lambda _: [{word for word in subset_words if substring in word} for substring in substrings], Trie="Scan"
+			),
+			run("Suffix_index_build", lambda _: SuffixIndex(subset_words), Trie="SuffixIndex"),
+		]
+		results += [measurement.summary() for measurement in measurements]
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "substring_results.csv")
+	plot_time_comparison(results_df[results_df["Operation"] == "Substring_search"], "Substring_search")
+	return results_df
+
+
+@register_experiment("routing", ())
+def run_routing_experiments(
+		route_counts: tuple[int, ...] = (50_000, 100_000, 200_000, 300_000), num_lookups: int = 100_000,
+		warmup: int = 1, repeat: int = 5
+):
+	"""
+	Measure longest-prefix match lookups per second of a routing table over synthetic IPv4 and IPv6 routes,
+	against the classic alternative of probing a dictionary of networks from the longest prefix length down.
+	Save the results to a CSV file.
+	:param route_counts: Numbers of routes to load.
+	:param num_lookups: Number of random addresses to route.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the routing results.
+	"""
+	rng = random.Random(0)
+	results = []
+	for count in route_counts:
+		routes = synthetic_routes(count, rng)
+		table = RoutingTable((route, i) for i, route in enumerate(routes))
+
+		networks = {}
+		for i, route in enumerate(routes):
+			network = ipaddress.ip_network(route)
+			host_bits = network.max_prefixlen - network.prefixlen
+			networks[network.version, network.prefixlen, int(network.network_address) >> host_bits] = i
+		prefix_lengths = {
+			version: sorted({prefix_length for v, prefix_length, _ in networks if v == version}, reverse=True)
+			for version in (4, 6)
+		}
+		# Route addresses inside the loaded networks, so that most lookups find a long match
+		addresses = []
+		for route in rng.sample(routes, min(num_lookups, len(routes))):
+			network = ipaddress.ip_network(route)
+			addresses.append(network.network_address + rng.randrange(network.num_addresses))
+
+		def route_with_dict(_) -> list:
+			hops = []
+			for address in addresses:
+				version, value, max_prefix_length = address.version, int(address), address.max_prefixlen
+				hop = None
+				for prefix_length in prefix_lengths[version]:
+					hop = networks.get((version, prefix_length, value >> (max_prefix_length - prefix_length)))
+					if hop is not None:
+						break
+				hops.append(hop)
+			return hops
+
+		assert [table.lookup(address) for address in addresses] == route_with_dict(None)
+
+		run = functools.partial(measure, warmup=warmup, repeat=repeat, memory=False, Routes=count)
+		lookups = [
+			run(
+				"Longest_prefix_match", lambda t: [t.lookup(address) for address in addresses], lambda: table,
+				Trie="RoutingTable"
+			),
+			run("Longest_prefix_match", route_with_dict, Trie="dict per prefix length"),
+		]
+		for measurement in lookups:
+			results.append({**measurement.summary(), "Lookups_per_second": len(addresses) / measurement.median})
+		build = run(
+			"Route_table_build", lambda _: RoutingTable((route, i) for i, route in enumerate(routes)), Trie="RoutingTable"
+		)
+		results.append(build.summary())
+		print(
+			f"{count} routes: {len(addresses) / lookups[0].median:,.0f} lookups/s "
+			f"(dict: {len(addresses) / lookups[1].median:,.0f})"
+		)
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "routing_results.csv")
+	return results_df
+
+
+@register_experiment("sharding", ("words",))
+def run_sharding_experiments(
+		words, replication: int = 100, shard_counts: Optional[tuple[int, ...]] = None, batch_size: int = 100_000,
+		warmup: int = 0, repeat: int = 3
+):
+	"""
+	Measure the insertion and lookup throughput of a sharded trie from 1 to N worker processes,
+	against a single PatriciaTrie in the current process.
+	The word list is replicated into millions of distinct keys by appending a number to every word.
+	Every insertion run starts from an empty trie, with fresh worker processes for the sharded one.
+	Save the results to a CSV file.
+	:param words: List of words to use.
+	:param replication: Number of keys made from every word.
+	:param shard_counts: Numbers of shards to measure, None for powers of two up to the number of CPUs.
+	:param batch_size: Number of keys sent to the shards in one batch.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement; every run handles millions of keys.
+	:return: Pandas DataFrame containing the sharding results.
+	"""
+	keys = [f"{word}{i}" for i in range(replication) for word in words]
+	random.Random(0).shuffle(keys)
+	batches = [keys[i: i + batch_size] for i in range(0, len(keys), batch_size)]
+	if shard_counts is None:
+		cpus = os.cpu_count() or 1
+		shard_counts = tuple(sorted({2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus} | {cpus}))
+
+	def insert_all(trie):
+		for key in keys:
+			trie.insert(key)
+
+	def insert_batches(sharded_trie):
+		for batch in batches:
+			sharded_trie.insert_many(batch)
+		sharded_trie.close()
+
+	run = functools.partial(measure, warmup=warmup, repeat=repeat, memory=False)
+	measurements = [run("Insert_many", insert_all, PatriciaTrie, Trie="PatriciaTrie", Shards=0)]
+	trie = PatriciaTrie()
+	insert_all(trie)
+	measurements.append(run(
+		"Contains_many", lambda t: [key in t for key in keys], lambda: trie, Trie="PatriciaTrie", Shards=0
+	))
+	del trie
+
+	for num_shards in shard_counts:
+		boundaries = ShardedTrie.split_points(keys, num_shards)  # balanced ranges of the first letters
+		num_shards = len(boundaries) + 1  # fewer if there are fewer distinct first letters
+		measurements.append(run(
+			"Insert_many", insert_batches, functools.partial(ShardedTrie, boundaries=boundaries),
+			Trie="ShardedTrie", Shards=num_shards
+		))
+		with ShardedTrie(boundaries=boundaries) as sharded_trie:
+			for batch in batches:
+				sharded_trie.insert_many(batch)
+			measurements.append(run(
+				"Contains_many", lambda t: [t.contains_many(batch) for batch in batches], lambda: sharded_trie,
+				Trie="ShardedTrie", Shards=num_shards
+			))
+
+	results_df = pd.DataFrame([measurement.summary() for measurement in measurements])
+	results_df["Keys_per_second"] = len(keys) / results_df["Time"]
+	save_results(results_df, "sharding_results.csv")
+	print(results_df.to_string(index=False))
+	return results_df
+
+
+@register_experiment("server")
+def run_server_experiments(
+		words, prefixes_for_range_search, concurrencies: tuple[int, ...] = (1, 8, 32, 128),
+		requests_per_client: int = 200, max_batches: tuple[int, ...] = (1, 256)
+):
+	"""
+	Measure the request latency of a trie server under an increasing number of concurrent clients,
+	each sending a mix of searches (90%), range searches (5%) and inserts (5%) one after the other.
+	Save the results to a CSV file.
+	:param words: List of words to use.
+	:param prefixes_for_range_search: List of prefixes for the range searches.
+	:param concurrencies: Numbers of concurrent clients.
+	:param requests_per_client: Number of requests sent by every client.
+	:param max_batches: Maximum batch sizes of the server to compare; 1 disables batching.
+	:return: Pandas DataFrame containing the latency results.
+	"""
+
+	async def run_client(client: TrieClient, rng: random.Random, latencies: list[float]):
+		for _ in range(requests_per_client):
+			kind = rng.random()
+			start = time.perf_counter()
+			if kind < 0.9:
+				await client.search(rng.choice(words))
+			elif kind < 0.95:
+				await client.range_search(rng.choice(prefixes_for_range_search), limit=10)
+			else:
+				await client.insert(rng.choice(words) + "s")
+			latencies.append(time.perf_counter() - start)
+
+	async def run_load(max_batch: int, concurrency: int) -> tuple[list[float], float]:
+		trie = PatriciaTrie()
+		for word in words:
+			trie.insert(word)
+		async with TrieServer(trie, max_batch=max_batch) as server:
+			host, port = await server.start_tcp()
+			clients = [await TrieClient.connect(host, port) for _ in range(concurrency)]
+			latencies = []
+			start = time.perf_counter()
+			await asyncio.gather(*(
+				run_client(client, random.Random(i), latencies) for i, client in enumerate(clients)
+			))
+			elapsed = time.perf_counter() - start
+			for client in clients:
+				await client.close()
+		return latencies, elapsed
+
+	results = []
+	for max_batch in max_batches:
+		for concurrency in concurrencies:
+			latencies, elapsed = asyncio.run(run_load(max_batch, concurrency))
+			p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+			results.append({
+				"Trie": f"TrieServer (max_batch={max_batch})",
+				"Clients": concurrency,
+				"Operation": "Server_request",
+				"P50_ms": p50,
+				"P99_ms": p99,
+				"Requests_per_second": len(latencies) / elapsed,
+			})
+			print(
+				f"max_batch={max_batch}, {concurrency} clients: p50 {p50:.2f} ms, p99 {p99:.2f} ms, "
+				f"{len(latencies) / elapsed:,.0f} requests/s"
+			)
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "server_results.csv")
+	return results_df
+
+
+@register_experiment("persistence")
+def run_persistence_experiments(words, prefixes_for_range_search, warmup: int = 1, repeat: int = 5):
+	"""
+	Compare rebuilding a Patricia trie from the word list against loading it from a saved file,
+	and range searches on the loaded (memory-mapped) trie against the original one.
+	Save the results to a CSV file and plot them.
+	:param words: List of words to use.
+	:param prefixes_for_range_search: List of prefixes to query.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the persistence results.
+	"""
+	def rebuild(subset_words):
+		trie = PatriciaTrie()
+		for word in subset_words:
+			trie.insert(word)
+		return trie
+
+	def range_search(trie):
+		for prefix in prefixes_for_range_search:
+			trie.range_search(prefix)
+
+	results = []
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, "trie.bin")
+		for size in INCREMENTAL_SIZES:
+			subset_words = words[:size]
+			trie = rebuild(subset_words)
+			trie.save(path)
+			frozen = load(path)
+
+			run = functools.partial(measure, warmup=warmup, repeat=repeat, memory=False, Size=size)
+			measurements = [
+				run("Load", lambda _: rebuild(subset_words), Trie="PatriciaTrie (rebuild)"),
+				run("Load", lambda _: load(path).close(), Trie="FrozenPatriciaTrie (mmap)"),
+				run("Range_search", range_search, lambda: trie, Trie="PatriciaTrie"),
+				run("Range_search", range_search, lambda: frozen, Trie="FrozenPatriciaTrie (mmap)"),
+			]
+			frozen.close()
+			results += [measurement.summary() for measurement in measurements]
+			print(f"{size:>8} words: {os.path.getsize(path) / len(subset_words):6.1f} bytes per key on disk")
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "persistence_results.csv")
+	plot_time_comparison(results_df[results_df["Operation"] == "Load"], "Load")
+	return results_df
+
+
+@register_experiment("wal", ("words",))
+def run_wal_experiments(
+		words, num_mutations: int = 20000, group_sizes: tuple[int, ...] = (16, 256), checkpoint_every: int = 5000,
+		warmup: int = 0, repeat: int = 3
+):
+	"""
+	Measure the mutation throughput of a durable trie under every fsync policy, against an in-memory trie,
+	and the time to recover it from its snapshot and write-ahead log.
+	The mutations are inserts (90%) and removes (10%) of random words; checkpoints run during the measurement.
+	Every run starts from an empty directory; the recovery runs reopen the directory left by the last one.
+	Save the results to a CSV file.
+	:param words: List of words to use.
+	:param num_mutations: Number of mutations to apply.
+	:param group_sizes: Group commit sizes of the batch policy to compare.
+	:param checkpoint_every: Number of mutations between checkpoints.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement; with fsync=always, every run takes seconds.
+	:return: Pandas DataFrame containing the throughput results.
+	"""
+	rng = random.Random(0)
+	mutations = [(rng.random() < 0.9, rng.choice(words)) for _ in range(num_mutations)]
+	configurations = [("PatriciaTrie (in memory)", None, {})]
+	configurations += [("DurableTrie (fsync=always)", "always", {})]
+	configurations += [
+		(f"DurableTrie (fsync=batch, group_size={group_size})", "batch", {"group_size": group_size})
+		for group_size in group_sizes
+	]
+	configurations += [("DurableTrie (fsync=never)", "never", {})]
+
+	def apply(trie):
+		for is_insert, word in mutations:
+			if is_insert:
+				trie.insert(word)
+			else:
+				trie.remove(word)
+		if isinstance(trie, DurableTrie):
+			trie.close()
+
+	results = []
+	with tempfile.TemporaryDirectory() as root:
+		for number, (name, fsync, kwargs) in enumerate(configurations):
+			directory = os.path.join(root, str(number))
+
+			def setup():
+				if fsync is None:
+					return PatriciaTrie()
+				shutil.rmtree(directory, ignore_errors=True)
+				return DurableTrie(directory, fsync=fsync, checkpoint_every=checkpoint_every, **kwargs)
+
+			run = functools.partial(measure, warmup=warmup, repeat=repeat, memory=False, Trie=name)
+			mutation = run("Mutation", apply, setup)
+			results.append({**mutation.summary(), "Mutations_per_second": num_mutations / mutation.median})
+			recovery = None
+			if fsync is not None:
+				recovery = run("Recovery", lambda _: DurableTrie(directory).close())
+				results.append(recovery.summary())
+			recovery_time = recovery.median * 1000 if recovery is not None else float("nan")
+			print(f"{name}: {num_mutations / mutation.median:,.0f} mutations/s, recovery {recovery_time:.1f} ms")
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "wal_results.csv")
+	return results_df
+
+
+@register_experiment("instrumentation", ("words",))
+def run_instrumentation_experiments(words, warmup: int = 2, repeat: int = 21):
+	"""
+	Measure the overhead of the metrics of the tries on insertions and searches of every word:
+	never enabled, enabled and then disabled again, and enabled.
+	The three variants run in turn within every repetition, so that drifts of the machine affect them alike,
+	and the overhead is the median ratio of the times of a variant and the plain trie in the same repetition.
+	Save the results to a CSV file.
+	:param words: List of words to use.
+	:param warmup: Number of untimed rounds.
+	:param repeat: Number of timed rounds.
+	:return: Pandas DataFrame containing the timing results.
+	"""
+	def new_trie(trie_class, metrics: str):
+		trie = trie_class()
+		if metrics != "never enabled":
+			trie.enable_metrics()
+		if metrics == "disabled":
+			trie.disable_metrics()
+		return trie
+
+	def build(trie_class, metrics: str):
+		trie = new_trie(trie_class, metrics)
+		for word in words:
+			trie.insert(word)
+		return trie
+
+	operations = [
+		("Insertion", lambda trie: [trie.insert(word) for word in words], new_trie),
+		("Search", lambda trie: [trie.search(word) for word in words], build),
+	]
+	variants = ["never enabled", "disabled", "enabled"]
+	results = []
+	for trie_class in [PrefixTrie, PatriciaTrie]:
+		for operation, func, setup in operations:
+			samples = {metrics: [] for metrics in variants}
+			for round_number in range(warmup + repeat):
+				for metrics in variants:
+					measurement = measure(
+						operation, func, functools.partial(setup, trie_class, metrics), 0, 1, memory=False
+					)
+					if round_number >= warmup:
+						samples[metrics] += measurement.samples
+			for metrics in variants:
+				measurement = Measurement(operation, samples[metrics])
+				overhead = float(np.median(np.divide(samples[metrics], samples["never enabled"]))) - 1
+				results.append({"Trie": trie_class.__name__, "Metrics": metrics, **measurement.summary(), "Overhead": overhead})
+				low, high = measurement.confidence_interval
+				print(
+					f"{trie_class.__name__} {operation.lower()}, metrics {metrics}: {measurement.median * 1000:.2f} ms "
+					f"(95% CI {low * 1000:.2f}-{high * 1000:.2f} ms), overhead {overhead:+.1%}"
+				)
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "instrumentation_results.csv")
+	return results_df
+
+
+@register_experiment("streaming", ("words",))
+def run_streaming_experiments(words, warmup: int = 1, repeat: int = 5):
+	"""
+	Compare the time and peak memory of loading a word list file into a Patricia trie:
+	reading all lines into a list first, against streaming them into insert_many from a plain,
+	a memory-mapped and a gzip-compressed file.
+	Save the results to a CSV file.
+	:param words: List of words to use.
+	:param warmup: Number of untimed runs of every loader.
+	:param repeat: Number of timed runs of every loader.
+	:return: Pandas DataFrame containing the loading results.
+	"""
+	def load_list(path):
+		trie = PatriciaTrie()
+		with open(path, "r") as file:
+			for word in [line.rstrip("\n") for line in file.readlines()]:
+				trie.insert(word)
+		return trie
+
+	def load_stream(path, **kwargs):
+		trie = PatriciaTrie()
+		trie.insert_many(read_keys(path, **kwargs))
+		return trie
+
+	results = []
+	with tempfile.TemporaryDirectory() as directory:
+		for size in INCREMENTAL_SIZES:
+			text = "".join(f"{word}\n" for word in words[:size]).encode("utf-8")
+			path, gzip_path = os.path.join(directory, "words.txt"), os.path.join(directory, "words.txt.gz")
+			with open(path, "wb") as file:
+				file.write(text)
+			with gzip.open(gzip_path, "wb") as file:
+				file.write(text)
+
+			loaders = [
+				("List", functools.partial(load_list, path)),
+				("Stream", functools.partial(load_stream, path)),
+				("Stream (mmap)", functools.partial(load_stream, path, mmap=True)),
+				("Stream (gzip)", functools.partial(load_stream, gzip_path)),
+			]
+			for loader, func in loaders:
+				measurement = measure("Load", lambda _: func(), warmup=warmup, repeat=repeat, Loader=loader, Size=size)
+				results.append(measurement.summary())
+				print(f"{size:>8} words, {loader}: {measurement.median * 1000:.1f} ms, peak {measurement.memory:,.0f} KB")
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "streaming_results.csv")
+	return results_df
+
+
+@register_experiment("cache")
+def run_cache_experiments(
+		words, prefixes_for_range_search, num_queries: int = 5000, exponents: tuple[float, ...] = (0.8, 1.2),
+		budgets: tuple[int, ...] = (1 << 18, 1 << 21), insert_share: float = 0.01, warmup: int = 1, repeat: int = 5
+):
+	"""
+	Measure range searches on a Patricia trie under Zipf-distributed prefix workloads, without a cache
+	and with an LRU and an LFU cache of increasing memory budgets.
+	A share of the operations insert new words, which invalidates the cached results of their prefixes.
+	Every run replays the same workload on a freshly built trie with an empty cache,
+	so the cache statistics are the same for every run.
+	Save the results to a CSV file.
+	:param words: List of words to use.
+	:param prefixes_for_range_search: List of prefixes to query.
+	:param num_queries: Number of operations of every workload.
+	:param exponents: Skews of the Zipf distributions of the prefixes.
+	:param budgets: Memory budgets of the caches, in bytes.
+	:param insert_share: Share of the operations that insert a new word.
+	:param warmup: Number of untimed runs of every measurement.
+	:param repeat: Number of timed runs of every measurement.
+	:return: Pandas DataFrame containing the cache results.
+	"""
+	rng = random.Random(0)
+	initial, new_words = words[:len(words) // 2], iter(words[len(words) // 2:])
+	configurations = [("No cache", None, None)]
+	configurations += [(f"{policy.upper()} ({budget >> 10} KB)", policy, budget) for budget in budgets for policy in ("lru", "lfu")]
+
+	results = []
+	for exponent in exponents:
+		prefixes = zipf_queries(prefixes_for_range_search, num_queries, rng, exponent)
+		workload = [(next(new_words, None) if rng.random() < insert_share else None, prefix) for prefix in prefixes]
+		for name, policy, budget in configurations:
+			stats = {}
+
+			def setup():
+				trie = PatriciaTrie()
+				trie.insert_many(initial)
+				if policy is not None:
+					trie.enable_cache(budget, policy)
+				return trie
+
+			def replay(trie):
+				for word, prefix in workload:
+					if word is not None:
+						trie.insert(word)
+					else:
+						trie.range_search(prefix)
+				if trie.cache is not None:
+					stats.update(trie.cache.to_dict())
+
+			measurement = measure(
+				"Range_search", replay, setup, warmup, repeat, memory=False, Cache=name, Exponent=exponent
+			)
+			results.append({
+				**measurement.summary(), "Hit_rate": stats.get("hit_rate", 0.0), "Evictions": stats.get("evictions", 0),
+				"Invalidations": stats.get("invalidations", 0),
+			})
+			print(
+				f"Zipf exponent {exponent}, {name}: {measurement.median * 1000:.1f} ms "
+				f"(95% CI {measurement.confidence_interval[0] * 1000:.1f}-{measurement.confidence_interval[1] * 1000:.1f} ms), "
+				f"hit rate {stats.get('hit_rate', 0.0):.1%}, "
+				f"{stats.get('evictions', 0)} evictions, {stats.get('invalidations', 0)} invalidations"
+			)
+
+	results_df = pd.DataFrame(results)
+	save_results(results_df, "cache_results.csv")
+	return results_df
+
+
+def save_results(df, file_name: str):
+	"""
+	Save experiment results to a CSV file in the CSV directory.
+	:param df: Pandas DataFrame containing the results.
+	:param file_name: Name of the CSV file.
+	"""
+	csv_file_name = f"{CSV_PATH}{file_name}"
+	file_path = Path(csv_file_name)
+	file_path.parent.mkdir(parents=True, exist_ok=True)
+	df.to_csv(csv_file_name, index=False)
+	print(f"Results saved to {csv_file_name}")
+
+
+def plot_time_comparison(df, operation: str):
+	"""
+	Plot the median time of a single operation for every compared implementation,
+	with the confidence interval of the median as a shaded band.
+	:param df: Pandas DataFrame with Trie, Size and Time columns, and optionally Time_CI_low and Time_CI_high.
+	:param operation: Name of the operation, used in the title and the file name.
+	"""
+	plt.figure(figsize=(12, 6))
+	for implementation in df["Trie"].unique():
+		subset = df[df["Trie"] == implementation]
+		lines = plt.plot(subset["Size"], subset["Time"], marker="o", linestyle="--", label=f"{implementation}")
+		if "Time_CI_low" in subset:
+			plt.fill_between(
+				subset["Size"], subset["Time_CI_low"], subset["Time_CI_high"], color=lines[0].get_color(), alpha=0.2
+			)
+	plt.title(f"{operation} time performance", fontsize=20)
+	plt.xlabel("Dataset size", fontsize=16)
+	plt.ylabel("Time (s)", fontsize=16)
+	plt.legend(loc="best", fontsize=14)
+	plt.grid(True)
+	file_path = Path(f"{PLOT_PATH}{operation.lower()}_time_performance.png")
+	file_path.parent.mkdir(parents=True, exist_ok=True)
+	plt.savefig(file_path)
+	print(f"Saved {file_path}")
+	plt.show()
+
+
+def plot_footprint(df):
+	"""
+	Plot the bytes per key of every trie and child map representation.
+	:param df: Pandas DataFrame containing the footprint results.
+	"""
+	plt.figure(figsize=(12, 6))
+	for (trie, child_map), subset in df.groupby(["Trie", "Child_map"]):
+		plt.plot(
+			subset["Size"],
+			subset["Bytes_per_key"],
+			marker="o" if trie == PrefixTrie.__name__ else "s",
+			linestyle="--",
+			label=f"{trie} ({child_map})"
+		)
+	plt.title("Memory footprint per key", fontsize=20)
+	plt.xlabel("Dataset size", fontsize=16)
+	plt.ylabel("Bytes per key", fontsize=16)
+	plt.yscale("log")
+	plt.legend(loc="best", fontsize=14)
+	plt.grid(True)
+	file_path = Path(f"{PLOT_PATH}footprint_bytes_per_key.png")
+	file_path.parent.mkdir(parents=True, exist_ok=True)
+	plt.savefig(file_path)
+	print(f"Saved {file_path}")
+	plt.show()
+
+
+def plot_structure(df):
+	"""
+	Plot the nodes per key and the average depth of the keys of every trie.
+	:param df: Pandas DataFrame containing the footprint results of one child map representation.
+	"""
+	figure, (nodes_axis, depth_axis) = plt.subplots(1, 2, figsize=(16, 6))
+	for trie, subset in df.groupby("Trie"):
+		marker = "o" if trie == PrefixTrie.__name__ else "s"
+		nodes_axis.plot(subset["Size"], subset["Nodes"] / subset["Size"], marker=marker, linestyle="--", label=trie)
+		depth_axis.plot(subset["Size"], subset["Average_depth"], marker=marker, linestyle="--", label=trie)
+	for axis, y_label in [(nodes_axis, "Nodes per key"), (depth_axis, "Average depth of a key (edges)")]:
+		axis.set_xlabel("Dataset size", fontsize=16)
+		axis.set_ylabel(y_label, fontsize=16)
+		axis.legend(loc="best", fontsize=14)
+		axis.grid(True)
+	figure.suptitle("Trie structure", fontsize=20)
+	file_path = Path(f"{PLOT_PATH}trie_structure.png")
+	file_path.parent.mkdir(parents=True, exist_ok=True)
+	plt.savefig(file_path)
+	print(f"Saved {file_path}")
+	plt.show()
+
+def plot_results(df, length: Length = Length.ALL):
+	"""
+	Create performance plots from the experiment results.
+	:param df: Pandas DataFrame containing the experiment results.
+	:param length: Word length of the dataset (ALL, SHORT, MEDIUM, LONG).
+	"""
+	for operation in df["Operation"].unique():
+		for metric, marker, y_label in zip(["Time", "Memory"], ["o", "s"], ["Time (s)", "Memory (KB)"]):
+			plt.figure(figsize=(12, 6))
+			for trie in df["Trie"].unique():
+				subset = df[(df["Trie"] == trie) & (df["Operation"] == operation)]
+				lines = plt.plot(
+					subset["Size"],
+					subset[metric],
+					marker=marker,
+					linestyle="--",
+					label=f"{trie}"
+				)
+				if metric == "Time" and "Time_CI_low" in subset:  # confidence interval of the median
+					plt.fill_between(
+						subset["Size"], subset["Time_CI_low"], subset["Time_CI_high"], color=lines[0].get_color(), alpha=0.2
+					)
+			plt.title(
+				f"{operation} {metric.lower()} performance", fontsize=20
+			)  # f"{operation} {metric.lower()} performance ({length.name.lower()} words)" if filtering based on word length
+			plt.xlabel("Dataset size", fontsize=16)
+			plt.ylabel(y_label, fontsize=16)
+			plt.legend(loc="best", fontsize=14)
+			plt.grid(True)
+			file_path = f"{PLOT_PATH}{operation.lower()}_{metric.lower()}_performance.png"  # f"{PLOT_PATH}{operation.lower()}_{metric.lower()}_performance_{length.name.lower()}.png" if filtering based on word length
+			file_path = Path(file_path)
+			file_path.parent.mkdir(parents=True, exist_ok=True)
+			plt.savefig(file_path)
+			print(f"Saved {file_path}")
+			plt.show()
+
@@ -0,0 +1,91 @@
+import argparse
+import os
+import random
+import sys
+
+import pandas as pd
+
+from benchmark.config import CSV_PATH, DATASET_PATH
+from benchmark.experiments import Length, experiment_with_trie
+from benchmark.runner import compare, load_report, machine_metadata, save_report
+from benchmark.util import LENGTH_DISTRIBUTIONS, load_word_list, range_search_prefixes, synthetic_words
+from trie import PrefixTrie, PatriciaTrie
+
+RESULTS_PATH = os.path.join(CSV_PATH, "benchmark_results.json")
+
+
+def run_benchmarks(
+		sizes: list[int], dataset: str = "synthetic", warmup: int = 1, repeat: int = 7, seed: int = 0, **generator
+) -> tuple[dict, list]:
+	"""
+	Benchmark both tries on datasets of increasing size.
+	:param sizes: Dataset sizes.
+	:param dataset: "synthetic" for generated words, or "words" for the word list (at most 10,000 words).
+	:param warmup: Number of untimed runs of every operation.
+	:param repeat: Number of timed runs of every operation.
+	:param seed: Seed of the synthetic words.
+	:param generator: Parameters of the synthetic words (see benchmark.util.synthetic_words).
+	:return: Metadata of the run and the measurements.
+	"""
+	if dataset == "words":
+		words, _ = load_word_list(DATASET_PATH(Length.ALL.value))
+	else:
+		words = synthetic_words(max(sizes), random.Random(seed), **generator)
+	metadata = {**machine_metadata(), "dataset": dataset, "seed": seed, **generator}
+	measurements = []
+	for size in sizes:
+		subset_words = words[:size]
+		prefixes = range_search_prefixes(subset_words)
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			print(f"Benchmarking {trie_class.__name__} with {len(subset_words)} words...")
+			measurements += experiment_with_trie(trie_class, subset_words, prefixes, warmup, repeat)
+	return metadata, measurements
+
+
+def main(argv=None) -> int:
+	"""
+	Run the benchmarks from the command line, save the results and compare them against a baseline.
+	:param argv: Command line arguments, None for sys.argv.
+	:return: Exit status, 1 if a benchmark regressed against the baseline.
+	"""
+	parser = argparse.ArgumentParser(description="Benchmark the tries with repeated, statistically summarized runs.")
+	parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="dataset sizes")
+	parser.add_argument("--dataset", choices=["synthetic", "words"], default="synthetic")
+	parser.add_argument("--warmup", type=int, default=1, help="untimed runs of every operation")
+	parser.add_argument("--repeat", type=int, default=7, help="timed runs of every operation")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--alphabet-size", type=int, default=26)
+	parser.add_argument("--mean-length", type=float, default=8.0)
+	parser.add_argument("--length-distribution", choices=LENGTH_DISTRIBUTIONS, default="normal")
+	parser.add_argument("--prefix-share", type=float, default=0.5, help="fraction of words extending an earlier one")
+	parser.add_argument("--output", default=RESULTS_PATH, help="JSON file of the results")
+	parser.add_argument("--baseline", help="JSON file of earlier results to compare against")
+	parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown flagged as a regression")
+	args = parser.parse_args(argv)
+
+	metadata, measurements = run_benchmarks(
+		args.sizes, args.dataset, args.warmup, args.repeat, args.seed, alphabet_size=args.alphabet_size,
+		mean_length=args.mean_length, length_distribution=args.length_distribution, prefix_share=args.prefix_share
+	)
+	with pd.option_context("display.width", 200, "display.max_columns", None):
+		print(pd.DataFrame([measurement.summary() for measurement in measurements]).to_string(index=False))
+	save_report(args.output, measurements, metadata)
+
+	if args.baseline is None:
+		return 0
+	baseline_metadata, baseline = load_report(args.baseline)
+	print(f"Comparing against the baseline of commit {baseline_metadata.get('commit')} ({baseline_metadata.get('timestamp')})")
+	comparison = pd.DataFrame(compare(measurements, baseline, args.threshold))
+	if comparison.empty:
+		print("No benchmark in common with the baseline")
+		return 0
+	print(comparison.to_string(index=False))
+	regressions = comparison[comparison["Status"] == "regression"]
+	if not regressions.empty:
+		print(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
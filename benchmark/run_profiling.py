@@ -3,7 +3,7 @@ import pstats
 from io import StringIO
 
 from benchmark.config import DATASET_PATH, PROFILE_OUTPUT_PATH
-from benchmark.run_experiments import Length
+from benchmark.experiments import Length
 from benchmark.util import load_word_list
 from trie import PrefixTrie, PatriciaTrie
 
@@ -30,6 +30,40 @@ def profile_function(func, *args, **kwargs):
 	return result, stream.getvalue()
 
 
+class SliceCountingBytes(bytes):
+	"""
+	Bytes that count how many times they are sliced.
+	Every slice of a key allocates a new bytes object, so inserting, searching and removing keys of this type
+	counts the allocations made on the path by comparing edge labels, which a profiler cannot see.
+	Indexing a single byte returns a cached small int and is not counted, and neither are the memoryviews
+	the Patricia trie compares some edge labels through, since they share the buffer of the key instead of copying it.
+	"""
+	slices = 0
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			SliceCountingBytes.slices += 1
+		return bytes.__getitem__(self, index)
+
+
+def count_slices(trie_class, words) -> str:
+	"""
+	Count the byte slices allocated per insertion, search and deletion of every word.
+	:param trie_class: Trie implementation (PrefixTrie or PatriciaTrie).
+	:param words: Dataset of words.
+	:return: Report with the average number of slices per operation.
+	"""
+	keys = [SliceCountingBytes(word.encode("utf-8")) for word in words]
+	trie = trie_class(key_type=bytes)
+	lines = []
+	for operation, func in [("Insertion", trie.insert), ("Search", trie.search), ("Deletion", trie.remove)]:
+		SliceCountingBytes.slices = 0
+		for key in keys:
+			func(key)
+		lines.append(f"{operation:<10} {SliceCountingBytes.slices / len(keys):6.2f} slices per operation")
+	return "\n".join(lines)
+
+
 def run_experiments_with_profiling(trie_class, words, prefixes, output_file=None):
 	"""
 	Run profiling experiments with the given trie class.
@@ -75,6 +109,9 @@ def run_experiments_with_profiling(trie_class, words, prefixes, output_file=None
 	)
 	write_to_output(f"\nDeletion profiling for {trie_class.__name__}:\n\n{delete_profile}\n")
 
+	# Experiment 5: Allocations made by comparing edge labels
+	write_to_output(f"\nAllocation profiling for {trie_class.__name__}:\n\n{count_slices(trie_class, words)}\n")
+
 
 if __name__ == "__main__":
 	word_list, prefix_list = load_word_list(DATASET_PATH(Length.ALL.value))
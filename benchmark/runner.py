@@ -0,0 +1,283 @@
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+
+
+@dataclass
+class Measurement:
+	"""
+	Repeated timings of a benchmark and the peak memory of a separate run.
+
+	Attributes:
+		name: name of the benchmark, such as the measured operation
+		samples: times of the timed runs, in seconds
+		memory: peak memory allocated by a separate, untimed run (in KB), None if not measured
+		parameters: parameters of the benchmark, such as the trie class and the dataset size
+	"""
+	name: str
+	samples: list[float]
+	memory: Optional[float] = None
+	parameters: dict[str, Any] = field(default_factory=dict)
+
+	@property
+	def median(self) -> float:
+		return float(np.median(self.samples))
+
+	@property
+	def iqr(self) -> float:
+		"""
+		Interquartile range of the samples.
+		"""
+		q1, q3 = np.percentile(self.samples, [25, 75])
+		return float(q3 - q1)
+
+	@property
+	def confidence_interval(self) -> tuple[float, float]:
+		"""
+		Distribution-free 95% confidence interval of the median, from the order statistics of the samples.
+		Timings are skewed by interference from the rest of the machine, so no normal distribution is assumed.
+		"""
+		return median_confidence_interval(self.samples)
+
+	def summary(self) -> dict[str, Any]:
+		"""
+		Summarize the measurement as a flat row for a results table.
+		:return: dictionary of the parameters and the statistics
+		"""
+		low, high = self.confidence_interval
+		return {
+			"Operation": self.name, **self.parameters,
+			"Time": self.median, "Time_IQR": self.iqr, "Time_CI_low": low, "Time_CI_high": high,
+			"Repeat": len(self.samples), "Memory": self.memory,
+		}
+
+
+def median_confidence_interval(samples: list[float], confidence: float = 0.95) -> tuple[float, float]:
+	"""
+	Compute a distribution-free confidence interval of the median: the number of samples below the median
+	is binomial with p = 1/2, which gives the ranks of the order statistics bounding the interval.
+	With too few samples for the requested confidence, the interval is the whole range of the samples.
+	:param samples: the samples
+	:param confidence: the confidence level
+	:return: lower and upper bound of the interval
+	"""
+	ordered = sorted(samples)
+	n = len(ordered)
+	alpha = (1 - confidence) / 2
+
+	def below(k: int) -> float:  # probability that at most k samples are below the median
+		return sum(math.comb(n, i) for i in range(k + 1)) / 2 ** n
+
+	k = 0  # the interval is [ordered[k], ordered[n - 1 - k]], which misses the median with probability 2 * below(k)
+	while k + 1 < n - 2 - k and below(k + 1) <= alpha:
+		k += 1
+	return ordered[k], ordered[n - 1 - k]
+
+
+def measure(
+		name: str, func: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+		warmup: int = 1, repeat: int = 7, memory: bool = True, **parameters
+) -> Measurement:
+	"""
+	Benchmark a function: run it a few times to warm up, then time repeated runs, then measure its peak memory
+	in one more run with tracemalloc, which slows the allocations down and is therefore never active while timing.
+	Every run gets a fresh state from the setup, which is not timed, so functions that mutate their input
+	(such as inserting into or deleting from a trie) are measured under the same conditions every time.
+	Like timeit, the garbage collector is disabled while timing.
+	:param name: name of the benchmark
+	:param func: function to benchmark, called with the state returned by the setup
+	:param setup: function returning the state of a run, None to call func with None
+	:param warmup: number of untimed runs before the timed ones
+	:param repeat: number of timed runs
+	:param memory: whether to measure the peak memory in a separate run
+	:param parameters: parameters of the benchmark, stored with the measurement
+	:return: the measurement
+	"""
+	if repeat < 1:
+		raise ValueError(f"repeat must be positive, got {repeat}")
+	for _ in range(warmup):
+		func(setup() if setup is not None else None)
+
+	samples = []
+	gc_enabled = gc.isenabled()
+	try:
+		for _ in range(repeat):
+			state = setup() if setup is not None else None
+			gc.collect()
+			gc.disable()
+			start_time = time.perf_counter()
+			func(state)
+			samples.append(time.perf_counter() - start_time)
+			if gc_enabled:
+				gc.enable()
+			del state
+	finally:
+		if gc_enabled:
+			gc.enable()
+
+	peak_memory = None
+	if memory:
+		state = setup() if setup is not None else None
+		gc.collect()
+		tracemalloc.start()
+		try:
+			func(state)
+			peak_memory = tracemalloc.get_traced_memory()[1] / 1024
+		finally:
+			tracemalloc.stop()
+	return Measurement(name, samples, peak_memory, parameters)
+
+
+def machine_metadata() -> dict[str, Any]:
+	"""
+	Describe the machine and the code a benchmark ran on, so that results from different runs can be compared.
+	:return: dictionary of metadata
+	"""
+	try:
+		commit = subprocess.run(
+			["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+			cwd=os.path.dirname(os.path.abspath(__file__))
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		commit = None
+	return {
+		"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+		"python": sys.version.split()[0],
+		"implementation": platform.python_implementation(),
+		"platform": platform.platform(),
+		"machine": platform.machine(),
+		"processor": platform.processor(),
+		"cpu_count": os.cpu_count(),
+		"numpy": np.__version__,
+		"commit": commit,
+	}
+
+
+def save_report(path: str, measurements: list[Measurement], metadata: Optional[dict[str, Any]] = None):
+	"""
+	Save measurements with their raw samples and the machine metadata to a JSON file.
+	:param path: path of the file
+	:param measurements: the measurements
+	:param metadata: metadata of the run, None for the metadata of this machine
+	"""
+	os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+	report = {
+		"metadata": metadata if metadata is not None else machine_metadata(),
+		"measurements": [asdict(measurement) for measurement in measurements],
+	}
+	with open(path, "w") as file:
+		json.dump(report, file, indent=1)
+	print(f"Results saved to {path}")
+
+
+def load_report(path: str) -> tuple[dict[str, Any], list[Measurement]]:
+	"""
+	Load measurements saved by save_report.
+	:param path: path of the file
+	:return: the metadata and the measurements
+	"""
+	with open(path) as file:
+		report = json.load(file)
+	return report["metadata"], [Measurement(**measurement) for measurement in report["measurements"]]
+
+
+def compare(
+		measurements: list[Measurement], baseline: list[Measurement], threshold: float = 0.1
+) -> list[dict[str, Any]]:
+	"""
+	Compare measurements against a baseline with the same benchmarks and parameters.
+	A benchmark regressed if its median is slower by more than the threshold and the confidence intervals
+	of the two medians do not overlap, so that noise alone does not flag it; improvements are flagged alike.
+	:param measurements: the new measurements
+	:param baseline: the baseline measurements
+	:param threshold: the relative change of the median below which a benchmark is unchanged
+	:return: one row per benchmark found in both, with the medians, their ratio and the status
+		("regression", "improvement" or "unchanged")
+	"""
+	def key(measurement: Measurement) -> str:
+		return json.dumps([measurement.name, measurement.parameters], sort_keys=True)
+
+	baseline_by_key = {key(measurement): measurement for measurement in baseline}
+	rows = []
+	for measurement in measurements:
+		reference = baseline_by_key.get(key(measurement))
+		if reference is None:
+			continue
+		ratio = measurement.median / reference.median if reference.median > 0 else math.inf
+		low, high = measurement.confidence_interval
+		reference_low, reference_high = reference.confidence_interval
+		status = "unchanged"
+		if ratio > 1 + threshold and low > reference_high:
+			status = "regression"
+		elif ratio < 1 / (1 + threshold) and high < reference_low:
+			status = "improvement"
+		rows.append({
+			"Operation": measurement.name, **measurement.parameters,
+			"Baseline": reference.median, "Time": measurement.median, "Ratio": ratio, "Status": status,
+		})
+	return rows
+
+
+@dataclass
+class Experiment:
+	"""
+	An experiment registered with register_experiment, which measures, saves and plots one study on its own.
+
+	Attributes:
+		name: name the experiment is selected by
+		func: function running the experiment, called with the dataset inputs it takes
+		inputs: names of the dataset inputs passed to the function, in order ("words", "prefixes")
+	"""
+	name: str
+	func: Callable[..., Any]
+	inputs: tuple[str, ...]
+
+
+EXPERIMENTS: dict[str, Experiment] = {}
+"""Registered experiments by name, in the order they were registered."""
+
+
+def register_experiment(name: str, inputs: tuple[str, ...] = ("words", "prefixes")) -> Callable:
+	"""
+	Register a function as an experiment that can be selected by name with run_selected.
+	:param name: name of the experiment
+	:param inputs: names of the dataset inputs the function takes, in order
+	:return: decorator registering the function and returning it unchanged
+	"""
+	def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+		if name in EXPERIMENTS:
+			raise ValueError(f"experiment {name} is already registered")
+		EXPERIMENTS[name] = Experiment(name, func, inputs)
+		return func
+
+	return decorator
+
+
+def run_selected(names: Optional[Iterable[str]] = None, **dataset) -> dict[str, Any]:
+	"""
+	Run registered experiments, each on its own.
+	:param names: names of the experiments to run, in order, None for all of them in registration order
+	:param dataset: the dataset inputs of the experiments, by name
+	:return: dictionary of the results of every experiment, by name
+	"""
+	names = list(EXPERIMENTS) if names is None else list(names)
+	unknown = [name for name in names if name not in EXPERIMENTS]
+	if unknown:
+		raise ValueError(f"unknown experiments {unknown}, choose from {list(EXPERIMENTS)}")
+	results = {}
+	for name in names:
+		experiment = EXPERIMENTS[name]
+		print(f"Running the {name} experiment...")
+		results[name] = experiment.func(*(dataset[input_name] for input_name in experiment.inputs))
+	return results
@@ -1,7 +1,10 @@
+import ipaddress
 import os
 import sys
 from typing import Union
 
+from trie.ingest import normalize, read_keys
+
 
 def load_word_list(file_path, return_prefix_list: bool = True) -> Union[tuple[list[str], list[str]], list[str]]:
 	"""
@@ -15,8 +18,8 @@ def load_word_list(file_path, return_prefix_list: bool = True) -> Union[tuple[li
 	if not os.path.exists(file_path):
 		raise FileNotFoundError(f"File not found: {file_path}")
 
-	with open(file_path, "r") as file:
-		words = [line.strip() for line in file.readlines()]
+	# Stream the lines instead of reading them all at once, so only the list of words is held in memory
+	words = list(normalize(read_keys(file_path), skip_empty=False))
 
 	if return_prefix_list:
 		# Prepare the prefixes for range search
@@ -30,6 +33,132 @@ def load_word_list(file_path, return_prefix_list: bool = True) -> Union[tuple[li
 		return words
 
 
+def levenshtein_distance(a: str, b: str) -> int:
+	"""
+	Compute the Levenshtein distance of two strings with the textbook dynamic programming algorithm.
+	:param a: First string.
+	:param b: Second string.
+	:return: Minimum number of inserted, deleted or substituted characters.
+	"""
+	row = list(range(len(b) + 1))
+	for i, char_a in enumerate(a, 1):
+		previous, row = row, [i]
+		for j, char_b in enumerate(b, 1):
+			row.append(min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+	return row[-1]
+
+
+def misspell(word: str, rng) -> str:
+	"""
+	Misspell a word by substituting, inserting or deleting a random character.
+	:param word: Word to misspell.
+	:param rng: Random number generator.
+	:return: The misspelled word.
+	"""
+	i = rng.randrange(len(word) + 1)
+	char = rng.choice("abcdefghijklmnopqrstuvwxyz")
+	operation = rng.randrange(3) if i < len(word) else 1
+	if operation == 0:
+		return word[:i] + char + word[i + 1:]
+	if operation == 1:
+		return word[:i] + char + word[i:]
+	return word[:i] + word[i + 1:]
+
+
+def synthetic_routes(count: int, rng, ipv6_share: float = 0.1) -> list[str]:
+	"""
+	Generate distinct synthetic routes, with prefix lengths roughly distributed like a BGP table:
+	mostly /24 and /16-/23 IPv4 networks, some shorter ones, and a share of /32-/64 IPv6 networks.
+	:param count: Number of routes.
+	:param rng: Random number generator.
+	:param ipv6_share: Fraction of IPv6 routes.
+	:return: List of networks in CIDR notation.
+	"""
+	routes = set()
+	while len(routes) < count:
+		if rng.random() < ipv6_share:
+			prefix_length = rng.choice([32, 40, 44, 48, 48, 48, 56, 64])
+			address = (0x2000 << 112 | rng.getrandbits(125)) >> (128 - prefix_length) << (128 - prefix_length)
+			routes.add(f"{ipaddress.IPv6Address(address)}/{prefix_length}")
+		else:
+			prefix_length = rng.choice([24] * 6 + list(range(16, 24)) + list(range(8, 16)))
+			address = rng.getrandbits(32) >> (32 - prefix_length) << (32 - prefix_length)
+			routes.add(f"{ipaddress.IPv4Address(address)}/{prefix_length}")
+	return sorted(routes)
+
+
+LENGTH_DISTRIBUTIONS = ("uniform", "normal", "exponential")
+"""Key-length distributions of synthetic_words."""
+
+
+def synthetic_words(
+		count: int, rng, alphabet_size: int = 26, mean_length: float = 8.0, length_distribution: str = "normal",
+		prefix_share: float = 0.5
+) -> list[str]:
+	"""
+	Generate distinct synthetic words, to benchmark datasets much larger than the word lists.
+	Every word either extends a prefix of an earlier word (with probability prefix_share)
+	or is drawn from scratch, so the share controls how much of the trie is shared between keys.
+	:param count: Number of words.
+	:param rng: Random number generator.
+	:param alphabet_size: Number of distinct characters: lowercase ASCII letters first, then Latin-1 letters
+		and beyond, whose UTF-8 encodings take two bytes.
+	:param mean_length: Mean word length, in characters.
+	:param length_distribution: Distribution of the word lengths: "uniform" (between 1 and twice the mean),
+		"normal" (standard deviation of a quarter of the mean) or "exponential".
+	:param prefix_share: Fraction of the words that extend a prefix of an earlier word.
+	:return: List of words in generation order.
+	"""
+	if length_distribution not in LENGTH_DISTRIBUTIONS:
+		raise ValueError(f"Unknown length distribution {length_distribution!r}")
+	alphabet = [chr(ord("a") + i) if i < 26 else chr(0xC0 + i - 26) for i in range(alphabet_size)]
+
+	def length() -> int:
+		if length_distribution == "uniform":
+			return rng.randint(1, max(1, round(2 * mean_length) - 1))
+		if length_distribution == "normal":
+			return max(1, round(rng.gauss(mean_length, mean_length / 4)))
+		return max(1, round(rng.expovariate(1 / mean_length)))
+
+	words, seen = [], set()
+	while len(words) < count:
+		target = length()
+		word = ""
+		if words and rng.random() < prefix_share:
+			base = rng.choice(words)
+			word = base[:rng.randint(1, len(base))]
+			target = max(target, len(word) + 1)
+		word += "".join(rng.choices(alphabet, k=target - len(word)))
+		if word not in seen:
+			seen.add(word)
+			words.append(word)
+	return words
+
+
+def range_search_prefixes(words: list[str]) -> list[str]:
+	"""
+	Get all one-character and two-character prefixes of some words, like load_word_list for the word lists.
+	:param words: List of words.
+	:return: Sorted list of prefixes.
+	"""
+	return sorted({word[:1] for word in words} | {word[:2] for word in words if len(word) >= 2})
+
+
+def zipf_queries(items: list, count: int, rng, exponent: float = 1.0) -> list:
+	"""
+	Draw a skewed query workload, where the item of rank r (in a random order) is drawn with probability
+	proportional to 1 / r^exponent, so a few items make up most of the queries.
+	:param items: Items to draw from, such as prefixes.
+	:param count: Number of queries.
+	:param rng: Random number generator.
+	:param exponent: Skew of the distribution, 0 for uniform.
+	:return: List of queries.
+	"""
+	ranked = rng.sample(items, len(items))
+	weights = [1 / rank ** exponent for rank in range(1, len(ranked) + 1)]
+	return rng.choices(ranked, weights, k=count)
+
+
 def filter_words_by_length(words, min_length=1, max_length=sys.maxsize):
 	"""
 	Filter the words by length.
@@ -0,0 +1,120 @@
+import sys
+import unittest
+
+from trie.cache import RangeSearchCache
+from trie.concurrent import ConcurrentPatriciaTrie
+from trie.patricia import PatriciaTrie
+from trie.prefix import PrefixTrie
+
+
+def entry_size(prefix: bytes, results: frozenset) -> int:
+	"""Get the size the cache estimates for an entry."""
+	return sys.getsizeof(prefix) + sys.getsizeof(results) + sum(map(sys.getsizeof, results))
+
+
+class TestRangeSearchCache(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up entries of equal size and a cache with room for two of them."""
+		self.results = frozenset(["x"])
+		self.size = entry_size(b"a", self.results)
+		self.caches = {policy: RangeSearchCache(2 * self.size, policy) for policy in ("lru", "lfu")}
+
+	def test_eviction(self):
+		"""Test that the least recently or least frequently used entry is evicted."""
+		for policy, cache in self.caches.items():
+			with self.subTest(policy=policy):
+				cache.put(b"a", self.results)
+				cache.put(b"b", self.results)
+				self.assertIs(self.results, cache.get(b"a"))
+				self.assertIs(self.results, cache.get(b"a"))
+				self.assertIs(self.results, cache.get(b"b"))
+				cache.put(b"c", self.results)
+				# lru evicts "a", used before "b"; lfu evicts "b", used once against twice
+				self.assertEqual(policy == "lfu", b"a" in cache)
+				self.assertEqual(policy == "lru", b"b" in cache)
+				self.assertIsNone(cache.get(b"d"))
+				self.assertEqual(2 * self.size, cache.bytes)
+				self.assertEqual({"hits": 3, "misses": 1, "evictions": 1}, {
+					name: cache.to_dict()[name] for name in ("hits", "misses", "evictions")
+				})
+				self.assertEqual(0.75, cache.hit_rate)
+
+	def test_budget(self):
+		"""Test that results larger than the budget are not cached and replaced entries are not counted twice."""
+		cache = self.caches["lru"]
+		cache.put(b"a", frozenset(str(i) for i in range(100)))
+		self.assertEqual(0, len(cache))
+		cache.put(b"a", self.results)
+		cache.put(b"a", self.results)
+		self.assertEqual((1, self.size, 0), (len(cache), cache.bytes, cache.evictions))
+		with self.assertRaises(ValueError):
+			RangeSearchCache(policy="fifo")
+
+	def test_invalidate(self):
+		"""Test that only the prefixes of a key are invalidated."""
+		for policy, cache in self.caches.items():
+			with self.subTest(policy=policy):
+				cache.max_bytes = 10 * self.size
+				for prefix in [b"", b"c", b"ca", b"cb", b"car"]:
+					cache.put(prefix, self.results)
+				self.assertEqual(3, cache.invalidate(b"cat"))
+				self.assertEqual([b"cb", b"car"], [prefix for prefix in [b"", b"c", b"ca", b"cb", b"car"] if prefix in cache])
+				self.assertEqual(entry_size(b"cb", self.results) + entry_size(b"car", self.results), cache.bytes)
+				self.assertEqual(3, cache.invalidations)
+
+
+class TestCachedTrie(unittest.TestCase):
+
+	def test_range_search(self):
+		"""Test that cached range searches stay correct across mutations."""
+		for trie_class in (PrefixTrie, PatriciaTrie):
+			with self.subTest(trie_class=trie_class.__name__):
+				trie = trie_class()
+				trie.insert_many(["car", "card", "care", "dog"])
+				cache = trie.enable_cache(policy="lfu")
+				self.assertIs(cache, trie.enable_cache())
+				self.assertEqual({"car", "card", "care"}, trie.range_search("ca"))
+				results = trie.range_search(b"ca")
+				self.assertEqual((1, 1), (cache.hits, cache.misses))
+				results.add("cow")  # the caller gets a copy
+				self.assertEqual({"car", "card", "care"}, trie.range_search("ca"))
+				self.assertEqual({"dog"}, trie.range_search("d"))
+
+				trie.insert("car", 1)  # an existing key keeps the cached results
+				self.assertEqual(0, cache.invalidations)
+				trie.insert("cart")
+				self.assertEqual({"car", "card", "care", "cart"}, trie.range_search("ca"))
+				self.assertIn(b"d", cache)
+				self.assertFalse(trie.remove("cab"))
+				trie["cab"] = 2
+				del trie["card"]
+				self.assertEqual({"cab", "car", "care", "cart"}, trie.range_search("ca"))
+				self.assertEqual(2, cache.invalidations)
+
+				trie.clear()
+				self.assertEqual(set(), trie.range_search("ca"))
+				trie.disable_cache()
+				self.assertIsNone(trie.cache)
+
+	def test_persistent_and_concurrent(self):
+		"""Test invalidation through path copying, and that concurrent tries refuse the cache."""
+		trie = PatriciaTrie()
+		trie.insert_many(["car", "cat"])
+		trie.enable_cache()
+		self.assertEqual({"car", "cat"}, trie.range_search("c"))
+		snapshot = trie.snapshot()
+		trie.remove("cat")
+		self.assertEqual({"car"}, trie.range_search("c"))
+		trie.insert("car", 1)
+		self.assertEqual(1, trie.cache.invalidations)
+		trie.insert("cab")
+		self.assertEqual({"cab", "car"}, trie.range_search("c"))
+		snapshot.enable_cache()
+		self.assertEqual({"car", "cat"}, snapshot.range_search("c"))
+		with self.assertRaises(TypeError):
+			ConcurrentPatriciaTrie().enable_cache()
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,105 @@
+import random
+import sys
+import unittest
+
+from trie import PrefixTrie, PatriciaTrie
+from trie.children import CHILD_MAPS, AdaptiveChildMap, ArrayChildMap, ChildMap, SortedChildMap, resolve_child_map
+
+
+class TestChildMaps(unittest.TestCase):
+
+	def test_matches_dict(self):
+		"""Test every representation against a plain dictionary under random insertions and removals."""
+		rng = random.Random(42)
+		for name, child_map in CHILD_MAPS.items():
+			with self.subTest(child_map=name):
+				children, expected = child_map(), {}
+				for _ in range(3000):
+					key = rng.randrange(256) if rng.random() < 0.5 else rng.randrange(64)
+					if rng.random() < 0.6:
+						node = object()
+						self.assertEqual(key not in expected, children.set(key, node))
+						expected[key] = node
+					else:
+						self.assertIs(expected.pop(key, None), children.pop(key))
+					self.assertEqual(len(expected), len(children))
+				self.assertEqual(sorted(expected.items()), list(children.items()))
+				for key in range(256):
+					self.assertIs(expected.get(key), children.get(key))
+
+	def test_abstract(self):
+		"""Test that a child map must implement the abstract methods to be instantiated."""
+		with self.assertRaises(TypeError):
+			ChildMap()
+
+		class Incomplete(ChildMap):
+			def get(self, key: int):
+				return None
+
+		with self.assertRaises(TypeError):
+			Incomplete()
+
+	def test_copy(self):
+		"""Test that a copy can be modified without affecting the original, in every layout."""
+		for name, child_map in CHILD_MAPS.items():
+			for size in [0, 10, 30, 100]:
+				with self.subTest(child_map=name, size=size):
+					children = child_map()
+					for key in range(size):
+						children.set(key, object())
+					expected = list(children.items())
+					copy = children.copy()
+					self.assertEqual(expected, list(copy.items()))
+					copy.set(200, object())
+					copy.pop(0)
+					self.assertEqual(expected, list(children.items()))
+					self.assertEqual(size, len(children))
+
+	def test_adaptive_layouts(self):
+		"""Test that the adaptive map grows and shrinks through its layouts."""
+		children = AdaptiveChildMap()
+		nodes = {key: object() for key in range(256)}
+		for key in range(256):
+			children.set(key, nodes[key])
+			if key + 1 == AdaptiveChildMap.SMALL_CAPACITY:
+				self.assertEqual(0, children._layout())
+			elif key + 1 == AdaptiveChildMap.MEDIUM_CAPACITY:
+				self.assertEqual(1, children._layout())
+		self.assertEqual(2, children._layout())
+		for key in range(255, 0, -1):
+			self.assertIs(nodes[key], children.pop(key))
+		self.assertEqual(0, children._layout())
+		self.assertEqual([(0, nodes[0])], list(children.items()))
+
+	def test_sorted_leaf_is_compact(self):
+		"""Test that a childless sorted map is much smaller than the 256-slot array."""
+		self.assertLess(sys.getsizeof(SortedChildMap()) * 10, sys.getsizeof(ArrayChildMap()))
+
+	def test_resolve(self):
+		"""Test resolving representations by name and by class."""
+		self.assertIs(SortedChildMap, resolve_child_map("sorted"))
+		self.assertIs(AdaptiveChildMap, resolve_child_map(AdaptiveChildMap))
+		with self.assertRaises(ValueError):
+			resolve_child_map("nope")
+		with self.assertRaises(TypeError):
+			resolve_child_map(dict)
+
+	def test_tries_with_every_representation(self):
+		"""Test that both tries behave the same with every representation."""
+		words = ["bacon", "baking", "make", "making", "pancake", "pancakes", "", "b"]
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			for name in CHILD_MAPS:
+				with self.subTest(trie=trie_class.__name__, child_map=name):
+					trie = trie_class(name)
+					for word in words:
+						trie.insert(word)
+					for word in words:
+						self.assertIsNotNone(trie.search(word))
+					self.assertEqual({"bacon", "baking", "b"}, trie.range_search("b"))
+					trie.remove("pancake")
+					self.assertIsNone(trie.search("pancake"))
+					self.assertEqual({"pancakes"}, trie.range_search("pan"))
+
+
+if __name__ == "__main__":
+	unittest.main()
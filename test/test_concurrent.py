@@ -0,0 +1,173 @@
+import random
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from trie import ConcurrentPatriciaTrie
+
+
+class TestConcurrentPatriciaTrie(unittest.TestCase):
+	"""
+	Stress tests of the concurrent Patricia trie from a thread pool.
+	They rely on no property of the GIL, so they also exercise free-threaded builds (python3.13t).
+	"""
+
+	APPENDERS = 3
+	MIXED_WRITERS = 3
+	READERS = 4
+	OPERATIONS = 1500
+
+	def setUp(self):
+		"""Make thread switches as frequent as possible to provoke interleavings."""
+		self.switch_interval = sys.getswitchinterval()
+		sys.setswitchinterval(1e-6)
+
+	def tearDown(self):
+		sys.setswitchinterval(self.switch_interval)
+
+	def assert_invariants(self, trie: ConcurrentPatriciaTrie):
+		"""Check the Patricia trie invariants of the current version."""
+		stack = [(trie.root, True)]
+		count = 0
+		while stack:
+			node, is_root = stack.pop()
+			count += node.terminal
+			if not is_root:
+				self.assertTrue(node.terminal or node.num_children >= 2)
+			for b, child in node.children.items():
+				self.assertEqual(b, child.s[child.p])
+				self.assertGreaterEqual(child.l, 1)
+				stack.append((child, False))
+		self.assertEqual(len(trie), count)
+
+	def test_mixed_operations(self):
+		"""
+		Test mixed inserts, removes and searches from a thread pool against sequential models.
+		Appenders insert increasing keys of their own stream, so every reader must see a prefix of each stream,
+		and never a shorter prefix than it has already seen. Mixed writers insert and remove their own keys,
+		so their results must match a sequential dictionary exactly. Stable keys must always be visible.
+		"""
+		for child_map in ["sorted", "adaptive"]:
+			with self.subTest(child_map=child_map):
+				trie = ConcurrentPatriciaTrie(child_map)
+				stable = {f"stable-{i:03d}": i for i in range(50)}
+				for key, value in stable.items():
+					trie[key] = value
+				done = threading.Event()
+
+				def append(stream: int) -> int:
+					for n in range(self.OPERATIONS):
+						trie.insert(f"a{stream}-{n:05d}", n)
+					return self.OPERATIONS
+
+				def mix(writer: int) -> dict:
+					rng = random.Random(writer)
+					model = {}
+					for n in range(self.OPERATIONS):
+						# Short keys sharing prefixes force edge splits and merges along the same paths
+						key = f"m{writer}-" + "".join(rng.choice("ab") for _ in range(rng.randrange(1, 6)))
+						operation = rng.random()
+						if operation < 0.5:
+							trie[key] = n
+							model[key] = n
+						elif operation < 0.8:
+							self.assertEqual(key in model, trie.remove(key))
+							model.pop(key, None)
+						else:
+							self.assertEqual(model.get(key), trie.get(key))
+					return model
+
+				def read(reader: int) -> int:
+					rng = random.Random(-reader)
+					seen = [0] * self.APPENDERS
+					reads = 0
+					while not done.is_set() or reads == 0:
+						stream = rng.randrange(self.APPENDERS)
+						keys = list(trie.iter_prefix(f"a{stream}-"))
+						self.assertEqual([f"a{stream}-{n:05d}" for n in range(len(keys))], keys)
+						self.assertGreaterEqual(len(keys), seen[stream])
+						seen[stream] = len(keys)
+						key = rng.choice(list(stable))
+						self.assertEqual(stable[key], trie.get(key))
+						self.assertEqual(set(stable), trie.range_search("stable-"))
+						reads += 1
+					return reads
+
+				with ThreadPoolExecutor(self.APPENDERS + self.MIXED_WRITERS + self.READERS) as executor:
+					readers = [executor.submit(read, reader) for reader in range(self.READERS)]
+					appenders = [executor.submit(append, stream) for stream in range(self.APPENDERS)]
+					writers = [executor.submit(mix, writer) for writer in range(self.MIXED_WRITERS)]
+					appended = [future.result() for future in appenders]
+					models = [future.result() for future in writers]
+					done.set()
+					for future in readers:
+						self.assertGreater(future.result(), 0)
+
+				expected = dict(stable)
+				for stream, count in enumerate(appended):
+					expected.update({f"a{stream}-{n:05d}": n for n in range(count)})
+				for model in models:
+					expected.update(model)
+				self.assertEqual(expected, dict(trie.items()))
+				self.assert_invariants(trie)
+
+	def test_snapshot_pagination(self):
+		"""Test that paginating a snapshot is consistent while writers keep changing the trie."""
+		trie = ConcurrentPatriciaTrie()
+		for n in range(0, 2000, 2):
+			trie.insert(f"{n:05d}")
+		snapshot = trie.snapshot()
+		expected = list(snapshot)
+
+		def write(offset: int):
+			for n in range(offset, 2000, 4):
+				trie.insert(f"{n:05d}")
+				trie.remove(f"{n - 1:05d}")
+
+		def paginate(_: int) -> list:
+			pages, cursor = [], None
+			while True:
+				page = list(snapshot.iter_prefix("", limit=50, start_after=cursor))
+				if not page:
+					return pages
+				pages += page
+				cursor = page[-1]
+
+		with ThreadPoolExecutor(4) as executor:
+			writers = [executor.submit(write, offset) for offset in [1, 3]]
+			readers = [executor.submit(paginate, reader) for reader in range(2)]
+			for future in readers:
+				self.assertEqual(expected, future.result())
+			for future in writers:
+				future.result()
+		self.assertEqual(1000, len(snapshot))
+		self.assert_invariants(trie)
+
+	def test_compound_operations(self):
+		"""Test that holding the lock makes read-modify-write updates atomic."""
+		trie = ConcurrentPatriciaTrie()
+
+		def increment(_: int):
+			for _ in range(500):
+				with trie.lock:
+					trie["counter"] = trie.get("counter", 0) + 1
+
+		with ThreadPoolExecutor(4) as executor:
+			list(executor.map(increment, range(4)))
+		self.assertEqual(2000, trie["counter"])
+
+	def test_weighted(self):
+		"""Test that cached maximum weights stay correct across path copies."""
+		trie = ConcurrentPatriciaTrie(weighted=True)
+		for word, weight in [("the", 100), ("that", 60), ("this", 80), ("there", 50), ("then", 50), ("to", 90)]:
+			trie.insert(word, weight=weight)
+		self.assertEqual(["the", "to", "this"], trie.top_k("t", 3))
+		trie.remove("the")
+		trie.insert("then", weight=200)
+		self.assertEqual(["then", "to", "this"], trie.top_k("t", 3))
+		self.assertEqual(["then", "there"], trie.top_k("the", 5))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from trie import FrozenPatriciaTrie, PatriciaTrie, PrefixTrie, load
+
+
+class TestFrozenPatriciaTrie(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up a temporary directory for the saved tries."""
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, "trie.bin")
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_save_and_load(self):
+		"""Test that a loaded trie answers the same queries as the saved one, with and without mmap."""
+		words = ["hello", "help", "hell", "helium", "world", "", "héllo", "a\x00b"]
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			trie = trie_class()
+			for i, word in enumerate(words):
+				trie.insert(word, {"rank": i} if i % 2 else None)
+			trie.save(self.path)
+			for use_mmap in [True, False]:
+				with self.subTest(trie=trie_class.__name__, mmap=use_mmap), load(self.path, mmap=use_mmap) as frozen:
+					self.assertIsInstance(frozen, FrozenPatriciaTrie)
+					self.assertEqual(len(trie), len(frozen))
+					self.assertEqual(list(trie), list(frozen))
+					self.assertEqual(dict(trie.items()), dict(frozen.items()))
+					self.assertIsNotNone(frozen.search("hell"))
+					self.assertIsNone(frozen.search("hel"))
+					self.assertIsNone(frozen.search("helloo"))
+					self.assertIn("a\x00b", frozen)
+					self.assertNotIn(b"a", frozen)
+					self.assertNotIn(1, frozen)
+					self.assertEqual({"rank": 1}, frozen["help"])
+					with self.assertRaises(KeyError):
+						frozen["he"]
+					self.assertEqual({"hello", "help", "hell", "helium"}, frozen.range_search("he"))
+					self.assertEqual(set(), frozen.range_search("x"))
+					self.assertEqual(["helium", "hell"], list(frozen.iter_prefix("hel", limit=2)))
+					self.assertEqual(["help"], list(frozen.iter_prefix("hel", start_after="helm")))
+
+	def test_freeze(self):
+		"""Test freezing a trie in memory, independently of later changes to the trie."""
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			with self.subTest(trie=trie_class.__name__):
+				trie = trie_class()
+				for word in ["pancake", "pancakes", "pan", "bacon", "baking"]:
+					trie.insert(word, len(word))
+				frozen = trie.freeze()
+				trie.remove("pan")
+				trie.insert("panda")
+
+				self.assertEqual(["bacon", "baking", "pan", "pancake", "pancakes"], list(frozen))
+				self.assertEqual({"pan", "pancake", "pancakes"}, frozen.range_search("pan"))
+				self.assertEqual(3, frozen["pan"])
+				self.assertIsNone(frozen.search("panda"))
+				self.assertEqual(["pan", "pancake"], frozen.prefixes_of("pancaked"))
+				self.assertEqual(("pancakes", 8), frozen.longest_prefix_item("pancakes!"))
+				self.assertIsNone(frozen.longest_prefix("pa"))
+				self.assertEqual(3, frozen.count_prefix("pan"))
+				self.assertEqual(2, frozen.rank("pan"))
+				self.assertEqual("pancakes", frozen.select(-1))
+				self.assertEqual("baking", frozen.floor("bakingx"))
+				self.assertEqual("pancake", frozen.ceiling("pancak"))
+				self.assertEqual(["baking", "pan"], frozen.keys_between("bakin", "pan"))
+				self.assertEqual("int32", frozen.array("child_start").dtype.name)
+				self.assertEqual(7, frozen.node_count)  # "", "bacon"/"baking" split, "pan", "cake", "s"
+
+				frozen.save(self.path)
+				with load(self.path) as loaded:
+					self.assertEqual(dict(frozen.items()), dict(loaded.items()))
+
+	def test_batch_lookups(self):
+		"""Test batch lookups against single lookups, for lists and NumPy arrays of keys."""
+		words = ["hello", "help", "hell", "helium", "world", "", "héllo"]
+		queries = ["hello", "he", "hel", "help", "helpful", "", "x", "héllo", "héll", "worlds", "world"]
+		for trie_class in [PrefixTrie, PatriciaTrie]:
+			trie = trie_class()
+			for i, word in enumerate(words):
+				trie.insert(word, i)
+			frozen = trie.freeze()
+			expected = [query in trie for query in queries]
+			for keys in [queries, np.array(queries), np.array([query.encode() for query in queries])]:
+				with self.subTest(trie=trie_class.__name__, keys=type(keys).__name__):
+					self.assertEqual(expected, frozen.contains_many(keys).tolist())
+			nodes = frozen.search_many(queries)
+			self.assertEqual([frozen.search(query) for query in queries], [node if node >= 0 else None for node in nodes])
+			self.assertEqual([trie.get(query, -1) for query in queries], frozen.get_many(queries, -1))
+			self.assertEqual((0,), frozen.contains_many([]).shape)
+
+	def test_batch_lookups_trailing_nul(self):
+		"""Test that keys ending in NUL are found from lists and object arrays, and stripped by fixed-width arrays."""
+		trie = PatriciaTrie(key_type=bytes)
+		trie.insert(b"ab\x00", 1)
+		frozen = trie.freeze()
+		queries = [b"ab\x00", b"ab"]
+		self.assertEqual([True, False], frozen.contains_many(queries).tolist())
+		self.assertEqual([True, False], frozen.contains_many(np.array(queries, dtype=object)).tolist())
+		self.assertEqual([False, False], frozen.contains_many(np.array(queries)).tolist())  # both read as b"ab"
+
+	def test_bytes_and_weights(self):
+		"""Test that the key type and the weights survive a round trip."""
+		trie = PatriciaTrie(key_type=bytes, weighted=True)
+		for word, weight in [(b"the", 100), (b"that", 60), (b"this", 80), (b"to", 90), (b"\xff\x00", 5)]:
+			trie.insert(word, weight=weight)
+		trie.save(self.path)
+		with load(self.path) as frozen:
+			self.assertIs(bytes, frozen.key_type)
+			self.assertEqual([b"the", b"to", b"this"], frozen.top_k(b"t", 3))
+			self.assertEqual(trie.top_k("th", 5), frozen.top_k("th", 5))
+			self.assertIn(b"\xff\x00", frozen)
+
+	def test_empty_trie(self):
+		"""Test saving and loading an empty trie."""
+		PatriciaTrie().save(self.path)
+		with load(self.path) as frozen:
+			self.assertEqual(0, len(frozen))
+			self.assertEqual([], list(frozen))
+			self.assertIsNone(frozen.search(""))
+			with self.assertRaises(ValueError):
+				frozen.top_k("", 1)
+
+	def test_invalid_file(self):
+		"""Test that a file in another format is rejected."""
+		with open(self.path, "wb") as file:
+			file.write(b"not a trie" * 100)
+		with self.assertRaises(ValueError):
+			load(self.path, mmap=False)
+
+
+if __name__ == "__main__":
+	unittest.main()
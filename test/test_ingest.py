@@ -0,0 +1,68 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from trie.ingest import deduplicate, detect_compression, normalize, read_keys
+from trie.patricia import PatriciaTrie
+
+
+class TestIngest(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up a word list with Windows line endings, invalid UTF-8 and no final newline."""
+		self.temporary_directory = tempfile.TemporaryDirectory()
+		self.data = b"apple\r\n Banana \n\nh\xc3\xa9llo\nbad\xff\napple"
+		self.path = self.write("words.txt", self.data)
+
+	def tearDown(self):
+		self.temporary_directory.cleanup()
+
+	def write(self, name: str, data: bytes) -> str:
+		"""Write a file into the temporary directory and return its path."""
+		path = os.path.join(self.temporary_directory.name, name)
+		with open(path, "wb") as file:
+			file.write(data)
+		return path
+
+	def test_read_keys(self):
+		"""Test that every reader yields the lines without their terminators."""
+		expected = ["apple", " Banana ", "", "héllo", "bad\udcff", "apple"]
+		gzip_path = self.write("words.txt.gz", gzip.compress(self.data))
+		self.assertIsNone(detect_compression(self.path))
+		self.assertEqual("gzip", detect_compression(gzip_path))
+		for path, kwargs in [
+			(self.path, {}), (self.path, {"mmap": True}), (self.path, {"buffer_size": 4}), (gzip_path, {}),
+			(gzip_path, {"compression": "gzip"}),
+		]:
+			with self.subTest(path=os.path.basename(path), **kwargs):
+				self.assertEqual(expected, list(read_keys(path, **kwargs)))
+		self.assertEqual(b"bad\xff", list(read_keys(self.path, bytes))[4])
+		self.assertEqual([], list(read_keys(self.write("empty.txt", b""), mmap=True)))
+
+	def test_read_keys_errors(self):
+		"""Test that invalid combinations of options are rejected."""
+		gzip_path = self.write("words.txt.gz", gzip.compress(self.data))
+		with self.assertRaises(ValueError):
+			list(read_keys(gzip_path, mmap=True))
+		with self.assertRaises(ValueError):
+			list(read_keys(self.path, compression="bz2"))
+		with self.assertRaises(TypeError):
+			list(read_keys(self.path, int))
+
+	def test_normalize_and_deduplicate(self):
+		"""Test the cleaning stages and loading their output into a trie."""
+		keys = list(normalize(read_keys(self.path), lower=True))
+		self.assertEqual(["apple", "banana", "héllo", "bad\udcff", "apple"], keys)
+		self.assertEqual(["apple", "banana", "héllo", "bad\udcff"], list(deduplicate(keys)))
+		self.assertEqual(["a", "b", "a"], list(deduplicate(["a", "a", "b", "b", "a"], presorted=True)))
+		self.assertEqual(["\u00e9"], list(normalize(["e\u0301"], form="NFC")))  # a combining accent is composed
+		self.assertEqual([" x", ""], list(normalize([" x", ""], strip=False, skip_empty=False)))
+
+		trie = PatriciaTrie()
+		self.assertEqual(4, trie.insert_many(normalize(read_keys(self.path), lower=True)))
+		self.assertEqual(["apple", "bad\udcff", "banana", "héllo"], list(trie))
+
+
+if __name__ == "__main__":
+	unittest.main()
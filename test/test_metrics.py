@@ -0,0 +1,120 @@
+import random
+import unittest
+
+from trie.metrics import Histogram, TrieMetrics
+from trie.patricia import PatriciaTrie
+from trie.prefix import PrefixTrie
+
+
+class TestHistogram(unittest.TestCase):
+
+	def test_percentiles(self):
+		"""Test that percentiles are exact for small values and within the relative error above."""
+		histogram = Histogram()
+		for value in range(1, 11):
+			histogram.record(value)
+		self.assertEqual(5, histogram.percentile(50))
+		self.assertEqual(10, histogram.percentile(100))
+		self.assertEqual(1, histogram.percentile(0))
+		self.assertEqual(5.5, histogram.mean)
+
+		histogram = Histogram()
+		values = [random.Random(0).randrange(10 ** 9) for _ in range(1000)]
+		for value in values:
+			histogram.record(value)
+		values.sort()
+		for p in (50, 90, 99):
+			exact = values[int(len(values) * p / 100) - 1]
+			self.assertAlmostEqual(1, histogram.percentile(p) / exact, delta=1 / 16)
+		self.assertEqual(values[-1], histogram.percentile(100))
+		self.assertEqual(1000, histogram.count_at_most(2 ** 30))
+		self.assertEqual(sum(value <= 2 ** 28 for value in values), histogram.count_at_most(2 ** 28))
+
+	def test_powers_of_two(self):
+		"""Test that values equal to a power of two are counted in its inclusive Prometheus bucket."""
+		metrics = TrieMetrics()
+		for k in (3, 6, 10):
+			histogram = Histogram()
+			histogram.record(2 ** k)
+			self.assertEqual((0, 1), (histogram.count_at_most(2 ** k - 1), histogram.count_at_most(2 ** k)))
+			self.assertEqual(2 ** k, histogram.percentile(100))
+			metrics.nodes_visited["search"].record(2 ** k)
+		metrics.latency["search"].record(2 ** 20)
+		text = metrics.to_prometheus()
+		for le, count in [("4", 0), ("8", 1), ("32", 1), ("64", 2), ("512", 2), ("1024", 3)]:
+			self.assertIn(f'trie_nodes_visited_bucket{{operation="search",le="{le}"}} {count}\n', text)
+		for bound, count in [(2 ** 19, 0), (2 ** 20, 1)]:
+			self.assertIn(f'trie_operation_latency_seconds_bucket{{operation="search",le="{bound * 1e-9:g}"}} {count}\n', text)
+
+	def test_empty(self):
+		"""Test an empty histogram."""
+		histogram = Histogram()
+		self.assertEqual(0, histogram.percentile(99))
+		self.assertEqual(0, histogram.summary()["max"])
+		with self.assertRaises(ValueError):
+			histogram.percentile(101)
+
+
+class TestTrieMetrics(unittest.TestCase):
+
+	def test_patricia_metrics(self):
+		"""Test operation counters, nodes visited, and edge splits and merges, in place and by path copying."""
+		trie = PatriciaTrie()
+		self.assertIsNone(trie.metrics)
+		metrics = trie.enable_metrics()
+		self.assertIs(metrics, trie.enable_metrics())
+		for word in ["car", "cat", "cart"]:  # "cat" splits "car"
+			trie.insert(word)
+		trie["dog"] = 1
+		self.assertIsNotNone(trie.search("cart"))
+		self.assertEqual({"car", "cart"}, trie.range_search("car"))
+		self.assertTrue(trie.remove("cat"))  # "ca" is merged with "r"
+		trie.snapshot()
+		trie.insert("cab")  # splits "car" by path copying
+		trie.remove("cab")  # and merges it back
+		self.assertEqual(0, trie.get("missing", 0))
+
+		self.assertEqual({"insert": 5, "remove": 2, "search": 1, "get": 1, "range_search": 1}, {
+			operation: count for operation, count in metrics.operations.items() if count
+		})
+		self.assertEqual((2, 2), (metrics.edge_splits, metrics.edge_merges))
+		self.assertEqual(4, metrics.nodes_visited["search"].max)  # root, "ca", "r", "t"
+		self.assertEqual(4, metrics.nodes_visited["range_search"].max)  # root, "ca", "r", then "t" below
+		self.assertEqual(5, metrics.latency["insert"].count)
+		exported = metrics.to_dict()
+		self.assertEqual(1, exported["latency_seconds"]["search"]["count"])
+		self.assertNotIn("top_k", exported["latency_seconds"])
+
+		text = metrics.to_prometheus(labels={"trie": "words"})
+		self.assertIn('trie_operations_total{trie="words",operation="insert"} 5\n', text)
+		self.assertIn('trie_edge_splits_total{trie="words"} 2\n', text)
+		self.assertIn('trie_operation_latency_seconds_count{trie="words",operation="insert"} 5\n', text)
+		self.assertIn('trie_nodes_visited_bucket{trie="words",operation="search",le="+Inf"} 1\n', text)
+
+		trie.disable_metrics()
+		self.assertIsNone(trie.metrics)
+		trie.insert("cow")
+		self.assertEqual(5, metrics.operations["insert"])
+
+	def test_prefix_metrics(self):
+		"""Test that nodes visited count one node per byte in a prefix trie, and the subtrees of range searches."""
+		trie = PrefixTrie()
+		metrics = trie.enable_metrics()
+		trie.insert("héllo")
+		trie.search("help")
+		self.assertEqual(7, metrics.nodes_visited["insert"].max)  # the root and one node per byte
+		self.assertEqual(2, metrics.nodes_visited["search"].max)  # root, "h", then no "e" below
+		trie.search("héllo")
+		self.assertEqual(7, metrics.nodes_visited["search"].max)
+		trie.insert("hey")
+		self.assertEqual({"héllo", "hey"}, trie.range_search("h"))
+		self.assertEqual(9, metrics.nodes_visited["range_search"].max)  # root, "h", and the 7 nodes below
+		trie.enable_cache()
+		trie.range_search("h")
+		trie.range_search("h")
+		self.assertEqual(0, metrics.nodes_visited["range_search"].min)  # answered from the cache
+		self.assertEqual(0, metrics.edge_splits)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,50 @@
+import fnmatch
+import random
+import re
+import unittest
+
+from trie.pattern import compile_pattern
+
+
+def accepts(pattern: str, s: str, regex: bool = False) -> bool:
+	"""Run the automaton of a pattern over a string."""
+	automaton = compile_pattern(pattern, regex)
+	state = automaton.start
+	for c in s:
+		state = automaton.step(state, ord(c))
+	return automaton.accepts(state)
+
+
+class TestPattern(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up random strings over a small alphabet."""
+		rng = random.Random(7)
+		self.strings = {"".join(rng.choice("abc.é") for _ in range(rng.randrange(6))) for _ in range(200)}
+
+	def test_glob(self):
+		"""Test glob patterns against fnmatch."""
+		for pattern in ["", "*", "a*", "*a", "a?c", "**b", "[ab]*", "[!a]*", "[a-c]?", "[]a]", "*.*", "[é]", "[a"]:
+			for s in self.strings | {"]", "[a"}:
+				self.assertEqual(fnmatch.fnmatchcase(s, pattern), accepts(pattern, s), (pattern, s))
+
+	def test_regex(self):
+		"""Test regular expressions against re.fullmatch."""
+		patterns = [
+			"", "a*", "(a|b)+c?", "[^a]*", "a{2}", "a{1,3}b", "a{2,}", "(ab|c)*", r"\.", ".*é", r"\w+", r"[\w.]*",
+			"^a.*$", "(?:a|)b", "a|b|", "((a*)*b)*", "[a-c]{0,2}", "a{,2}",
+		]
+		for pattern in patterns:
+			compiled = re.compile(pattern)
+			for s in self.strings | {"a{,2}"}:
+				self.assertEqual(bool(compiled.fullmatch(s)), accepts(pattern, s, regex=True), (pattern, s))
+
+	def test_invalid(self):
+		"""Test that invalid regular expressions are rejected."""
+		for pattern in ["(a", "a)", "*a", "[a", "a\\", "[b-a]", "a{3,1}"]:
+			with self.assertRaises(ValueError, msg=pattern):
+				compile_pattern(pattern, regex=True)
+
+
+if __name__ == "__main__":
+	unittest.main()
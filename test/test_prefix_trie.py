@@ -79,7 +79,7 @@ class TestPrefixTrie(unittest.TestCase):
 		self.assertTrue(root.is_leaf())  # Root is initially a leaf
 
 		# Add a child and check again
-		child = root.insert("a")
+		child = root.insert(ord("a"))
 		self.assertFalse(root.is_leaf())
 		self.assertTrue(child.is_leaf())
 
@@ -116,6 +116,276 @@ class TestPrefixTrie(unittest.TestCase):
 		results = self.trie.range_search("nope")
 		self.assertEqual(set(), results)
 
+	def test_unicode_keys(self):
+		"""Test keys with code points beyond one byte."""
+		words = ["čaj", "čajnik", "中文", "中", "😀", "cafe", "café"]
+		for word in words:
+			self.trie.insert(word)
+		for word in words:
+			self.assertIsNotNone(self.trie.search(word))
+		self.assertIsNone(self.trie.search("ča"))
+		self.assertEqual({"čaj", "čajnik"}, self.trie.range_search("č"))
+		self.assertEqual({"中文", "中"}, self.trie.range_search("中"))
+		self.assertEqual({"cafe", "café"}, self.trie.range_search("caf"))
+		self.assertTrue(self.trie.remove("中"))
+		self.assertEqual({"中文"}, self.trie.range_search("中"))
+
+	def test_null_character_keys(self):
+		"""Test that keys containing chr(0) do not collide with other keys."""
+		self.trie.insert("a" + chr(0))
+		self.assertIsNone(self.trie.search("a"))
+		self.assertIsNotNone(self.trie.search("a" + chr(0)))
+		self.trie.insert("a")
+		self.assertTrue(self.trie.remove("a" + chr(0)))
+		self.assertIsNotNone(self.trie.search("a"))
+		self.assertEqual({"a"}, self.trie.range_search(""))
+
+	def test_bytes_keys(self):
+		"""Test a trie with raw bytes keys."""
+		trie = PrefixTrie(key_type=bytes)
+		keys = [b"\x00\xff", b"\x00", b"\xff\xfe\xfd", b"abc"]
+		for key in keys:
+			trie.insert(key)
+		for key in keys:
+			self.assertIsNotNone(trie.search(key))
+		self.assertEqual({b"\x00\xff", b"\x00"}, trie.range_search(b"\x00"))
+		self.assertEqual({b"abc"}, trie.range_search("ab"))
+		with self.assertRaises(TypeError):
+			trie.insert(42)
+
+	def test_mapping_api(self):
+		"""Test the trie as a mutable mapping with values on terminal nodes."""
+		self.trie["help"] = 1
+		self.trie["hello"] = 2
+		self.trie.insert("hell", 3)
+		self.trie["help"] = 4  # replacing a value does not change the size
+		self.assertEqual(3, len(self.trie))
+		self.assertEqual(4, self.trie["help"])
+		self.assertEqual(3, self.trie.get("hell"))
+		self.assertIsNone(self.trie.get("hel"))
+		self.assertIn("hello", self.trie)
+		self.assertNotIn("hel", self.trie)
+		self.assertNotIn(42, self.trie)
+		with self.assertRaises(KeyError):
+			_ = self.trie["hel"]
+		self.assertEqual(["hell", "hello", "help"], list(self.trie))
+		self.assertEqual([("hell", 3), ("hello", 2), ("help", 4)], list(self.trie.items()))
+		self.assertEqual({"hell": 3, "hello": 2, "help": 4}, dict(self.trie))
+
+		del self.trie["hell"]
+		self.assertEqual(2, len(self.trie))
+		with self.assertRaises(KeyError):
+			del self.trie["hell"]
+		self.assertEqual(2, self.trie.pop("hello"))
+		self.assertEqual([4], list(self.trie.values()))
+		self.trie.clear()
+		self.assertEqual(0, len(self.trie))
+		self.assertIsNone(self.trie.search("help"))
+
+	def test_iter_prefix(self):
+		"""Test lazy, ordered and paginated iteration over strings with a given prefix."""
+		for word in ["hello", "help", "hell", "helium", "he", "world", "hel"]:
+			self.trie.insert(word)
+
+		self.assertEqual(["hel", "helium", "hell", "hello", "help"], list(self.trie.iter_prefix("hel")))
+		self.assertEqual(["help", "hello", "hell"], list(self.trie.iter_prefix("hel", limit=3, reverse=True)))
+		self.assertEqual(["he", "hel"], list(self.trie.iter_prefix("h", limit=2)))
+		self.assertEqual([], list(self.trie.iter_prefix("nope")))
+		self.assertEqual([], list(self.trie.iter_prefix("hel", limit=0)))
+
+		# Paginate with the last string of every page as the cursor
+		pages, cursor = [], None
+		while True:
+			page = list(self.trie.iter_prefix("", limit=3, start_after=cursor))
+			if not page:
+				break
+			pages.append(page)
+			cursor = page[-1]
+		self.assertEqual([["he", "hel", "helium"], ["hell", "hello", "help"], ["world"]], pages)
+		self.assertEqual(["hell", "helium", "hel"], list(self.trie.iter_prefix("hel", start_after="hello", reverse=True)))
+		self.assertEqual(["help"], list(self.trie.iter_prefix("hel", start_after="helm")))
+
+	def test_top_k(self):
+		"""Test top-k completions of a weighted trie, with weights updated and removed."""
+		trie = PrefixTrie(weighted=True)
+		for word, weight in [("the", 100), ("that", 60), ("this", 80), ("there", 50), ("then", 50), ("to", 90)]:
+			trie.insert(word, weight=weight)
+
+		self.assertEqual(["the", "to", "this"], trie.top_k("t", 3))
+		self.assertEqual(["the", "this"], trie.top_k("th", 2))
+		self.assertEqual(["the", "then", "there"], trie.top_k("the", 10))
+		self.assertEqual([], trie.top_k("x", 3))
+		self.assertEqual([], trie.top_k("t", 0))
+
+		trie.insert("then", weight=200)  # raising a weight
+		self.assertEqual(["then", "the"], trie.top_k("", 2))
+		trie.insert("then", weight=1)  # lowering a weight
+		self.assertEqual(["the", "to"], trie.top_k("", 2))
+		trie["the"] = "value"  # replacing the value keeps the weight
+		self.assertEqual(["the"], trie.top_k("the", 1))
+		trie.remove("the")
+		self.assertEqual(["to", "this", "that"], trie.top_k("", 3))
+
+		with self.assertRaises(ValueError):
+			self.trie.top_k("t", 3)
+		with self.assertRaises(ValueError):
+			self.trie.insert("t", weight=1)
+
+	def test_from_sorted(self):
+		"""Test bulk construction from sorted and unsorted input."""
+		words = ["pancakes", "bacon", "pancake", "baking", "making", "", "pan", "bacon"]
+		expected = PrefixTrie()
+		for word in words:
+			expected.insert(word)
+
+		trie = PrefixTrie.from_sorted(sorted(words))
+		self.assertEqual(list(expected), list(trie))
+		self.assertEqual(len(expected), len(trie))
+		trie.remove("pan")
+		self.assertEqual({"pancake", "pancakes"}, trie.range_search("pan"))
+
+		trie = PrefixTrie.from_sorted(words, presorted=False, chunk_size=3)
+		self.assertEqual(list(expected), list(trie))
+		with self.assertRaises(ValueError):
+			PrefixTrie.from_sorted(words)
+
+		trie = PrefixTrie.from_sorted([("a", 1, 5), ("ab", 2, 9), ("b", 3, 7)], weighted=True)
+		self.assertEqual(2, trie["ab"])
+		self.assertEqual(["ab", "b", "a"], trie.top_k("", 3))
+
+
+	def test_fuzzy_search(self):
+		"""Test searches within an edit distance, of whole strings and of prefixes."""
+		for word in ["hello", "help", "hell", "helium", "yellow", "world", "héllo", ""]:
+			self.trie.insert(word)
+
+		self.assertEqual([("hello", 0)], self.trie.fuzzy_search("hello", 0))
+		self.assertEqual([("hell", 1), ("hello", 0), ("héllo", 1)], self.trie.fuzzy_search("hello", 1))
+		self.assertEqual(
+			[("hell", 1), ("hello", 0), ("help", 2), ("héllo", 1), ("yellow", 2)], self.trie.fuzzy_search("hello", 2)
+		)
+		self.assertEqual([("", 2), ("hell", 2), ("help", 2)], self.trie.fuzzy_search("he", 2))
+		self.assertEqual([], self.trie.fuzzy_search("xyz", 1))
+
+		self.assertEqual(
+			[("helium", 1), ("hell", 1), ("hello", 1), ("help", 1), ("héllo", 1)], self.trie.fuzzy_prefix_search("hxl", 1)
+		)
+		self.assertEqual(
+			[("helium", 1), ("hell", 0), ("hello", 0), ("help", 1), ("héllo", 1), ("yellow", 1)],
+			self.trie.fuzzy_prefix_search("hell", 1)
+		)
+		with self.assertRaises(ValueError):
+			self.trie.fuzzy_search("hello", -1)
+
+
+
+	def test_longest_prefix(self):
+		"""Test longest-prefix match and all prefixes of a query."""
+		for word, value in [("/", 0), ("/api", 1), ("/api/users", 2), ("/apiary", 3), ("/about", 4)]:
+			self.trie.insert(word, value)
+
+		self.assertEqual("/api/users", self.trie.longest_prefix("/api/users/42"))
+		self.assertEqual("/api", self.trie.longest_prefix("/api/orders"))
+		self.assertEqual("/api", self.trie.longest_prefix("/api"))
+		self.assertEqual("/api", self.trie.longest_prefix("/apia"))
+		self.assertEqual("/", self.trie.longest_prefix("/apple"))
+		self.assertEqual(("/api/users", 2), self.trie.longest_prefix_item("/api/users/42"))
+		self.assertEqual(["/", "/api", "/api/users"], self.trie.prefixes_of("/api/users/42"))
+		self.assertEqual(["/"], self.trie.prefixes_of("/ab"))
+		self.assertIsNone(self.trie.longest_prefix("api"))
+		self.assertEqual([], self.trie.prefixes_of(""))
+
+		self.trie.insert("")
+		self.assertEqual("", self.trie.longest_prefix("api"))
+		self.assertEqual([""], self.trie.prefixes_of(""))
+
+	def test_order_statistics(self):
+		"""Test rank, select, floor, ceiling, prefix counts and ordered range queries."""
+		words = ["apple", "app", "apply", "banana", "band", "bandana", "can", ""]
+		for word in words:
+			self.trie.insert(word)
+		ordered = sorted(words)
+
+		self.assertEqual(list(range(len(ordered))), [self.trie.rank(word) for word in ordered])
+		self.assertEqual(ordered, [self.trie.select(i) for i in range(len(ordered))])
+		self.assertEqual("can", self.trie.select(-1))
+		with self.assertRaises(IndexError):
+			self.trie.select(len(ordered))
+		self.assertEqual(4, self.trie.rank("apz"))
+		self.assertEqual(8, self.trie.rank("d"))
+
+		self.assertEqual("apply", self.trie.floor("apz"))
+		self.assertEqual("band", self.trie.floor("band"))
+		self.assertEqual("", self.trie.floor("a"))
+		self.assertEqual("banana", self.trie.ceiling("apz"))
+		self.assertEqual("app", self.trie.ceiling("ap"))
+		self.assertIsNone(self.trie.ceiling("d"))
+
+		self.assertEqual(3, self.trie.count_prefix("app"))
+		self.assertEqual(3, self.trie.count_prefix("ban"))
+		self.assertEqual(2, self.trie.count_prefix("band"))
+		self.assertEqual(8, self.trie.count_prefix(""))
+		self.assertEqual(0, self.trie.count_prefix("x"))
+
+		self.assertEqual(["apply", "banana", "band"], self.trie.keys_between("apply", "band"))
+		self.assertEqual(["banana", "band"], self.trie.keys_between("apz", "bandaid"))
+		self.assertEqual(["", "app"], self.trie.keys_between(hi="app"))
+		self.assertEqual(["bandana", "can"], self.trie.keys_between("bandana"))
+		self.assertEqual([], self.trie.keys_between("c", "b"))
+
+		# The counts follow removals
+		self.trie.remove("band")
+		self.trie.remove("app")
+		self.assertEqual(1, self.trie.count_prefix("band"))
+		self.assertEqual(2, self.trie.count_prefix("app"))
+		self.assertEqual("banana", self.trie.floor("band"))
+		self.assertEqual(["", "apple", "apply", "banana", "bandana", "can"], [self.trie.select(i) for i in range(6)])
+
+	def test_insert_many(self):
+		"""Test inserting keys, pairs and triples from an iterator."""
+		self.trie.insert("car", 0)
+		added = self.trie.insert_many(iter(["card", b"care", ("car", 1), ("cat", 2, None), "card"]))
+		self.assertEqual(3, added)
+		self.assertEqual({"car": 1, "card": None, "care": None, "cat": 2}, dict(self.trie.items()))
+		self.assertEqual(0, self.trie.insert_many([]))
+		with self.assertRaises(ValueError):
+			self.trie.insert_many([("cow", 1, 2, 3)])
+
+	def test_stats(self):
+		"""Test the node counts, depths and size estimate of the trie."""
+		for word in ["car", "cat", "card", "care"]:
+			self.trie.insert(word)
+		stats = self.trie.stats()
+		self.assertEqual(4, stats["keys"])
+		# root - c - a - r - d, with "t" and "e" below "ca" and "r"
+		self.assertEqual(7, stats["nodes"])
+		self.assertEqual(3, stats["leaves"])
+		self.assertEqual(6, stats["label_bytes"])
+		self.assertEqual(0, stats["string_bytes"])
+		self.assertEqual({3: 2, 4: 2}, stats["depth_histogram"])
+		self.assertEqual({0: 3, 1: 2, 2: 2}, stats["branching_histogram"])
+		self.assertEqual(3.5, stats["average_depth"])
+		self.assertEqual(4, stats["max_depth"])
+		self.assertGreater(stats["bytes"], 0)
+		self.assertEqual(stats["bytes"] / 4, stats["bytes_per_key"])
+
+	def test_match(self):
+		"""Test glob and regular expression matching of whole strings."""
+		for word in ["bacon", "bacn", "bcn", "boston", "bcon", "beacon", "", "bé", "bèn"]:
+			self.trie.insert(word)
+
+		self.assertEqual(["bacn", "bacon"], self.trie.match("b?c*n"))
+		self.assertEqual(["bcn", "bcon"], self.trie.match("bc*"))
+		self.assertEqual(["bèn", "bé"], self.trie.match("b[éè]*"))
+		self.assertEqual(["", "bacn", "bacon", "bcn", "bcon", "beacon", "boston", "bèn", "bé"], self.trie.match("*"))
+		self.assertEqual(["bacon", "beacon"], self.trie.match(r"b(e|)acon", regex=True))
+		self.assertEqual(["bacn", "bcn"], self.trie.match(r"b[a-c]{1,2}n", regex=True))
+		self.assertEqual(["bé"], self.trie.match(r"b\w", regex=True))
+		self.assertEqual([], self.trie.match("x*"))
+		with self.assertRaises(ValueError):
+			self.trie.match("(b", regex=True)
+
+
 
 if __name__ == "__main__":
 	unittest.main()
@@ -0,0 +1,68 @@
+import ipaddress
+import unittest
+
+from trie.routing import RoutingTable, address_key, decode_network, network_key
+
+
+class TestRoutingTable(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up a routing table with nested IPv4 and IPv6 routes."""
+		self.table = RoutingTable({
+			"0.0.0.0/0": "default",
+			"10.0.0.0/8": "a",
+			"10.1.0.0/16": "b",
+			"10.1.2.0/24": "c",
+			"192.168.1.128/25": "d",
+			"2001:db8::/32": "e",
+			"2001:db8:1::/48": "f",
+		})
+
+	def test_keys(self):
+		"""Test the binary encoding of networks and addresses."""
+		self.assertEqual(b"4" + b"00001010", network_key("10.0.0.0/8"))
+		self.assertEqual(b"4", network_key("0.0.0.0/0"))
+		self.assertEqual(33, len(address_key("10.1.2.3")))
+		self.assertEqual(129, len(address_key("::1")))
+		for network in ["10.1.0.0/16", "0.0.0.0/0", "::/0", "2001:db8::/32", "::1/128"]:
+			self.assertEqual(ipaddress.ip_network(network), decode_network(network_key(network)))
+		with self.assertRaises(ValueError):
+			network_key("10.1.0.0/8")  # host bits set
+
+	def test_lookup(self):
+		"""Test longest-prefix match lookups."""
+		self.assertEqual("c", self.table.lookup("10.1.2.3"))
+		self.assertEqual("b", self.table.lookup("10.1.3.3"))
+		self.assertEqual("a", self.table.lookup("10.200.0.1"))
+		self.assertEqual("default", self.table.lookup("8.8.8.8"))
+		self.assertEqual("d", self.table.lookup("192.168.1.200"))
+		self.assertEqual("default", self.table.lookup("192.168.1.100"))
+		self.assertEqual("f", self.table.lookup("2001:db8:1::1"))
+		self.assertEqual("e", self.table.lookup("2001:db8:2::1"))
+		self.assertIsNone(self.table.lookup("2001:db9::1"))  # no IPv6 default route
+		self.assertEqual("none", self.table.lookup("::1", "none"))
+
+		self.assertEqual((ipaddress.ip_network("10.1.0.0/16"), "b"), self.table.route("10.1.3.3"))
+		self.assertIsNone(self.table.route("::1"))
+		self.assertEqual(["default", "a", "b", "c"], [value for _, value in self.table.routes("10.1.2.3")])
+
+	def test_mapping_api(self):
+		"""Test adding and removing routes."""
+		self.assertEqual(7, len(self.table))
+		self.assertIn("10.1.0.0/16", self.table)
+		self.assertNotIn("10.2.0.0/16", self.table)
+		self.assertNotIn("not a network", self.table)
+		self.assertEqual("b", self.table["10.1.0.0/16"])
+
+		self.assertTrue(self.table.remove("10.1.2.0/24"))
+		self.assertFalse(self.table.remove("10.1.2.0/24"))
+		self.assertEqual("b", self.table.lookup("10.1.2.3"))
+		del self.table["0.0.0.0/0"]
+		self.assertIsNone(self.table.lookup("8.8.8.8"))
+		self.table[ipaddress.ip_network("8.0.0.0/8")] = "g"
+		self.assertEqual("g", self.table.lookup("8.8.8.8"))
+		self.assertEqual(ipaddress.ip_network("8.0.0.0/8"), next(iter(self.table)))
+
+
+if __name__ == "__main__":
+	unittest.main()
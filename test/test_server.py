@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from trie.patricia import PatriciaTrie
+from trie.server import TrieClient, TrieServer, TrieServerError
+
+
+class TestTrieServer(unittest.IsolatedAsyncioTestCase):
+
+	async def asyncSetUp(self):
+		"""Start a server over a Patricia trie and connect a client to it."""
+		self.trie = PatriciaTrie()
+		self.server = TrieServer(self.trie)
+		host, port = await self.server.start_tcp()
+		self.client = await TrieClient.connect(host, port)
+
+	async def asyncTearDown(self):
+		await self.client.close()
+		await self.server.close()
+
+	async def test_operations(self):
+		"""Test every operation of the protocol."""
+		await self.client.insert("hello", 1)
+		await self.client.insert("help", {"rank": 2})
+		await self.client.insert("world")
+
+		self.assertTrue(await self.client.search("hello"))
+		self.assertFalse(await self.client.search("hel"))
+		self.assertEqual({"rank": 2}, await self.client.get("help"))
+		self.assertIsNone(await self.client.get("world", -1))
+		self.assertEqual(-1, await self.client.get("missing", -1))
+		self.assertEqual(["hello", "help"], await self.client.range_search("hel"))
+		self.assertEqual(["hello"], await self.client.range_search("", limit=1))
+		self.assertTrue(await self.client.remove("help"))
+		self.assertFalse(await self.client.remove("help"))
+		self.assertEqual(["hello", "world"], sorted(self.trie))
+
+	async def test_concurrent_requests(self):
+		"""Test that pipelined requests from several clients are batched and answered correctly."""
+		words = [f"word{i}" for i in range(500)]
+		await asyncio.gather(*(self.client.insert(word, i) for i, word in enumerate(words)))
+		host, port = self.server._servers[0].sockets[0].getsockname()[:2]
+		other_client = await TrieClient.connect(host, port)
+		try:
+			values = await asyncio.gather(*(
+				(self.client if i % 2 else other_client).get(word) for i, word in enumerate(words)
+			))
+		finally:
+			await other_client.close()
+		self.assertEqual(list(range(len(words))), values)
+		self.assertEqual(len(words), len(self.trie))
+
+	async def test_errors(self):
+		"""Test that failed requests raise errors without breaking the connection."""
+		with self.assertRaises(TrieServerError):
+			await self.client._request("unknown")
+		with self.assertRaises(TrieServerError):
+			await self.client._request("search")  # missing key
+		with self.assertRaises(TypeError):
+			await self.client.insert("key", {1, 2})  # not serializable as JSON
+		self.assertFalse(await self.client.search("key"))
+
+	async def test_line_too_long(self):
+		"""Test that a request line over the limit gets an error response and closes only its connection."""
+		server = TrieServer(self.trie, max_line_length=256)
+		host, port = await server.start_tcp()
+		try:
+			async with await TrieClient.connect(host, port) as client:
+				await client.insert("short")
+				with self.assertRaisesRegex(TrieServerError, "longer than 256 bytes"):
+					await client.insert("x" * 1000)
+				with self.assertRaises(ConnectionError):
+					await client.search("short")
+			reader, writer = await asyncio.open_connection(host, port)
+			writer.write(b"y" * 1000 + b"\n")
+			self.assertIsNone(json.loads(await reader.readline())["id"])
+			self.assertEqual(b"", await reader.readline())
+			writer.close()
+			async with await TrieClient.connect(host, port) as client:
+				self.assertTrue(await client.search("short"))
+		finally:
+			await server.close()
+
+	async def test_unix_socket(self):
+		"""Test serving over a Unix socket."""
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, "trie.sock")
+			await self.server.start_unix(path)
+			async with await TrieClient.connect_unix(path) as client:
+				await client.insert("unix")
+				self.assertTrue(await self.client.search("unix"))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+from trie.sharded import ShardedTrie, _raise
+
+
+class TestShardedTrie(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up a sharded trie with a few worker processes, holding the keys below c, from c to d, and from d."""
+		self.trie = ShardedTrie(boundaries=["c", "d"])
+
+	def tearDown(self):
+		self.trie.close()
+
+	def test_batched_operations(self):
+		"""Test that batched operations return their results in the order of the keys."""
+		words = ["apple", "banana", "cherry", "date", "elderberry", "fig", "grape", "", "héllo"]
+		self.assertEqual(len(words), self.trie.insert_many((word, i) for i, word in enumerate(words)))
+		self.assertEqual(1, self.trie.insert_many(["kiwi", ("apple", 0, None)]))  # apple is replaced
+
+		self.assertEqual(len(words) + 1, len(self.trie))
+		queries = ["fig", "missing", "apple", "", "héllo", "kiwi"]
+		self.assertEqual([True, False, True, True, True, True], self.trie.contains_many(queries))
+		self.assertEqual([5, -1, 0, 7, 8, None], self.trie.get_many(queries, -1))
+		self.assertEqual([(5, None), None], self.trie.search_many(["fig", "missing"]))
+		self.assertEqual([True, False, False], self.trie.remove_many(["fig", "fig", "missing"]))
+		self.assertEqual(len(words), len(self.trie))
+
+	def test_prefix_queries(self):
+		"""Test prefix queries within one shard and across all shards."""
+		words = ["car", "card", "care", "cat", "dog", "door", "dot", "a", "ab"]
+		self.trie.insert_many(words)
+
+		self.assertEqual(["car", "card", "care", "cat"], list(self.trie.iter_prefix("ca")))
+		self.assertEqual({"door"}, self.trie.range_search("doo"))
+		self.assertEqual(sorted(words), list(self.trie))  # spans all shards, merged in order
+		self.assertEqual(sorted(words)[:4], list(self.trie.iter_prefix("", limit=4)))
+		self.assertEqual(set(), self.trie.range_search("x"))
+
+	def test_partitioning(self):
+		"""Test that the shards hold contiguous ranges of keys, and that a prefix reaches only the shards it overlaps."""
+		self.assertEqual(3, self.trie.num_shards)
+		self.assertEqual([0, 0, 1, 1, 2, 2], [self.trie._shard(s) for s in [b"", b"bz", b"c", b"cz", b"d", b"\xff"]])
+		self.assertEqual(range(1, 2), self.trie._prefix_shards(b"ca"))
+		self.assertEqual(range(1, 2), self.trie._prefix_shards(b"c"))
+		self.assertEqual(range(0, 1), self.trie._prefix_shards(b"b\xff"))
+		self.assertEqual(range(2, 3), self.trie._prefix_shards(b"\xff"))
+		self.assertEqual(range(0, 3), self.trie._prefix_shards(b""))
+
+		self.assertEqual([b"b", b"d"], ShardedTrie.split_points(["a", "ab", "b", "ba", "d", "da"], 3))
+		self.assertEqual([b"ab"], ShardedTrie.split_points(["aa", "ab", "ac"], 2, prefix_length=2))
+		self.assertEqual([b"a"], ShardedTrie.split_points(["a", "a", "a"], 4))  # too few distinct prefixes
+		with self.assertRaises(ValueError):
+			ShardedTrie(boundaries=["b", "a"])
+		with self.assertRaises(ValueError):
+			ShardedTrie(num_shards=2, boundaries=["b", "c"])
+		with ShardedTrie(num_shards=2) as trie:
+			self.assertEqual([b"\x80"], trie.boundaries)
+
+	def test_mapping_api(self):
+		"""Test single-key access."""
+		self.trie["one"] = 1
+		self.trie.insert(b"two", None)
+		self.assertEqual(1, self.trie["one"])
+		self.assertIsNone(self.trie["two"])
+		self.assertIn("two", self.trie)
+		self.assertNotIn(3, self.trie)
+		with self.assertRaises(KeyError):
+			_ = self.trie["three"]
+		del self.trie["one"]
+		with self.assertRaises(KeyError):
+			del self.trie["one"]
+		self.trie["three"] = 3
+		self.assertEqual([("three", 3), ("two", None)], list(self.trie.items()))
+		self.assertIn(("three", 3), self.trie.items())
+		self.assertEqual({("three", 3), ("two", None)}, self.trie.items() & {("three", 3), ("two", None), ("x", 0)})
+		self.assertEqual([3, None], list(self.trie.values()))
+		self.assertEqual({"three": 3, "two": None}, dict(self.trie))
+		self.trie.clear()
+		self.assertEqual(0, len(self.trie))
+
+	def test_weighted(self):
+		"""Test that weights of (key, value, weight) triples reach the shards of a weighted trie."""
+		with ShardedTrie(num_shards=2, weighted=True) as trie:
+			self.assertEqual(2, trie.insert_many([("a", 1, 2.5), "b"]))
+			trie.insert("a", 3)  # keeps the weight
+			self.assertEqual([(3, 2.5), (None, 0), None], trie.search_many(["a", "b", "c"]))
+		with self.assertRaises(ValueError):  # like an unweighted Trie
+			self.trie.insert_many([("a", 1, 2.5)])
+		with self.assertRaises(ValueError):
+			self.trie.insert_many([("a", 1, 2.5, 0)])
+
+	def test_worker_errors(self):
+		"""Test that an error in a worker is raised again by the front-end and leaves the worker running."""
+		with self.assertRaises(KeyError):
+			self.trie._call({0: ("unknown", ())})
+		with self.assertRaisesRegex(RuntimeError, "UnpicklingError: bad data"):
+			_raise("UnpicklingError", "bad data")  # not a built-in exception
+		self.trie.insert_many(["word"])
+		self.assertIn("word", self.trie)
+
+	def test_close(self):
+		"""Test that a closed trie refuses requests."""
+		self.trie.close()
+		with self.assertRaises(ValueError):
+			self.trie.insert("word")
+
+
+if __name__ == "__main__":
+	unittest.main()
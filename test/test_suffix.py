@@ -0,0 +1,64 @@
+import random
+import unittest
+
+import numpy as np
+
+from trie import SuffixIndex
+from trie.suffix import lcp_array, suffix_array
+
+
+class TestSuffixIndex(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up a suffix index of a few words."""
+		self.words = ["banana", "bandana", "cabana", "ananas", "", "naïve", "banana"]
+		self.index = SuffixIndex(self.words)
+
+	def test_suffix_array(self):
+		"""Test the suffix and LCP arrays against sorting the suffixes directly."""
+		rng = random.Random(3)
+		for _ in range(50):
+			text = [rng.randrange(3) for _ in range(rng.randrange(1, 30))]
+			sa = suffix_array(np.array(text))
+			self.assertEqual(sorted(range(len(text)), key=lambda i: text[i:]), sa.tolist())
+			lcp = lcp_array(np.array(text), sa)
+			for r in range(1, len(text)):
+				a, b = text[sa[r - 1]:], text[sa[r]:]
+				h = 0
+				while h < min(len(a), len(b)) and a[h] == b[h]:
+					h += 1
+				self.assertEqual(h, lcp[r])
+
+	def test_substring_search(self):
+		"""Test searching for the keys containing a substring."""
+		self.assertEqual({"banana", "bandana", "cabana", "ananas"}, self.index.substring_search("ana"))
+		self.assertEqual({"banana", "ananas"}, self.index.substring_search("anan"))
+		self.assertEqual({"naïve"}, self.index.substring_search("ïv"))
+		self.assertEqual(set(), self.index.substring_search("xyz"))
+		self.assertEqual(set(self.words), self.index.substring_search(""))
+		self.assertEqual(6, len(self.index))
+		self.assertIn("", self.index)
+		self.assertNotIn("ban", self.index)
+
+	def test_occurrences(self):
+		"""Test the offsets of the occurrences, counted in code points."""
+		self.assertEqual(
+			[("banana", 1), ("banana", 3), ("bandana", 4), ("cabana", 3), ("ananas", 0), ("ananas", 2)],
+			self.index.occurrences("ana")
+		)
+		self.assertEqual([("naïve", 3)], self.index.occurrences("ve"))
+		self.assertEqual([("naïve".encode(), 2)], SuffixIndex(self.words, key_type=bytes).occurrences("ïv".encode())[:1])
+
+	def test_incremental(self):
+		"""Test that adding keys one by one builds the same index as the linear construction."""
+		index = SuffixIndex()
+		for word in self.words:
+			index.add(word)
+		self.assertEqual(list(self.index), list(index))
+		self.assertEqual(list(self.index.trie.items()), list(index.trie.items()))
+		for q in ["a", "an", "ana", "nas", "bandana", "ï", "e", "z"]:
+			self.assertEqual(self.index.occurrences(q), index.occurrences(q))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+
+from trie.prefix import PrefixTrie
+from trie.wal import DurableTrie, WAL_MAGIC, read_log
+
+
+class TestDurableTrie(unittest.TestCase):
+
+	def setUp(self):
+		"""Set up an empty directory for the snapshot and the log."""
+		self.temporary_directory = tempfile.TemporaryDirectory()
+		self.directory = self.temporary_directory.name
+
+	def tearDown(self):
+		self.temporary_directory.cleanup()
+
+	def crash(self, trie: DurableTrie):
+		"""Drop a durable trie without closing it, like a crashed process."""
+		trie._file.close()
+		trie._file = None
+
+	def test_recovery(self):
+		"""Test that reopening a directory replays the log, for every fsync policy."""
+		for fsync in ("always", "batch", "never"):
+			with self.subTest(fsync=fsync):
+				directory = os.path.join(self.directory, fsync)
+				trie = DurableTrie(directory, fsync=fsync)
+				trie.insert("apple", 1)
+				trie["banana"] = 2
+				trie.insert(b"h\xc3\xa9llo", [3])
+				self.assertTrue(trie.remove("apple"))
+				self.assertFalse(trie.remove("cherry"))
+				self.crash(trie)
+
+				recovered = DurableTrie(directory, fsync=fsync)
+				self.assertEqual({"banana": 2, "héllo": [3]}, dict(recovered.items()))
+				recovered.clear()
+				recovered.insert("fig")
+				recovered.close()
+				with DurableTrie(directory) as recovered:
+					self.assertEqual(["fig"], list(recovered))
+
+	def test_torn_tail(self):
+		"""Test that recovery stops at a torn or corrupt record and truncates it."""
+		trie = DurableTrie(self.directory)
+		for i, word in enumerate(["car", "card", "care"]):
+			trie.insert(word, i)
+		trie.close()
+		path = os.path.join(self.directory, "wal-0000000000.log")
+		with open(path, "r+b") as file:  # tear the last record
+			file.truncate(os.path.getsize(path) - 3)
+
+		trie = DurableTrie(self.directory)
+		self.assertEqual({"car": 0, "card": 1}, dict(trie.items()))
+		trie.insert("cat", 3)  # appended after the valid records
+		trie.close()
+		records, length = read_log(path)
+		self.assertEqual([b"car", b"card", b"cat"], [record[1] for record in records])
+		self.assertEqual(os.path.getsize(path), length)
+
+		with open(path, "r+b") as file:  # flip a byte of the last payload
+			file.seek(-1, os.SEEK_END)
+			last = file.read(1)
+			file.seek(-1, os.SEEK_END)
+			file.write(bytes([last[0] ^ 0xFF]))
+		with DurableTrie(self.directory) as trie:
+			self.assertEqual(["car", "card"], list(trie))
+
+	def test_checkpoint(self):
+		"""Test that checkpoints compact the log into a snapshot and recovery combines both."""
+		trie = DurableTrie(self.directory, PrefixTrie, checkpoint_every=3, weighted=True)
+		trie.insert("apple", 1, 5.0)
+		trie.insert("apricot", 2, 9.0)
+		trie.insert("banana", 3, 1.0)  # the third mutation triggers a checkpoint
+		self.assertEqual(1, trie.generation)
+		self.assertEqual(["snapshot-0000000001.bin", "wal-0000000001.log"], sorted(os.listdir(self.directory)))
+		self.assertEqual(len(WAL_MAGIC), os.path.getsize(os.path.join(self.directory, "wal-0000000001.log")))
+		trie.remove("banana")
+		trie.insert("avocado", 4, 7.0)
+		self.crash(trie)
+		with open(os.path.join(self.directory, "snapshot-0000000002.bin.tmp"), "wb") as file:
+			file.write(b"interrupted")  # a checkpoint that crashed before its rename
+
+		trie = DurableTrie(self.directory, PrefixTrie, checkpoint_every=3, weighted=True)
+		self.assertEqual(["snapshot-0000000001.bin", "wal-0000000001.log"], sorted(os.listdir(self.directory)))
+		self.assertIsInstance(trie.trie, PrefixTrie)
+		self.assertEqual({"apple": 1, "apricot": 2, "avocado": 4}, dict(trie.items()))
+		self.assertEqual(["apricot", "avocado", "apple"], trie.trie.top_k("a", 3))
+
+		trie.checkpoint()
+		trie.close()
+		self.assertEqual(["snapshot-0000000002.bin", "wal-0000000002.log"], sorted(os.listdir(self.directory)))
+		with DurableTrie(self.directory, PrefixTrie, weighted=True) as trie:
+			self.assertEqual(3, len(trie))
+
+	def test_short_writes(self):
+		"""Test that records are completed across short writes, and cut back if a write fails."""
+		class ShortWriter:  # writes at most 3 bytes per call, and nothing once its budget is spent
+			def __init__(self, file):
+				self.file, self.budget = file, None
+
+			def write(self, data):
+				size = 3 if self.budget is None else min(3, self.budget)
+				if self.budget is not None:
+					self.budget -= size
+				return self.file.write(data[:size]) if size else 0
+
+			def __getattr__(self, name):
+				return getattr(self.file, name)
+
+		trie = DurableTrie(self.directory, fsync="always")
+		trie._file = ShortWriter(trie._file)
+		trie.insert("apple", 1)
+		trie.insert("banana", 2)
+		trie._file.budget = 5  # part of the record is written before the write fails
+		with self.assertRaises(OSError):
+			trie.insert("cherry", 3)
+		self.assertNotIn("cherry", trie)
+		trie._file.budget = None
+		trie.insert("date", 4)
+		trie.close()
+		with DurableTrie(self.directory) as trie:
+			self.assertEqual({"apple": 1, "banana": 2, "date": 4}, dict(trie.items()))
+
+	def test_errors(self):
+		"""Test that invalid mutations are rejected before they are logged."""
+		trie = DurableTrie(self.directory)
+		with self.assertRaises(ValueError):
+			trie.insert("apple", weight=1.0)  # not weighted
+		with self.assertRaises(TypeError):
+			trie.insert(1)
+		with self.assertRaises(KeyError):
+			del trie["missing"]
+		trie.close()
+		self.assertEqual([], read_log(os.path.join(self.directory, "wal-0000000000.log"))[0])
+		with self.assertRaises(ValueError):
+			trie.insert("apple")
+		with self.assertRaises(ValueError):
+			DurableTrie(self.directory, fsync="sometimes")
+
+
+if __name__ == "__main__":
+	unittest.main()
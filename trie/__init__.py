@@ -1,4 +1,17 @@
-from .patricia import PatriciaTrie, PatriciaTrieNode
-from .prefix import PrefixTrie, PrefixTrieNode
+from .base import Trie
+from .children import ChildMap, ArrayChildMap, DictChildMap, SortedChildMap, AdaptiveChildMap
+from .concurrent import ConcurrentPatriciaTrie
+from .frozen import FrozenPatriciaTrie, load
+from .patricia import PatriciaTrie, PatriciaTrieNode, PatriciaTrieSnapshot, WeightedPatriciaTrieNode
+from .prefix import PrefixTrie, PrefixTrieNode, WeightedPrefixTrieNode
+from .routing import RoutingTable
+from .sharded import ShardedTrie
+from .suffix import SuffixIndex
+from .wal import DurableTrie
 
-__all__ = ["PrefixTrie", "PrefixTrieNode", "PatriciaTrie", "PatriciaTrieNode"]
+__all__ = [
+	"Trie", "PrefixTrie", "PrefixTrieNode", "PatriciaTrie", "PatriciaTrieNode", "PatriciaTrieSnapshot",
+	"WeightedPrefixTrieNode", "WeightedPatriciaTrieNode",
+	"ConcurrentPatriciaTrie", "FrozenPatriciaTrie", "load", "DurableTrie", "RoutingTable", "ShardedTrie", "SuffixIndex",
+	"ChildMap", "ArrayChildMap", "DictChildMap", "SortedChildMap", "AdaptiveChildMap",
+]
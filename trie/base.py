@@ -0,0 +1,764 @@
+import os
+import sys
+from abc import abstractmethod
+from collections import Counter
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Any, Iterable, Iterator, Optional, Self, Union
+
+from .bulk import DEFAULT_CHUNK_SIZE, sorted_records, to_records
+from .cache import DEFAULT_CACHE_BYTES, RangeSearchCache
+from .children import ChildMap, resolve_child_map
+from .frozen import FrozenPatriciaTrie, flatten, save
+from .keys import Key, check_key_type, decode_key, encode_key, pattern_characters
+from .metrics import INSTRUMENTED_OPERATIONS, TrieMetrics, instrument
+from .pattern import compile_pattern
+from .walk import NO_WEIGHT, automaton_walk, best_first, characters, fuzzy_walk, ordered_walk, rank_walk, select_walk
+
+
+class Trie(MutableMapping):
+	"""
+	Common base of the prefix trie and the Patricia trie.
+
+	A trie is a mutable mapping from keys to values, where every key is stored along a path of
+	byte-labelled edges and its value is kept on the terminal node at the end of the path.
+	Subclasses implement the node layout and the insert, remove and search operations as the abstract methods
+	of this class; everything that only walks the nodes is implemented here once.
+
+	Attributes:
+		root: the root node
+		child_map: the child map representation used by the nodes
+		key_type: the type of the keys returned by queries (str or bytes)
+		weighted: whether keys carry weights and nodes cache the maximum weight of their subtree
+		metrics: the metrics of the operations, None unless enabled with enable_metrics
+		cache: the cache of range search results, None unless enabled with enable_cache
+	"""
+
+	metrics: Optional[TrieMetrics] = None
+	cache: Optional[RangeSearchCache] = None
+
+	def __init__(self, child_map: Union[str, type[ChildMap]] = "sorted", key_type: type = str, weighted: bool = False):
+		"""
+		Initializes a trie.
+		:param child_map: the child map representation, either a name ("array", "dict", "sorted", "adaptive")
+			or a ChildMap subclass
+		:param key_type: the type of the keys returned by queries, str or bytes; both are accepted as input
+		:param weighted: whether keys carry weights, which enables top_k queries
+		"""
+		self.child_map = resolve_child_map(child_map)
+		self.key_type = check_key_type(key_type)
+		self.weighted = weighted
+		self.root = self._new_root()
+		self._size = 0
+
+	@classmethod
+	def from_sorted(
+			cls, items: Iterable, presorted: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs
+	) -> Self:
+		"""
+		Build a trie in a single linear pass from keys in sorted order.
+		The common prefix of every key with the previous one tells how much of the last inserted path is shared,
+		so no key is looked up from the root and no edge is split more than once.
+		If a key appears more than once, the last value and weight win.
+		:param items: keys, (key, value) pairs or (key, value, weight) triples, sorted by their encoded bytes
+			(which for str keys is the order of code points)
+		:param presorted: whether the items are already sorted; if not, they are sorted with an external merge sort
+		:param chunk_size: number of items sorted in memory at once, if the items have to be sorted
+		:param kwargs: arguments of the trie constructor
+		:return: the new trie
+		"""
+		trie = cls(**kwargs)
+		trie._load_sorted(sorted_records(items, presorted, chunk_size))
+		return trie
+
+	@abstractmethod
+	def _load_sorted(self, records: Iterator[tuple[bytes, Any, Optional[float], int]]):
+		"""
+		Fill an empty trie from sorted records.
+		:param records: (encoded key, value, weight, length of the common prefix with the previous key) tuples
+		"""
+
+	@abstractmethod
+	def _new_root(self):
+		"""
+		Create an empty root node.
+		:return: the root node
+		"""
+
+	@abstractmethod
+	def _search(self, q: bytes):
+		"""
+		Search for the node at which an encoded string ends, terminal or not, without creating nodes.
+		:param q: encoded string to search for
+		:return: the node corresponding to the string if it exists, None otherwise
+		"""
+
+	@abstractmethod
+	def _range_search(self, q: bytes) -> set[Key]:
+		"""
+		Search for all strings with a given encoded prefix, without the cache.
+		:param q: encoded prefix to search for
+		:return: set of strings with the given prefix
+		"""
+
+	@abstractmethod
+	def _edge_label(self, b: int, node) -> bytes:
+		"""
+		Get the label of the edge leading to a node.
+		:param b: the key of the node in its parent's child map
+		:param node: the node
+		:return: the edge label
+		"""
+
+	@abstractmethod
+	def _label_length(self, node) -> int:
+		"""
+		Get the length of the edge label leading to a node.
+		:param node: the node
+		:return: the number of bytes of the label, 0 for the root
+		"""
+
+	def _label_source(self, node) -> Optional[bytes]:
+		"""
+		Get the object the edge label of a node is read from, which nodes may share.
+		:param node: the node
+		:return: the object, None if the label is not stored apart from the child maps
+		"""
+		return None
+
+	def _locate(self, q: bytes) -> Optional[tuple[bytes, Any]]:
+		"""
+		Find the topmost node whose path starts with the given prefix.
+		If the prefix ends inside an edge, the node below that edge is returned.
+		:param q: encoded prefix to search for
+		:return: the path of the node and the node if the prefix exists, None otherwise
+		"""
+		p, l = 0, len(q)
+		path = q
+		current_node, visited = self.root, 1
+		while p < l:
+			b = q[p]
+			child_node = current_node.children.get(b)
+			if child_node is None:
+				current_node = None
+				break
+			visited += 1
+			label = self._edge_label(b, child_node)
+			if not q.startswith(label[:l - p], p):
+				current_node = None
+				break
+			if p + len(label) > l:  # the prefix ends inside the edge
+				path = q[:p] + label
+			p += len(label)
+			current_node = child_node
+		if self.metrics is not None:
+			self.metrics.visited += visited
+		return (path, current_node) if current_node is not None else None
+
+	def search(self, q: Key):
+		"""
+		Search for a string in the trie.
+		:param q: string to search for
+		:return: the final node of the string if it exists, None otherwise
+		"""
+		node = self._search(encode_key(q))
+		return node if node is not None and node.terminal else None
+
+	@abstractmethod
+	def insert(self, s: Key, value: Any = None, weight: Optional[float] = None):
+		"""
+		Insert a string into the trie, or replace the value of an existing one.
+		:param s: string to insert
+		:param value: value stored with the string
+		:param weight: weight of the string in a weighted trie; None keeps the current weight (0 for a new string)
+		"""
+
+	def insert_many(self, items: Iterable) -> int:
+		"""
+		Insert the keys of an iterable one at a time, without materializing it, such as a stream from trie.ingest.
+		Unlike from_sorted, the keys may come in any order and the trie need not be empty.
+		:param items: keys, (key, value) pairs or (key, value, weight) triples
+		:return: the number of keys that were not in the trie before
+		"""
+		size = len(self)
+		insert = self.insert
+		for s, value, weight in to_records(items):
+			insert(s, value, weight)
+		return len(self) - size
+
+	def _check_weight(self, weight: Optional[float]):
+		"""
+		Check that a weight is only given to a weighted trie.
+		:param weight: the weight passed to insert
+		"""
+		if weight is not None and not self.weighted:
+			raise ValueError(f"{type(self).__name__} is not weighted, create it with weighted=True to store weights")
+
+	@staticmethod
+	def _set_weight(node, weight: Optional[float], is_new: bool):
+		"""
+		Set the weight of a terminal node in a weighted trie.
+		:param node: the terminal node
+		:param weight: the new weight, None to keep the current one
+		:param is_new: whether the key of the node was just inserted
+		"""
+		if weight is not None:
+			node.weight = weight
+		elif is_new:
+			node.weight = 0
+
+	@staticmethod
+	def _compute_max_weight(node):
+		"""
+		Compute the cached maximum weight of a node from its own weight and its children.
+		:param node: the node, whose children are up to date
+		"""
+		max_weight = node.weight if node.terminal else NO_WEIGHT
+		for child in node.children.values():
+			if child.max_weight > max_weight:
+				max_weight = child.max_weight
+		node.max_weight = max_weight
+
+	@staticmethod
+	def _update_max_weights(node):
+		"""
+		Restore the cached maximum weights from a node whose subtree changed up to the root.
+		Stops as soon as a node's maximum does not change, since its ancestors are then up to date.
+		:param node: the lowest node whose subtree changed
+		"""
+		while node is not None:
+			max_weight = node.weight if node.terminal else NO_WEIGHT
+			for child in node.children.values():
+				if child.max_weight > max_weight:
+					max_weight = child.max_weight
+			if max_weight == node.max_weight:
+				return
+			node.max_weight = max_weight
+			node = node.parent
+
+	@staticmethod
+	def _update_counts(node, delta: int):
+		"""
+		Update the key counts of a node and its ancestors after a key was added to or removed from its subtree.
+		:param node: the node
+		:param delta: the change of the number of keys, 1 or -1
+		"""
+		while node is not None:
+			node.count += delta
+			node = node.parent
+
+	@abstractmethod
+	def remove(self, s: Key) -> bool:
+		"""
+		Remove a string from the trie.
+		:param s: string to remove
+		:return: True if the string was removed, False otherwise
+		"""
+
+	def _walk(
+			self, path: bytes, node, after: Optional[bytes] = None, reverse: bool = False
+	) -> Iterator[tuple[bytes, Any]]:
+		"""
+		Walk the subtree of a node depth-first, lazily, in lexicographic order of the keys.
+		Subtrees that lie entirely on the wrong side of the cursor are skipped without being visited.
+		:param path: the encoded path from the root to the node
+		:param node: the node to start from
+		:param after: encoded cursor; only keys after it (before it if reverse) are returned
+		:param reverse: walk in descending instead of ascending order
+		:return: iterator of (encoded key, terminal node) pairs
+		"""
+		return ordered_walk(path, node, self._edges, _is_terminal, after, reverse)
+
+	def _edges(self, node) -> list[tuple[bytes, Any]]:
+		"""
+		Get the outgoing edges of a node.
+		:param node: the node
+		:return: list of (edge label, child) pairs, in ascending order of the labels
+		"""
+		if self.metrics is not None:  # walks reach the children of the nodes they expand through here
+			self.metrics.visited += len(node.children)
+		edge_label = self._edge_label
+		return [(edge_label(b, child), child) for b, child in node.children.items()]
+
+	def range_search(self, q: Key) -> set[Key]:
+		"""
+		Search for all strings with a given prefix.
+		Once the cache is enabled, the results of repeated prefixes are copied from it instead of walking the subtree.
+		:param q: prefix to search for
+		:return: set of strings with the given prefix
+		"""
+		q = encode_key(q)
+		cache = self.cache
+		if cache is None:
+			return self._range_search(q)
+		results = cache.get(q)
+		if results is None:
+			results = frozenset(self._range_search(q))
+			cache.put(q, results)
+		return set(results)
+
+	def iter_prefix(
+			self, q: Key, limit: Optional[int] = None, start_after: Optional[Key] = None, reverse: bool = False
+	) -> Iterator[Key]:
+		"""
+		Lazily iterate over the strings with a given prefix, in lexicographic order.
+		Only the nodes needed for the returned strings are visited, so the first results are available
+		regardless of the size of the subtree, and iteration can be stopped at any point.
+		:param q: prefix to search for
+		:param limit: maximum number of strings to return, None for no limit
+		:param start_after: cursor for pagination; only strings after it (before it if reverse) are returned,
+			so passing the last string of a page returns the next page
+		:param reverse: iterate in descending instead of ascending order
+		:return: iterator of strings with the given prefix
+		"""
+		if limit is not None and limit < 0:
+			raise ValueError(f"limit must be non-negative, got {limit}")
+		located = self._locate(encode_key(q))
+		if located is None or limit == 0:
+			return
+		after = encode_key(start_after) if start_after is not None else None
+		key_type = self.key_type
+		for count, (path, _) in enumerate(self._walk(*located, after, reverse), 1):
+			yield decode_key(path, key_type)
+			if count == limit:
+				return
+
+	def top_k(self, q: Key, k: int) -> list[Key]:
+		"""
+		Get the k strings with the highest weights among those with a given prefix.
+		The search is best-first over the cached maximum weights of the subtrees, so it only expands
+		the nodes on the paths to the returned strings and their siblings.
+		Strings with equal weights are returned in lexicographic order.
+		:param q: prefix to search for
+		:param k: number of strings to return
+		:return: list of at most k strings, by descending weight
+		"""
+		if not self.weighted:
+			raise ValueError(f"{type(self).__name__} is not weighted, create it with weighted=True to use top_k")
+		if k < 0:
+			raise ValueError(f"k must be non-negative, got {k}")
+		located = self._locate(encode_key(q))
+		if located is None or k == 0:
+			return []
+		paths = best_first(*located, self._edges, _is_terminal, _weight, _max_weight, k)
+		return [decode_key(path, self.key_type) for path in paths]
+
+	def fuzzy_search(self, q: Key, max_distance: int) -> list[tuple[Key, int]]:
+		"""
+		Search for all strings within a Levenshtein distance of a query.
+		The edit distance table is computed along the edges of the trie, so the shared prefixes of the strings are
+		only compared once, and subtrees that cannot contain a match are skipped.
+		Distances count code points for str keys and bytes for bytes keys.
+		:param q: the query
+		:param max_distance: the maximum number of inserted, deleted or substituted characters
+		:return: list of (string, distance) pairs, in lexicographic order
+		"""
+		return self._fuzzy_search(q, max_distance, False)
+
+	def fuzzy_prefix_search(self, q: Key, max_distance: int) -> list[tuple[Key, int]]:
+		"""
+		Search for all strings with a prefix within a Levenshtein distance of a query, as for autocompletion of
+		a misspelled prefix.
+		:param q: the query
+		:param max_distance: the maximum number of inserted, deleted or substituted characters
+		:return: list of (string, smallest distance between the query and a prefix of the string) pairs,
+			in lexicographic order
+		"""
+		return self._fuzzy_search(q, max_distance, True)
+
+	def _fuzzy_search(self, q: Key, max_distance: int, prefix: bool) -> list[tuple[Key, int]]:
+		"""
+		Search for strings, or prefixes of strings, within a Levenshtein distance of a query.
+		:param q: the query
+		:param max_distance: the maximum edit distance
+		:param prefix: match prefixes of the strings instead of whole strings
+		:return: list of (string, distance) pairs, in lexicographic order
+		"""
+		if max_distance < 0:
+			raise ValueError(f"max_distance must be non-negative, got {max_distance}")
+		code_points = self.key_type is str
+		query = characters(encode_key(q), code_points)
+		key_type = self.key_type
+		return [
+			(decode_key(path, key_type), distance)
+			for path, _, distance in fuzzy_walk(
+				b"", self.root, self._edges, _is_terminal, query, max_distance, prefix, code_points
+			)
+		]
+
+	def match(self, pattern: Key, regex: bool = False) -> list[Key]:
+		"""
+		Search for all strings matching a glob pattern (such as "b?c*n") or a regular expression.
+		The pattern is compiled into an automaton that reads the edge labels during the walk,
+		so subtrees that cannot match are skipped. The whole string has to match, as with re.fullmatch.
+		Characters are code points for str keys and bytes for bytes keys.
+		:param pattern: the pattern (see trie.pattern.compile_pattern for the supported syntax)
+		:param regex: whether the pattern is a regular expression instead of a glob pattern
+		:return: list of matching strings, in lexicographic order
+		"""
+		automaton = compile_pattern(pattern_characters(pattern, self.key_type), regex)
+		key_type = self.key_type
+		return [
+			decode_key(path, key_type)
+			for path, _ in automaton_walk(b"", self.root, self._edges, _is_terminal, automaton, key_type is str)
+		]
+
+	def _prefix_nodes(self, q: bytes) -> Iterator[tuple[int, Any]]:
+		"""
+		Walk down the path of a string once, yielding the terminal nodes of the keys that are prefixes of it.
+		:param q: encoded string
+		:return: iterator of (length of the key, terminal node) pairs, shortest key first
+		"""
+		p, l = 0, len(q)
+		current_node, visited = self.root, 1
+		if current_node.terminal:
+			yield 0, current_node
+		while p < l:
+			b = q[p]
+			child_node = current_node.children.get(b)
+			if child_node is None:
+				break
+			visited += 1
+			label = self._edge_label(b, child_node)
+			if not q.startswith(label, p):
+				break
+			p += len(label)
+			current_node = child_node
+			if current_node.terminal:
+				yield p, current_node
+		if self.metrics is not None:
+			self.metrics.visited += visited
+
+	def prefixes_of(self, q: Key) -> list[Key]:
+		"""
+		Get all strings in the trie that are prefixes of a query, in a single walk down its path.
+		:param q: the query
+		:return: list of strings that are prefixes of the query (including the query itself), shortest first
+		"""
+		encoded = encode_key(q)
+		key_type = self.key_type
+		return [decode_key(encoded[:length], key_type) for length, _ in self._prefix_nodes(encoded)]
+
+	def longest_prefix(self, q: Key) -> Optional[Key]:
+		"""
+		Get the longest string in the trie that is a prefix of a query, as for routing by longest-prefix match.
+		:param q: the query
+		:return: the longest string that is a prefix of the query (possibly the query itself), None if there is none
+		"""
+		item = self.longest_prefix_item(q)
+		return item[0] if item is not None else None
+
+	def longest_prefix_item(self, q: Key) -> Optional[tuple[Key, Any]]:
+		"""
+		Get the longest string in the trie that is a prefix of a query, along with its value.
+		:param q: the query
+		:return: (string, value) pair, None if no string is a prefix of the query
+		"""
+		encoded = encode_key(q)
+		longest = None
+		for longest in self._prefix_nodes(encoded):
+			pass
+		if longest is None:
+			return None
+		length, node = longest
+		return decode_key(encoded[:length], self.key_type), node.value
+
+	def count_prefix(self, q: Key) -> int:
+		"""
+		Count the strings with a given prefix in O(length of the prefix), from the cached subtree counts,
+		without visiting the strings.
+		:param q: prefix to count
+		:return: number of strings with the given prefix
+		"""
+		located = self._locate(encode_key(q))
+		return located[1].count if located is not None else 0
+
+	def rank(self, key: Key) -> int:
+		"""
+		Count the strings lexicographically smaller than a string, which need not be in the trie.
+		The walk down the path of the string adds up the cached counts of the subtrees branching off before it,
+		so it only visits the nodes on the path and their children.
+		Strings are ordered by their encoded bytes, which for str keys is the order of code points.
+		:param key: the string
+		:return: the rank of the string, which is its index in sorted order if it is in the trie
+		"""
+		return rank_walk(self.root, self._edges, _is_terminal, _count, encode_key(key))
+
+	def _rank(self, root, q: bytes) -> tuple[int, bool]:
+		"""
+		Get the rank of an encoded string in a version of the trie, and whether the string is in it.
+		Both are read from the same root, so a concurrent writer cannot change the answer halfway.
+		:param root: the root of the version
+		:param q: encoded string
+		:return: the rank, and True if the string is in the trie
+		"""
+		rank = rank_walk(root, self._edges, _is_terminal, _count, q)
+		return rank, rank < root.count and select_walk(root, self._edges, _is_terminal, _count, rank) == q
+
+	def select(self, i: int) -> Key:
+		"""
+		Get the string with a given rank, guided by the cached subtree counts.
+		:param i: the rank, negative to count from the end as for lists
+		:return: the i-th smallest string
+		"""
+		root = self.root
+		if i < 0:
+			i += root.count
+		if not 0 <= i < root.count:
+			raise IndexError(f"rank {i} out of range for {root.count} keys")
+		return decode_key(select_walk(root, self._edges, _is_terminal, _count, i), self.key_type)
+
+	def floor(self, key: Key) -> Optional[Key]:
+		"""
+		Get the greatest string in the trie that is smaller than or equal to a string.
+		:param key: the string
+		:return: the greatest string smaller than or equal to the string, None if there is none
+		"""
+		root, encoded = self.root, encode_key(key)
+		rank, found = self._rank(root, encoded)
+		if found:
+			return decode_key(encoded, self.key_type)
+		if rank == 0:
+			return None
+		return decode_key(select_walk(root, self._edges, _is_terminal, _count, rank - 1), self.key_type)
+
+	def ceiling(self, key: Key) -> Optional[Key]:
+		"""
+		Get the smallest string in the trie that is greater than or equal to a string.
+		:param key: the string
+		:return: the smallest string greater than or equal to the string, None if there is none
+		"""
+		root = self.root
+		rank = rank_walk(root, self._edges, _is_terminal, _count, encode_key(key))
+		if rank == root.count:
+			return None
+		return decode_key(select_walk(root, self._edges, _is_terminal, _count, rank), self.key_type)
+
+	def keys_between(self, lo: Optional[Key] = None, hi: Optional[Key] = None) -> list[Key]:
+		"""
+		Get the strings between two bounds, both included, in lexicographic order.
+		The walk starts at the lower bound, skipping the subtrees before it, and stops after the upper bound.
+		:param lo: the lower bound, None for no lower bound
+		:param hi: the upper bound, None for no upper bound
+		:return: list of the strings between the bounds
+		"""
+		root, key_type = self.root, self.key_type
+		upper = encode_key(hi) if hi is not None else None
+		results = []
+		if lo is None:
+			paths = self._walk(b"", root)
+		else:
+			lower = encode_key(lo)
+			paths = self._walk(b"", root, lower)
+			if (upper is None or lower <= upper) and self._rank(root, lower)[1]:
+				results.append(decode_key(lower, key_type))
+		for path, _ in paths:
+			if upper is not None and path > upper:
+				break
+			results.append(decode_key(path, key_type))
+		return results
+
+	def __getitem__(self, key: Key) -> Any:
+		node = self._search(encode_key(key))
+		if node is None or not node.terminal:
+			raise KeyError(key)
+		return node.value
+
+	def __setitem__(self, key: Key, value: Any):
+		self.insert(key, value)
+
+	def __delitem__(self, key: Key):
+		if not self.remove(key):
+			raise KeyError(key)
+
+	def __contains__(self, key: object) -> bool:
+		try:
+			node = self._search(encode_key(key))
+		except TypeError:
+			return False
+		return node is not None and node.terminal
+
+	def __len__(self) -> int:
+		return self._size
+
+	def __iter__(self) -> Iterator[Key]:
+		key_type = self.key_type
+		for path, _ in self._walk(b"", self.root):
+			yield decode_key(path, key_type)
+
+	def items(self) -> ItemsView:
+		return _TrieItemsView(self)
+
+	def values(self) -> ValuesView:
+		return _TrieValuesView(self)
+
+	def get(self, key: Key, default: Any = None) -> Any:
+		node = self._search(encode_key(key))
+		if node is None or not node.terminal:
+			return default
+		return node.value
+
+	def save(self, path: Union[str, os.PathLike]):
+		"""
+		Save the trie to a file in a compact flat format (node arrays, concatenated edge labels and child offsets).
+		The file can be loaded with trie.load, which answers queries straight from a memory map.
+		Values are pickled.
+		:param path: path of the file
+		"""
+		save(self, path)
+
+	def freeze(self) -> FrozenPatriciaTrie:
+		"""
+		Create an immutable, compact copy of the trie for read-mostly use.
+		The copy stores the nodes in breadth-first order in contiguous arrays (child offsets, edge label offsets,
+		first bytes and terminal flags) next to a buffer of the concatenated edge labels, and supports
+		the same queries as the trie. Later changes to the trie do not affect the copy.
+		:return: the frozen trie
+		"""
+		return FrozenPatriciaTrie(flatten(self))
+
+	def stats(self) -> dict[str, Any]:
+		"""
+		Describe the shape and the steady-state footprint of the trie in a single traversal of its nodes.
+		The size estimate counts every node, its child map and the byte strings the edge labels are read from
+		(once each, since Patricia nodes share them), but not the values.
+		:return: dictionary with
+			keys: the number of keys
+			nodes: the number of nodes, including the root
+			leaves: the number of nodes without children
+			average_depth, max_depth: the average and maximum number of edges from the root to a key
+			depth_histogram: the number of keys at every depth
+			branching_histogram: the number of nodes with every number of children
+			label_bytes: the total length of the edge labels
+			string_bytes: the size of the distinct byte strings the edge labels are read from
+			bytes: the estimated size of the trie in bytes
+			bytes_per_key: the estimated size divided by the number of keys
+		"""
+		nodes = leaves = label_bytes = size = 0
+		depths, branching, strings = Counter(), Counter(), {}
+		stack = [(self.root, 0)]
+		while stack:
+			node, depth = stack.pop()
+			children = node.children
+			nodes += 1
+			branching[len(children)] += 1
+			if not children:
+				leaves += 1
+			if node.terminal:
+				depths[depth] += 1
+			size += sys.getsizeof(node) + sys.getsizeof(children)
+			label_bytes += self._label_length(node)
+			source = self._label_source(node)
+			if source is not None:
+				strings[id(source)] = source
+			stack.extend((child, depth + 1) for child in children.values())
+		string_bytes = sum(map(sys.getsizeof, strings.values()))
+		size += string_bytes
+		keys = sum(depths.values())
+		return {
+			"keys": keys,
+			"nodes": nodes,
+			"leaves": leaves,
+			"average_depth": sum(depth * count for depth, count in depths.items()) / keys if keys else 0.0,
+			"max_depth": max(depths, default=0),
+			"depth_histogram": dict(sorted(depths.items())),
+			"branching_histogram": dict(sorted(branching.items())),
+			"label_bytes": label_bytes,
+			"string_bytes": string_bytes,
+			"bytes": size,
+			"bytes_per_key": size / keys if keys else 0.0,
+		}
+
+	def enable_metrics(self) -> TrieMetrics:
+		"""
+		Start counting and timing the operations of this trie (see INSTRUMENTED_OPERATIONS), recording the nodes
+		every operation visits, and counting edge splits and merges.
+		The operations are wrapped on this instance only, so a trie without metrics runs the plain methods
+		and only pays for a check of the metrics attribute at the end of every walk, and when an edge is split or merged.
+		Mapping methods that do not call an instrumented operation, such as trie[key] and key in trie, are not counted.
+		:return: the metrics, also available as the metrics attribute
+		"""
+		if self.metrics is None:
+			self.metrics = TrieMetrics()
+			for name in INSTRUMENTED_OPERATIONS:
+				setattr(self, name, instrument(self, name, self.metrics))
+		return self.metrics
+
+	def disable_metrics(self):
+		"""
+		Stop recording metrics and restore the plain operations.
+		"""
+		if self.metrics is not None:
+			for name in INSTRUMENTED_OPERATIONS:
+				delattr(self, name)
+			del self.metrics
+
+	def enable_cache(self, max_bytes: int = DEFAULT_CACHE_BYTES, policy: str = "lru") -> RangeSearchCache:
+		"""
+		Start caching the results of range_search on this trie, within a memory budget.
+		Inserting or removing a key drops only the cached results of its prefixes, which are the only ones it changes.
+		Replacing the value of an existing key keeps them, since range searches only return keys.
+		:param max_bytes: the memory budget of the cached results, in bytes
+		:param policy: the eviction policy, "lru" (least recently used) or "lfu" (least frequently used)
+		:return: the cache, also available as the cache attribute, with its hit, miss and eviction counters
+		"""
+		if self.cache is None:
+			self.cache = RangeSearchCache(max_bytes, policy)
+		return self.cache
+
+	def disable_cache(self):
+		"""
+		Stop caching range search results and drop the cached ones.
+		"""
+		if self.cache is not None:
+			del self.cache
+
+	def clear(self):
+		"""
+		Remove all keys from the trie.
+		"""
+		self.root = self._new_root()
+		self._size = 0
+		if self.cache is not None:
+			self.cache.clear()
+
+	def __repr__(self) -> str:
+		return f"{type(self).__name__}({{{', '.join(f'{key!r}: {value!r}' for key, value in self.items())}}})"
+
+
+def _is_terminal(node) -> bool:
+	return node.terminal
+
+
+def _weight(node) -> float:
+	return node.weight
+
+
+def _max_weight(node) -> float:
+	return node.max_weight
+
+
+def _count(node) -> int:
+	return node.count
+
+
+class _TrieItemsView(ItemsView):
+	"""
+	Items view that reads the values during the walk instead of looking every key up again.
+	"""
+
+	def __iter__(self) -> Iterator[tuple[Key, Any]]:
+		trie = self._mapping
+		key_type = trie.key_type
+		for path, node in trie._walk(b"", trie.root):
+			yield decode_key(path, key_type), node.value
+
+
+class _TrieValuesView(ValuesView):
+	"""
+	Values view that reads the values during the walk instead of looking every key up again.
+	"""
+
+	def __iter__(self) -> Iterator[Any]:
+		trie = self._mapping
+		for _, node in trie._walk(b"", trie.root):
+			yield node.value
@@ -0,0 +1,113 @@
+import heapq
+import os
+import pickle
+import tempfile
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, Optional
+
+from .keys import encode_key
+
+Record = tuple[bytes, Any, Optional[float]]
+"""An encoded key with its value and weight."""
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+"""Number of records sorted in memory at once by the external sort."""
+
+
+def common_prefix_length(a: bytes, b: bytes) -> int:
+	"""
+	Get the length of the longest common prefix of two byte strings.
+	:param a: the first string
+	:param b: the second string
+	:return: the length of the common prefix
+	"""
+	if b.startswith(a):
+		return len(a)
+	i, n = 0, min(len(a), len(b))
+	while i < n and a[i] == b[i]:
+		i += 1
+	return i
+
+
+def to_records(items: Iterable) -> Iterator[Record]:
+	"""
+	Normalize the input of a bulk load into records.
+	:param items: keys, (key, value) pairs or (key, value, weight) triples
+	:return: iterator of (encoded key, value, weight) records
+	"""
+	for item in items:
+		if isinstance(item, tuple):
+			if len(item) == 2:
+				yield encode_key(item[0]), item[1], None
+			elif len(item) == 3:
+				yield encode_key(item[0]), item[1], item[2]
+			else:
+				raise ValueError(f"Expected a key, a (key, value) pair or a (key, value, weight) triple, got {item!r}")
+		else:
+			yield encode_key(item), None, None
+
+
+def external_sort(records: Iterable[Record], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Record]:
+	"""
+	Sort records by key with bounded memory.
+	Chunks of records are sorted in memory and spilled to temporary files, which are then merged lazily.
+	The sort is stable, so of equal keys the one given last comes last.
+	:param records: records in any order
+	:param chunk_size: number of records sorted in memory at once
+	:return: iterator of the records sorted by key
+	"""
+	records = iter(records)
+	first_chunk = sorted(islice(records, chunk_size), key=itemgetter(0))
+	if len(first_chunk) < chunk_size:  # everything fits in memory
+		yield from first_chunk
+		return
+	with tempfile.TemporaryDirectory(prefix="trie-sort-") as directory:
+		runs = []
+		chunk = first_chunk
+		while chunk:
+			path = os.path.join(directory, f"run-{len(runs)}.pickle")
+			with open(path, "wb") as file:
+				for record in chunk:
+					pickle.dump(record, file, pickle.HIGHEST_PROTOCOL)
+			runs.append(path)
+			chunk = sorted(islice(records, chunk_size), key=itemgetter(0))
+		yield from heapq.merge(*[_read_run(path) for path in runs], key=itemgetter(0))
+
+
+def _read_run(path: str) -> Iterator[Record]:
+	"""
+	Read a sorted run written by the external sort.
+	:param path: path of the run
+	:return: iterator of the records in the run
+	"""
+	with open(path, "rb") as file:
+		while True:
+			try:
+				yield pickle.load(file)
+			except EOFError:
+				return
+
+
+def sorted_records(
+		items: Iterable, presorted: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[tuple[bytes, Any, Optional[float], int]]:
+	"""
+	Prepare the input of a bulk load: sort it if needed, and compute the shared prefix of consecutive keys.
+	:param items: keys, (key, value) pairs or (key, value, weight) triples
+	:param presorted: whether the keys are already sorted (in the order of their encoded bytes)
+	:param chunk_size: number of records sorted in memory at once, if the input has to be sorted
+	:return: iterator of (encoded key, value, weight, length of the common prefix with the previous key) tuples
+	"""
+	records = to_records(items)
+	if not presorted:
+		records = external_sort(records, chunk_size)
+	previous = None
+	for key, value, weight in records:
+		if previous is None:
+			yield key, value, weight, 0
+		elif key < previous:
+			raise ValueError(f"Keys are not sorted: {key!r} comes after {previous!r}, use presorted=False to sort them")
+		else:
+			yield key, value, weight, common_prefix_length(previous, key)
+		previous = key
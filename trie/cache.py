@@ -0,0 +1,177 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Optional
+
+CACHE_POLICIES = ("lru", "lfu")
+"""Eviction policies of the range search cache."""
+
+DEFAULT_CACHE_BYTES = 1 << 22
+"""Default memory budget of the range search cache, in bytes."""
+
+
+class RangeSearchCache:
+	"""
+	A cache of range search results keyed by their encoded prefix, created by Trie.enable_cache.
+
+	A new or removed key changes the results of exactly the prefixes of that key, so invalidation looks up
+	each of its len(key) + 1 prefixes instead of scanning the cache. The size of an entry is estimated with
+	sys.getsizeof of its prefix, its result set and the keys in it, and the least recently (lru) or least
+	frequently (lfu, ties broken by recency) used entries are evicted to stay within the budget.
+	The cache is not thread-safe.
+
+	Attributes:
+		max_bytes: the memory budget of the cached entries
+		policy: the eviction policy, "lru" or "lfu"
+		bytes: the estimated size of the cached entries
+		hits: the number of lookups answered from the cache
+		misses: the number of lookups that were not cached
+		evictions: the number of entries evicted to stay within the budget
+		invalidations: the number of entries dropped because a key with their prefix was inserted or removed
+	"""
+
+	def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES, policy: str = "lru"):
+		"""
+		Initializes an empty cache.
+		:param max_bytes: the memory budget of the cached entries, in bytes
+		:param policy: the eviction policy, "lru" or "lfu"
+		"""
+		if max_bytes < 0:
+			raise ValueError(f"max_bytes must be non-negative, got {max_bytes}")
+		if policy not in CACHE_POLICIES:
+			raise ValueError(f"Unknown cache policy {policy!r}, expected one of {', '.join(CACHE_POLICIES)}")
+		self.max_bytes = max_bytes
+		self.policy = policy
+		self._entries: dict[bytes, list] = {}  # prefix -> [results, size, frequency]
+		self._order: OrderedDict[bytes, None] = OrderedDict()  # lru: least recently used first
+		self._frequencies: dict[int, OrderedDict[bytes, None]] = {}  # lfu: frequency -> least recently used first
+		self.bytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.invalidations = 0
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def __contains__(self, prefix: bytes) -> bool:
+		return prefix in self._entries
+
+	def get(self, prefix: bytes) -> Optional[frozenset]:
+		"""
+		Look up the results of a prefix and mark them as used.
+		:param prefix: the encoded prefix
+		:return: the cached results, None if not cached
+		"""
+		entry = self._entries.get(prefix)
+		if entry is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		if self.policy == "lru":
+			self._order.move_to_end(prefix)
+		else:
+			self._unlink(prefix, entry[2])
+			entry[2] += 1
+			self._frequencies.setdefault(entry[2], OrderedDict())[prefix] = None
+		return entry[0]
+
+	def put(self, prefix: bytes, results: frozenset):
+		"""
+		Cache the results of a prefix, evicting other entries as needed.
+		Results larger than the whole budget are not cached.
+		:param prefix: the encoded prefix
+		:param results: the keys with the prefix
+		"""
+		size = sys.getsizeof(prefix) + sys.getsizeof(results) + sum(map(sys.getsizeof, results))
+		if size > self.max_bytes:
+			return
+		self._discard(prefix)
+		while self.bytes + size > self.max_bytes:
+			self._discard(self._victim())
+			self.evictions += 1
+		self._entries[prefix] = [results, size, 1]
+		self.bytes += size
+		if self.policy == "lru":
+			self._order[prefix] = None
+		else:
+			self._frequencies.setdefault(1, OrderedDict())[prefix] = None
+
+	def invalidate(self, key: bytes) -> int:
+		"""
+		Drop the cached results of every prefix of a key that was inserted or removed.
+		:param key: the encoded key
+		:return: the number of dropped entries
+		"""
+		dropped = 0
+		if self._entries:
+			for i in range(len(key) + 1):
+				dropped += self._discard(key[:i])
+		self.invalidations += dropped
+		return dropped
+
+	def clear(self):
+		"""
+		Drop all entries, keeping the counters.
+		"""
+		self._entries.clear()
+		self._order.clear()
+		self._frequencies.clear()
+		self.bytes = 0
+
+	@property
+	def hit_rate(self) -> float:
+		lookups = self.hits + self.misses
+		return self.hits / lookups if lookups else 0.0
+
+	def to_dict(self) -> dict[str, Any]:
+		"""
+		Export the state and counters of the cache.
+		:return: dictionary of the counters, the hit rate, the number of entries and their size
+		"""
+		return {
+			"policy": self.policy,
+			"entries": len(self._entries),
+			"bytes": self.bytes,
+			"max_bytes": self.max_bytes,
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": self.hit_rate,
+			"evictions": self.evictions,
+			"invalidations": self.invalidations,
+		}
+
+	def _victim(self) -> bytes:
+		"""
+		Choose the entry to evict.
+		:return: the prefix of the least recently or least frequently used entry
+		"""
+		if self.policy == "lru":
+			return next(iter(self._order))
+		return next(iter(self._frequencies[min(self._frequencies)]))
+
+	def _discard(self, prefix: bytes) -> int:
+		"""
+		Remove an entry if it is cached.
+		:param prefix: the encoded prefix
+		:return: 1 if the entry was removed, 0 otherwise
+		"""
+		entry = self._entries.pop(prefix, None)
+		if entry is None:
+			return 0
+		self.bytes -= entry[1]
+		if self.policy == "lru":
+			del self._order[prefix]
+		else:
+			self._unlink(prefix, entry[2])
+		return 1
+
+	def _unlink(self, prefix: bytes, frequency: int):
+		"""
+		Remove a prefix from its frequency bucket, dropping the bucket once empty.
+		:param prefix: the encoded prefix
+		:param frequency: the frequency of its entry
+		"""
+		bucket = self._frequencies[frequency]
+		del bucket[prefix]
+		if not bucket:
+			del self._frequencies[frequency]
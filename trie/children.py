@@ -0,0 +1,440 @@
+import sys
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+
+class ChildMap(ABC):
+	"""
+	A mapping from transition keys (integers in range [0, 256)) to child nodes.
+
+	Subclasses decide how the children are laid out in memory, and must implement get, set, pop, __len__ and items.
+	Every implementation iterates its children in ascending order of the transition key.
+	"""
+	__slots__ = ()
+
+	@abstractmethod
+	def get(self, key: int) -> Optional[object]:
+		"""
+		Get the child for the given transition key.
+		:param key: transition key
+		:return: the child node if it exists, None otherwise
+		"""
+
+	@abstractmethod
+	def set(self, key: int, node: object) -> bool:
+		"""
+		Set the child for the given transition key, replacing an existing one.
+		:param key: transition key
+		:param node: the child node
+		:return: True if the key was not present before, False otherwise
+		"""
+
+	@abstractmethod
+	def pop(self, key: int) -> Optional[object]:
+		"""
+		Remove the child for the given transition key.
+		:param key: transition key
+		:return: the removed child node if it existed, None otherwise
+		"""
+
+	@abstractmethod
+	def __len__(self) -> int:
+		"""
+		Get the number of children.
+		"""
+
+	@abstractmethod
+	def items(self) -> Iterator[tuple[int, object]]:
+		"""
+		Iterate over (key, child) pairs in ascending key order.
+		"""
+
+	def keys(self) -> Iterator[int]:
+		"""
+		Iterate over the transition keys in ascending order.
+		"""
+		for key, _ in self.items():
+			yield key
+
+	def values(self) -> Iterator[object]:
+		"""
+		Iterate over the children in ascending key order.
+		"""
+		for _, node in self.items():
+			yield node
+
+	def first(self) -> Optional[object]:
+		"""
+		Get the child with the smallest transition key.
+		:return: the first child if it exists, None otherwise
+		"""
+		return next(self.values(), None)
+
+	def copy(self) -> "ChildMap":
+		"""
+		Create a shallow copy of the map, which shares the children but can be modified independently.
+		:return: the copy
+		"""
+		copy = type(self)()
+		for key, node in self.items():
+			copy.set(key, node)
+		return copy
+
+
+class ArrayChildMap(ChildMap):
+	"""
+	A 256-slot NumPy object array indexed directly by the transition key.
+	Constant-time transitions, but every node pays for all 256 slots.
+
+	Attributes:
+		children: array of children, indexed by transition keys
+		count: number of non-None children
+	"""
+	__slots__ = ("children", "count")
+
+	def __init__(self):
+		self.children = np.full(256, None, dtype=object)
+		self.count = 0
+
+	def get(self, key: int) -> Optional[object]:
+		return self.children[key]
+
+	def set(self, key: int, node: object) -> bool:
+		is_new = self.children[key] is None
+		if is_new:
+			self.count += 1
+		self.children[key] = node
+		return is_new
+
+	def pop(self, key: int) -> Optional[object]:
+		node = self.children[key]
+		if node is not None:
+			self.children[key] = None
+			self.count -= 1
+		return node
+
+	def __len__(self) -> int:
+		return self.count
+
+	def items(self) -> Iterator[tuple[int, object]]:
+		if self.count == 0:
+			return
+		for key in np.flatnonzero(self.children != None):  # noqa: E711 (element-wise comparison)
+			yield int(key), self.children[key]
+
+	def copy(self) -> "ArrayChildMap":
+		copy = ArrayChildMap.__new__(ArrayChildMap)
+		copy.children, copy.count = self.children.copy(), self.count
+		return copy
+
+	def __sizeof__(self) -> int:
+		return object.__sizeof__(self) + sys.getsizeof(self.children)
+
+
+class DictChildMap(ChildMap):
+	"""
+	A small dictionary from transition keys to children.
+	Fast transitions, but ordered iteration has to sort the keys.
+
+	Attributes:
+		children: dictionary of children, keyed by transition keys
+	"""
+	__slots__ = ("children",)
+
+	def __init__(self):
+		self.children = {}
+
+	def get(self, key: int) -> Optional[object]:
+		return self.children.get(key)
+
+	def set(self, key: int, node: object) -> bool:
+		is_new = key not in self.children
+		self.children[key] = node
+		return is_new
+
+	def pop(self, key: int) -> Optional[object]:
+		return self.children.pop(key, None)
+
+	def __len__(self) -> int:
+		return len(self.children)
+
+	def items(self) -> Iterator[tuple[int, object]]:
+		children = self.children
+		for key in sorted(children):
+			yield key, children[key]
+
+	def copy(self) -> "DictChildMap":
+		copy = DictChildMap.__new__(DictChildMap)
+		copy.children = self.children.copy()
+		return copy
+
+	def __sizeof__(self) -> int:
+		return object.__sizeof__(self) + sys.getsizeof(self.children)
+
+
+class SortedChildMap(ChildMap):
+	"""
+	Sparse sorted keys stored as a bytes object, with the children in a parallel tuple.
+	A node without children shares the empty bytes and tuple singletons, so leaves cost
+	nothing beyond the map itself. Transitions are a single memchr over the keys.
+
+	Attributes:
+		labels: the sorted transition keys
+		nodes: the children, in the same order as the keys
+	"""
+	__slots__ = ("labels", "nodes")
+
+	def __init__(self):
+		self.labels = b""
+		self.nodes = ()
+
+	def get(self, key: int) -> Optional[object]:
+		i = self.labels.find(key)
+		return self.nodes[i] if i >= 0 else None
+
+	def set(self, key: int, node: object) -> bool:
+		keys = self.labels
+		i = keys.find(key)
+		if i >= 0:
+			self.nodes = self.nodes[:i] + (node,) + self.nodes[i + 1:]
+			return False
+		i = bisect_left(keys, key)
+		self.labels = keys[:i] + bytes((key,)) + keys[i:]
+		self.nodes = self.nodes[:i] + (node,) + self.nodes[i:]
+		return True
+
+	def pop(self, key: int) -> Optional[object]:
+		i = self.labels.find(key)
+		if i < 0:
+			return None
+		node = self.nodes[i]
+		self.labels = self.labels[:i] + self.labels[i + 1:]
+		self.nodes = self.nodes[:i] + self.nodes[i + 1:]
+		return node
+
+	def __len__(self) -> int:
+		return len(self.labels)
+
+	def items(self) -> Iterator[tuple[int, object]]:
+		return zip(self.labels, self.nodes)
+
+	def keys(self) -> Iterator[int]:
+		return iter(self.labels)
+
+	def values(self) -> Iterator[object]:
+		return iter(self.nodes)
+
+	def first(self) -> Optional[object]:
+		return self.nodes[0] if self.nodes else None
+
+	def copy(self) -> "SortedChildMap":
+		copy = SortedChildMap.__new__(SortedChildMap)
+		copy.labels, copy.nodes = self.labels, self.nodes  # immutable, replaced on every change
+		return copy
+
+	def __sizeof__(self) -> int:
+		size = object.__sizeof__(self)
+		if len(self.labels) > 1:  # empty and single-byte bytes objects are interned by CPython
+			size += sys.getsizeof(self.labels)
+		if self.nodes:
+			size += sys.getsizeof(self.nodes)
+		return size
+
+
+class AdaptiveChildMap(ChildMap):
+	"""
+	An adaptive radix tree (ART) style map that switches its layout with the number of children:
+		- up to 16 children: sorted keys and a parallel tuple of children (ART's Node4 and Node16),
+		- up to 48 children: a 256-byte index into a list of children (ART's Node48),
+		- more than 48 children: a direct 256-slot list of children (ART's Node256).
+	Shrinking uses lower thresholds than growing, so a node does not flip layouts back and forth.
+
+	Attributes:
+		index: sorted keys (small layout), a 256-byte slot index (medium layout), or None (full layout)
+		nodes: the children, laid out according to the current layout
+		count: number of children
+	"""
+	__slots__ = ("index", "nodes", "count")
+
+	SMALL_CAPACITY = 16
+	MEDIUM_CAPACITY = 48
+	SMALL_SHRINK = 12
+	MEDIUM_SHRINK = 40
+
+	def __init__(self):
+		self.index = b""
+		self.nodes = ()
+		self.count = 0
+
+	def _layout(self) -> int:
+		"""
+		Get the current layout.
+		:return: 0 for the small layout, 1 for the medium layout, 2 for the full layout
+		"""
+		if self.index is None:
+			return 2
+		return 0 if isinstance(self.index, bytes) else 1
+
+	def get(self, key: int) -> Optional[object]:
+		index = self.index
+		if index is None:
+			return self.nodes[key]
+		if isinstance(index, bytes):
+			i = index.find(key)
+			return self.nodes[i] if i >= 0 else None
+		slot = index[key]
+		return self.nodes[slot - 1] if slot else None
+
+	def set(self, key: int, node: object) -> bool:
+		layout = self._layout()
+		if layout == 0:
+			keys = self.index
+			i = keys.find(key)
+			if i >= 0:
+				self.nodes = self.nodes[:i] + (node,) + self.nodes[i + 1:]
+				return False
+			if self.count == self.SMALL_CAPACITY:
+				self._grow()
+				return self.set(key, node)
+			i = bisect_left(keys, key)
+			self.index = keys[:i] + bytes((key,)) + keys[i:]
+			self.nodes = self.nodes[:i] + (node,) + self.nodes[i:]
+		elif layout == 1:
+			slot = self.index[key]
+			if slot:
+				self.nodes[slot - 1] = node
+				return False
+			if self.count == self.MEDIUM_CAPACITY:
+				self._grow()
+				return self.set(key, node)
+			self.nodes.append(node)
+			self.index[key] = len(self.nodes)
+		else:
+			if self.nodes[key] is not None:
+				self.nodes[key] = node
+				return False
+			self.nodes[key] = node
+		self.count += 1
+		return True
+
+	def pop(self, key: int) -> Optional[object]:
+		layout = self._layout()
+		if layout == 0:
+			i = self.index.find(key)
+			if i < 0:
+				return None
+			node = self.nodes[i]
+			self.index = self.index[:i] + self.index[i + 1:]
+			self.nodes = self.nodes[:i] + self.nodes[i + 1:]
+		elif layout == 1:
+			slot = self.index[key]
+			if not slot:
+				return None
+			node = self.nodes[slot - 1]
+			# Move the last child into the freed slot to keep the list dense
+			last = self.nodes.pop()
+			self.index[key] = 0
+			if slot - 1 < len(self.nodes):
+				self.nodes[slot - 1] = last
+				self.index[self.index.index(len(self.nodes) + 1)] = slot
+		else:
+			node = self.nodes[key]
+			if node is None:
+				return None
+			self.nodes[key] = None
+		self.count -= 1
+		self._shrink()
+		return node
+
+	def _grow(self):
+		"""
+		Switch to the next larger layout.
+		"""
+		children = list(self.items())
+		if self._layout() == 0:
+			self.index = bytearray(256)
+			self.nodes = []
+			for key, node in children:
+				self.nodes.append(node)
+				self.index[key] = len(self.nodes)
+		else:
+			self.index = None
+			self.nodes = [None] * 256
+			for key, node in children:
+				self.nodes[key] = node
+
+	def _shrink(self):
+		"""
+		Switch to a smaller layout if the number of children dropped far enough.
+		"""
+		layout = self._layout()
+		if layout == 2 and self.count <= self.MEDIUM_SHRINK:
+			children = list(self.items())
+			self.index = bytearray(256)
+			self.nodes = []
+			for key, node in children:
+				self.nodes.append(node)
+				self.index[key] = len(self.nodes)
+		elif layout == 1 and self.count <= self.SMALL_SHRINK:
+			children = list(self.items())
+			self.index = bytes(key for key, _ in children)
+			self.nodes = tuple(node for _, node in children)
+
+	def __len__(self) -> int:
+		return self.count
+
+	def items(self) -> Iterator[tuple[int, object]]:
+		layout = self._layout()
+		if layout == 0:
+			return zip(self.index, self.nodes)
+		if layout == 1:
+			index, nodes = self.index, self.nodes
+			return ((key, nodes[index[key] - 1]) for key in range(256) if index[key])
+		return ((key, node) for key, node in enumerate(self.nodes) if node is not None)
+
+	def first(self) -> Optional[object]:
+		if self._layout() == 0:
+			return self.nodes[0] if self.nodes else None
+		return next(self.values(), None)
+
+	def copy(self) -> "AdaptiveChildMap":
+		copy = AdaptiveChildMap.__new__(AdaptiveChildMap)
+		copy.index = bytearray(self.index) if isinstance(self.index, bytearray) else self.index
+		copy.nodes = list(self.nodes) if isinstance(self.nodes, list) else self.nodes
+		copy.count = self.count
+		return copy
+
+	def __sizeof__(self) -> int:
+		size = object.__sizeof__(self)
+		if self.index is not None and len(self.index) > 1:
+			size += sys.getsizeof(self.index)
+		if self.nodes:
+			size += sys.getsizeof(self.nodes)
+		return size
+
+
+CHILD_MAPS: dict[str, type[ChildMap]] = {
+	"array": ArrayChildMap,
+	"dict": DictChildMap,
+	"sorted": SortedChildMap,
+	"adaptive": AdaptiveChildMap,
+}
+
+
+def resolve_child_map(child_map: Union[str, type[ChildMap]]) -> type[ChildMap]:
+	"""
+	Resolve a child map representation given by name or by class.
+	:param child_map: one of the names in CHILD_MAPS, or a ChildMap subclass
+	:return: the ChildMap subclass
+	"""
+	if isinstance(child_map, str):
+		try:
+			return CHILD_MAPS[child_map]
+		except KeyError:
+			raise ValueError(f"Unknown child map representation: {child_map!r} (expected one of {list(CHILD_MAPS)})") from None
+	if isinstance(child_map, type) and issubclass(child_map, ChildMap):
+		return child_map
+	raise TypeError(f"Expected a child map name or a ChildMap subclass, got {child_map!r}")
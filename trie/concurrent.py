@@ -0,0 +1,111 @@
+import threading
+from typing import Any, Optional, Union
+
+from .cache import DEFAULT_CACHE_BYTES
+from .children import ChildMap
+from .keys import Key
+from .patricia import PatriciaTrie, PatriciaTrieNode, PatriciaTrieSnapshot
+
+
+class ConcurrentPatriciaTrie(PatriciaTrie):
+	"""
+	A Patricia trie that can be shared between threads, with readers that never block.
+
+	The trie is always persistent: writers never modify a node that a reader can reach. Instead, they copy the nodes
+	on the path from the root to the change (path copying) and publish the new root together with the new size
+	in a single assignment, so an edge split or merge is never visible halfway. Readers load the current version
+	once per operation and walk it without any locking, while writers serialize on a lock.
+
+	Every single operation is atomic. Compound operations can be made atomic by holding the lock,
+	which is reentrant:
+		with trie.lock:
+			trie[key] = trie.get(key, 0) + 1
+
+	Attributes:
+		root: the root node of the current version
+		child_map: the child map representation used by the nodes
+		key_type: the type of the keys returned by queries (str or bytes)
+		weighted: whether keys carry weights and nodes cache the maximum weight of their subtree
+		persistent: always True
+		lock: the lock held by writers
+	"""
+
+	_version: tuple[Optional[PatriciaTrieNode], int] = (None, 0)
+
+	def __init__(self, child_map: Union[str, type[ChildMap]] = "sorted", key_type: type = str, weighted: bool = False):
+		"""
+		Initializes a concurrent Patricia trie.
+		:param child_map: the child map representation, either a name ("array", "dict", "sorted", "adaptive")
+			or a ChildMap subclass
+		:param key_type: the type of the keys returned by queries, str or bytes; both are accepted as input
+		:param weighted: whether keys carry weights, which enables top_k queries
+		"""
+		self.lock = threading.RLock()
+		super().__init__(child_map, key_type, weighted)
+		self.persistent = True
+
+	@property
+	def root(self) -> PatriciaTrieNode:
+		return self._version[0]
+
+	@root.setter
+	def root(self, root: PatriciaTrieNode):
+		self._version = (root, self._version[1])
+
+	@property
+	def _size(self) -> int:
+		return self._version[1]
+
+	@_size.setter
+	def _size(self, size: int):
+		self._version = (self._version[0], size)
+
+	def _current_version(self) -> tuple[PatriciaTrieNode, int]:
+		return self._version
+
+	def _publish(self, root: PatriciaTrieNode, size: int):
+		self._version = (root, size)  # a single assignment, so readers see either version entirely
+
+	def insert(self, s: Key, value: Any = None, weight: Optional[float] = None) -> PatriciaTrieNode:
+		"""
+		Insert a string into the Patricia trie, or replace the value of an existing one, and publish the new version.
+		:param s: string to insert
+		:param value: value stored with the string
+		:param weight: weight of the string in a weighted trie; None keeps the current weight (0 for a new string)
+		:return: the final node inserted, which corresponds to the given string
+		"""
+		with self.lock:
+			return super().insert(s, value, weight)
+
+	def remove(self, s: Key) -> bool:
+		"""
+		Remove a string from the Patricia trie and publish the new version.
+		:param s: string to remove
+		:return: True if the string was removed, False otherwise
+		"""
+		with self.lock:
+			return super().remove(s)
+
+	def _copy_on_write(self) -> bool:
+		return True  # readers may be walking any version
+
+	def enable_cache(self, max_bytes: int = DEFAULT_CACHE_BYTES, policy: str = "lru"):
+		"""
+		Not supported: readers do not lock, so one could cache results computed from a version
+		that a writer has already invalidated. Enable the cache on a snapshot instead, which never changes.
+		"""
+		raise TypeError(f"{type(self).__name__} cannot cache range searches, cache a snapshot of it instead")
+
+	def snapshot(self) -> PatriciaTrieSnapshot:
+		"""
+		Take an immutable, point-in-time view of the trie in O(1), without blocking writers.
+		:return: the snapshot
+		"""
+		return PatriciaTrieSnapshot(self)
+
+	def clear(self):
+		"""
+		Remove all keys from the trie.
+		"""
+		with self.lock:
+			self._version = (self._new_root(), 0)
@@ -0,0 +1,725 @@
+import mmap as mmap_module
+import os
+import pickle
+import struct
+import sys
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+from .keys import BYTE_LABELS, Key, decode_key, encode_key, pattern_characters
+from .pattern import compile_pattern
+from .walk import NO_WEIGHT, automaton_walk, best_first, characters, fuzzy_walk, ordered_walk, rank_walk, select_walk
+
+MAGIC = b"PATFRZ\r\n"
+VERSION = 1
+
+FLAG_BYTES_KEYS = 1
+FLAG_VALUES = 2
+FLAG_WEIGHTED = 4
+
+SECTIONS = {
+	"child_start": "<i4",  # children of node i are the nodes child_start[i] .. child_start[i + 1] - 1
+	"label_start": "<i8",  # the edge label of node i is labels[label_start[i]:label_start[i + 1]]
+	"first_byte": "u1",  # the first byte of the edge label of every node, for transitions
+	"terminal": "u1",  # whether a key ends at the node
+	"labels": "u1",  # the concatenated edge labels
+	"value_start": "<i8",  # the pickled value of node i is values[value_start[i]:value_start[i + 1]]
+	"values": "u1",  # the concatenated pickled values
+	"weight": "<f8",  # the weight of the key ending at the node
+	"max_weight": "<f8",  # the maximum weight in the subtree of the node
+}
+"""The sections of the flat format, in file order, with their little-endian NumPy types."""
+
+_HEADER = struct.Struct("<8sIIqq" + "qq" * len(SECTIONS))
+_ALIGNMENT = 8
+
+
+def flatten(trie) -> bytes:
+	"""
+	Serialize a trie into the flat format.
+
+	Nodes are numbered in breadth-first order, so the children of every node are contiguous and sorted
+	by their first byte. Chains of non-terminal nodes with a single child are merged into one edge,
+	so a prefix trie is stored path-compressed, exactly like a Patricia trie.
+	The file starts with a header holding the flags, the counts and the offset and length of every section.
+	:param trie: the trie to serialize (PrefixTrie or PatriciaTrie)
+	:return: the serialized trie
+	"""
+	edges = trie._edges
+	weighted = trie.weighted
+	queue = [(trie.root, b"")]
+	child_start, label_start, first_byte, terminal = [], [0], [], []
+	value_start, weight, max_weight = [0], [], []
+	labels, values = bytearray(), bytearray()
+	i = 0
+	while i < len(queue):
+		node, label = queue[i]
+		child_start.append(len(queue))
+		for child_label, child in edges(node):
+			while not child.terminal and len(child.children) == 1:  # compress single-child chains
+				(next_label, child), = edges(child)
+				child_label += next_label
+			queue.append((child, child_label))
+		labels += label
+		label_start.append(len(labels))
+		first_byte.append(label[0] if label else 0)
+		terminal.append(node.terminal)
+		if node.terminal and node.value is not None:
+			values += pickle.dumps(node.value, pickle.HIGHEST_PROTOCOL)
+		value_start.append(len(values))
+		if weighted:
+			weight.append(node.weight if node.terminal else NO_WEIGHT)
+			max_weight.append(node.max_weight)
+		i += 1
+	child_start.append(len(queue))
+
+	flags = (FLAG_BYTES_KEYS if trie.key_type is bytes else 0) | (FLAG_VALUES if values else 0)
+	flags |= FLAG_WEIGHTED if weighted else 0
+	arrays = {
+		"child_start": child_start,
+		"label_start": label_start,
+		"first_byte": first_byte,
+		"terminal": terminal,
+		"labels": labels,
+		"value_start": value_start if values else [],
+		"values": values,
+		"weight": weight,
+		"max_weight": max_weight,
+	}
+	sections, layout = [], []
+	offset = _HEADER.size
+	for name, dtype in SECTIONS.items():
+		data = arrays[name]
+		data = bytes(data) if isinstance(data, bytearray) else np.asarray(data, dtype=dtype).tobytes()
+		padding = -offset % _ALIGNMENT
+		sections.append(b"\0" * padding + data)
+		offset += padding
+		layout += [offset, len(data)]
+		offset += len(data)
+	header = _HEADER.pack(MAGIC, VERSION, flags, len(queue), sum(terminal), *layout)
+	return header + b"".join(sections)
+
+
+def save(trie, path: Union[str, os.PathLike]):
+	"""
+	Save a trie to a file in the flat format.
+	The file is written atomically, so readers never see a partial file.
+	:param trie: the trie to save (PrefixTrie or PatriciaTrie)
+	:param path: path of the file
+	"""
+	write_atomically(path, flatten(trie))
+
+
+def write_atomically(path: Union[str, os.PathLike], data: bytes):
+	"""
+	Write data to a file next to the target and rename it over the target.
+	:param path: path of the file
+	:param data: the data to write
+	"""
+	temporary_path = f"{os.fspath(path)}.tmp"
+	with open(temporary_path, "wb") as file:
+		file.write(data)
+		file.flush()
+		os.fsync(file.fileno())
+	os.replace(temporary_path, path)
+
+
+def load(path: Union[str, os.PathLike], mmap: bool = True) -> "FrozenPatriciaTrie":
+	"""
+	Load a trie saved in the flat format.
+	:param path: path of the file
+	:param mmap: memory-map the file instead of reading it, so queries are answered straight from the page cache
+		and processes loading the same file share one copy of it
+	:return: the loaded, immutable trie
+	"""
+	with open(path, "rb") as file:
+		if mmap:
+			buffer = mmap_module.mmap(file.fileno(), 0, access=mmap_module.ACCESS_READ)
+		else:
+			buffer = file.read()
+	return FrozenPatriciaTrie(buffer)
+
+
+def _encode_batch(keys: Union[Iterable[Key], np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Encode a batch of keys into a zero-padded byte matrix.
+	NumPy arrays of str or bytes are converted without a Python loop over the keys.
+	Fixed-width NumPy strings are padded with NUL characters and NumPy itself strips trailing ones,
+	so keys ending in NUL cannot be told from their shorter prefix in such arrays and are looked up as that prefix;
+	they must be passed as a list or an object array, which go through encode_key.
+	:param keys: the keys, as a list or a NumPy array of str or bytes
+	:return: matrix with one encoded key per row, and the lengths of the encoded keys
+	"""
+	if isinstance(keys, np.ndarray) and keys.dtype.kind in "US":
+		if keys.dtype.kind == "U":
+			keys = np.char.encode(keys, "utf-8")
+		keys = np.ascontiguousarray(keys.ravel())
+		width = keys.dtype.itemsize
+		matrix = np.frombuffer(keys.tobytes(), dtype=np.uint8).reshape(len(keys), width)
+		lengths = np.char.str_len(keys).astype(np.int64)
+	else:
+		encoded = [encode_key(key) for key in keys]
+		lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+		width = int(lengths.max(initial=0))
+		matrix = np.zeros((len(encoded), width), dtype=np.uint8)
+		rows = np.repeat(np.arange(len(encoded)), lengths)
+		columns = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+		matrix[rows, columns] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+	# A spare zero column keeps the indexing of finished queries in bounds
+	return np.hstack([matrix, np.zeros((len(lengths), 1), dtype=np.uint8)]), lengths
+
+
+class FrozenPatriciaTrie(Mapping):
+	"""
+	An immutable Patricia trie stored in the flat format.
+	All queries read the flat arrays directly from the underlying buffer (bytes or a memory map),
+	without rebuilding any node objects; node handles are integer indexes, with the root at 0.
+	The children of a node are contiguous and their first bytes are adjacent in memory,
+	so a transition scans a few bytes instead of following pointers between objects.
+
+	A frozen trie is created by Trie.freeze, in memory, or by load, from a file written by Trie.save.
+
+	Attributes:
+		buffer: the buffer holding the flat format
+		key_type: the type of the keys returned by queries (str or bytes)
+		weighted: whether the keys carry weights
+		node_count: number of nodes
+	"""
+
+	def __init__(self, buffer: Union[bytes, mmap_module.mmap]):
+		"""
+		Initializes a frozen Patricia trie over a buffer holding the flat format.
+		:param buffer: the buffer
+		"""
+		if len(buffer) < _HEADER.size:
+			raise ValueError("Buffer is too small to hold a frozen trie")
+		magic, version, flags, node_count, key_count, *layout = _HEADER.unpack_from(buffer, 0)
+		if magic != MAGIC:
+			raise ValueError("Buffer does not hold a frozen trie")
+		if version != VERSION:
+			raise ValueError(f"Unsupported frozen trie version {version}, expected {VERSION}")
+		self.buffer = buffer
+		self.key_type = bytes if flags & FLAG_BYTES_KEYS else str
+		self.has_values = bool(flags & FLAG_VALUES)
+		self.weighted = bool(flags & FLAG_WEIGHTED)
+		self.node_count = node_count
+		self._size = key_count
+		self._sections = {name: (layout[2 * i], layout[2 * i + 1]) for i, name in enumerate(SECTIONS)}
+		self._views = []
+		self._batch_arrays = None
+		self._counts = None
+		self._child_start = self._view("child_start")
+		self._label_start = self._view("label_start")
+		self._terminal = self._view("terminal")
+		self._first_byte_offset = self._sections["first_byte"][0]
+		self._labels_offset = self._sections["labels"][0]
+		self._value_start = self._view("value_start") if self.has_values else None
+		self._values_offset = self._sections["values"][0]
+		self._weight = self._view("weight") if self.weighted else None
+		self._max_weight = self._view("max_weight") if self.weighted else None
+
+	def _view(self, name: str) -> memoryview:
+		"""
+		Get a typed view of a section, without copying it on little-endian machines.
+		:param name: name of the section
+		:return: memoryview whose items are the elements of the section
+		"""
+		offset, length = self._sections[name]
+		dtype = np.dtype(SECTIONS[name])
+		if sys.byteorder == "little" or dtype.itemsize == 1:
+			view = memoryview(self.buffer)[offset: offset + length].cast(dtype.char)
+		else:
+			view = memoryview(np.frombuffer(self.buffer, dtype, length // dtype.itemsize, offset).astype(dtype.newbyteorder("=")))
+		self._views.append(view)
+		return view
+
+	def array(self, name: str) -> np.ndarray:
+		"""
+		Get a section as a read-only NumPy array sharing memory with the buffer.
+		:param name: name of the section
+		:return: the array
+		"""
+		offset, length = self._sections[name]
+		dtype = np.dtype(SECTIONS[name])
+		return np.frombuffer(self.buffer, dtype, length // dtype.itemsize, offset)
+
+	@property
+	def nbytes(self) -> int:
+		"""
+		Size of the flat format in bytes.
+		"""
+		return len(self.buffer)
+
+	def __sizeof__(self) -> int:
+		return object.__sizeof__(self) + (self.nbytes if isinstance(self.buffer, bytes) else 0)
+
+	def save(self, path: Union[str, os.PathLike]):
+		"""
+		Save the frozen trie to a file, which can be loaded back with load.
+		:param path: path of the file
+		"""
+		write_atomically(path, self.buffer[:])
+
+	def close(self):
+		"""
+		Release the buffer, closing the memory map if the trie was loaded with one.
+		"""
+		for view in self._views:
+			view.release()
+		self._views = []
+		self._batch_arrays = None
+		self._counts = None
+		if isinstance(self.buffer, mmap_module.mmap):
+			self.buffer.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def _child(self, node: int, b: int) -> int:
+		"""
+		Transition from a node to the child whose edge label starts with the byte b.
+		:param node: the node
+		:param b: the first byte of the edge label
+		:return: the child if it exists, -1 otherwise
+		"""
+		lo, hi = self._child_start[node], self._child_start[node + 1]
+		if lo == hi:
+			return -1
+		offset = self._first_byte_offset
+		i = self.buffer.find(BYTE_LABELS[b], offset + lo, offset + hi)
+		return i - offset if i >= 0 else -1
+
+	def _label(self, node: int) -> bytes:
+		"""
+		Get the edge label of a node.
+		:param node: the node
+		:return: the edge label
+		"""
+		offset = self._labels_offset
+		return self.buffer[offset + self._label_start[node]: offset + self._label_start[node + 1]]
+
+	def _edges(self, node: int) -> list[tuple[bytes, int]]:
+		"""
+		Get the outgoing edges of a node.
+		:param node: the node
+		:return: list of (edge label, child) pairs, in ascending order of the labels
+		"""
+		label = self._label
+		return [(label(child), child) for child in range(self._child_start[node], self._child_start[node + 1])]
+
+	def _is_terminal(self, node: int) -> bool:
+		return self._terminal[node] != 0
+
+	def _value(self, node: int) -> Any:
+		"""
+		Get the value of the key ending at a terminal node, unpickling it on demand.
+		:param node: the node
+		:return: the value
+		"""
+		if not self.has_values:
+			return None
+		start, end = self._value_start[node], self._value_start[node + 1]
+		if start == end:
+			return None
+		offset = self._values_offset
+		return pickle.loads(self.buffer[offset + start: offset + end])
+
+	def _records(self) -> Iterator[tuple[bytes, Any, Optional[float]]]:
+		"""
+		Get the records of all keys, in lexicographic order, to rebuild a mutable trie with Trie.from_sorted.
+		:return: iterator of (encoded key, value, weight) triples; the weight is None in an unweighted trie
+		"""
+		weight = self._weight
+		for path, node in ordered_walk(b"", 0, self._edges, self._is_terminal):
+			yield path, self._value(node), weight[node] if weight is not None else None
+
+	def _count(self, node: int) -> int:
+		"""
+		Get the number of keys in the subtree of a node.
+		The counts are not stored in the flat format; they are computed on first use, in a single pass over
+		the nodes in reverse breadth-first order, so that every node is complete before it is added to its parent.
+		:param node: the node
+		:return: the number of keys
+		"""
+		if self._counts is None:
+			child_start = self._child_start
+			counts = list(self._terminal)
+			for parent in range(self.node_count - 1, -1, -1):
+				for child in range(child_start[parent], child_start[parent + 1]):
+					counts[parent] += counts[child]
+			self._counts = counts
+		return self._counts[node]
+
+	def _search(self, q: bytes) -> int:
+		"""
+		Search for the node at which an encoded string ends, terminal or not.
+		:param q: encoded string to search for
+		:return: the node corresponding to the string if it exists, -1 otherwise
+		"""
+		buffer, child_start, label_start = self.buffer, self._child_start, self._label_start
+		first_byte_offset, labels_offset = self._first_byte_offset, self._labels_offset
+		p, l = 0, len(q)
+		node = 0
+		while p < l:  # the transitions of _child and _label, inlined
+			lo, hi = child_start[node], child_start[node + 1]
+			if lo == hi:
+				return -1
+			i = buffer.find(BYTE_LABELS[q[p]], first_byte_offset + lo, first_byte_offset + hi)
+			if i < 0:
+				return -1
+			node = i - first_byte_offset
+			start, end = label_start[node], label_start[node + 1]
+			if end - start > 1:
+				if buffer[labels_offset + start: labels_offset + end] != q[p: p + end - start]:
+					return -1
+			p += end - start
+		return node
+
+	def _locate(self, q: bytes) -> Optional[tuple[bytes, int]]:
+		"""
+		Find the topmost node whose path starts with the given prefix.
+		:param q: encoded prefix to search for
+		:return: the path of the node and the node if the prefix exists, None otherwise
+		"""
+		p, l = 0, len(q)
+		path, node = q, 0
+		while p < l:
+			node = self._child(node, q[p])
+			if node < 0:
+				return None
+			label = self._label(node)
+			if not q.startswith(label[:l - p], p):
+				return None
+			if p + len(label) > l:  # the prefix ends inside the edge
+				path = q[:p] + label
+			p += len(label)
+		return path, node
+
+	def _batch(self) -> tuple[np.ndarray, ...]:
+		"""
+		Get the arrays used by the batch lookups, building them on first use.
+		Since the nodes are in breadth-first order and the children of every node are sorted by their first byte,
+		the transition keys parent * 256 + first byte of all nodes but the root are sorted,
+		so the transitions of a whole batch are resolved with a single binary search.
+		:return: transition keys, label starts, label lengths, terminal flags and the labels
+		"""
+		if self._batch_arrays is None:
+			child_start = self.array("child_start").astype(np.int64)
+			parents = np.repeat(np.arange(self.node_count, dtype=np.int64), np.diff(child_start))
+			transition_keys = parents * 256 + self.array("first_byte")[1:]
+			label_start = self.array("label_start").astype(np.int64)
+			self._batch_arrays = (
+				transition_keys, label_start[:-1], np.diff(label_start), self.array("terminal").astype(bool),
+				self.array("labels")
+			)
+		return self._batch_arrays
+
+	def search_many(self, keys: Union[Iterable[Key], np.ndarray]) -> np.ndarray:
+		"""
+		Search for a batch of strings at once.
+		All queries advance together, one edge per step, with array operations over the flat arrays,
+		so the interpreter overhead is paid per step of the longest query instead of per byte of every query.
+		:param keys: the strings to search for, as a list or a NumPy array of str or bytes
+			(fixed-width NumPy strings drop trailing NUL characters, so pass keys ending in NUL as a list)
+		:return: array of the nodes of the strings, -1 for the strings that are not in the trie
+		"""
+		matrix, lengths = _encode_batch(keys)
+		transition_keys, label_start, label_length, terminal, labels = self._batch()
+		count = len(lengths)
+		nodes = np.zeros(count, dtype=np.int64)
+		positions = np.zeros(count, dtype=np.int64)
+		active = np.flatnonzero(lengths > 0)
+		while active.size:
+			current = nodes[active]
+			position = positions[active]
+			wanted = current * 256 + matrix[active, position]
+			child = np.searchsorted(transition_keys, wanted)
+			found = child < len(transition_keys)
+			found[found] = transition_keys[child[found]] == wanted[found]
+			child += 1  # the root has no transition key
+			length = label_length[np.where(found, child, 0)]
+			found &= position + length <= lengths[active]
+			for j in range(1, int(length[found].max(initial=0))):  # the first byte matched in the transition
+				check = np.flatnonzero(found & (length > j))
+				found[check] = matrix[active[check], position[check] + j] == labels[label_start[child[check]] + j]
+			nodes[active[~found]] = -1
+			active, child, position, length = active[found], child[found], position[found], length[found]
+			nodes[active] = child
+			positions[active] = position + length
+			active = active[positions[active] < lengths[active]]
+		nodes[nodes >= 0] = np.where(terminal[nodes[nodes >= 0]], nodes[nodes >= 0], -1)
+		return nodes
+
+	def contains_many(self, keys: Union[Iterable[Key], np.ndarray]) -> np.ndarray:
+		"""
+		Check a batch of strings at once, like search_many.
+		:param keys: the strings to check, as a list or a NumPy array of str or bytes
+		:return: boolean array telling which strings are in the trie
+		"""
+		return self.search_many(keys) >= 0
+
+	def get_many(self, keys: Union[Iterable[Key], np.ndarray], default: Any = None) -> list[Any]:
+		"""
+		Get the values of a batch of strings at once, like search_many.
+		:param keys: the strings to look up, as a list or a NumPy array of str or bytes
+		:param default: value returned for the strings that are not in the trie
+		:return: list of the values
+		"""
+		return [self._value(node) if node >= 0 else default for node in self.search_many(keys).tolist()]
+
+	def search(self, q: Key) -> Optional[int]:
+		"""
+		Search for a string in the frozen trie.
+		:param q: string to search for
+		:return: the node of the string if it exists, None otherwise
+		"""
+		node = self._search(encode_key(q))
+		return node if node >= 0 and self._terminal[node] else None
+
+	def range_search(self, q: Key) -> set[Key]:
+		"""
+		Search for all strings with a given prefix in the frozen trie.
+		:param q: prefix to search for
+		:return: set of strings with the given prefix
+		"""
+		return set(self.iter_prefix(q))
+
+	def iter_prefix(
+			self, q: Key, limit: Optional[int] = None, start_after: Optional[Key] = None, reverse: bool = False
+	) -> Iterator[Key]:
+		"""
+		Lazily iterate over the strings with a given prefix, in lexicographic order.
+		:param q: prefix to search for
+		:param limit: maximum number of strings to return, None for no limit
+		:param start_after: cursor for pagination; only strings after it (before it if reverse) are returned
+		:param reverse: iterate in descending instead of ascending order
+		:return: iterator of strings with the given prefix
+		"""
+		if limit is not None and limit < 0:
+			raise ValueError(f"limit must be non-negative, got {limit}")
+		located = self._locate(encode_key(q))
+		if located is None or limit == 0:
+			return
+		after = encode_key(start_after) if start_after is not None else None
+		key_type = self.key_type
+		for count, (path, _) in enumerate(ordered_walk(*located, self._edges, self._is_terminal, after, reverse), 1):
+			yield decode_key(path, key_type)
+			if count == limit:
+				return
+
+	def count_prefix(self, q: Key) -> int:
+		"""
+		Count the strings with a given prefix in O(length of the prefix), without visiting the strings.
+		:param q: prefix to count
+		:return: number of strings with the given prefix
+		"""
+		located = self._locate(encode_key(q))
+		return self._count(located[1]) if located is not None else 0
+
+	def rank(self, key: Key) -> int:
+		"""
+		Count the strings lexicographically smaller than a string, which need not be in the frozen trie.
+		:param key: the string
+		:return: the rank of the string, which is its index in sorted order if it is in the frozen trie
+		"""
+		return rank_walk(0, self._edges, self._is_terminal, self._count, encode_key(key))
+
+	def select(self, i: int) -> Key:
+		"""
+		Get the string with a given rank.
+		:param i: the rank, negative to count from the end as for lists
+		:return: the i-th smallest string
+		"""
+		if i < 0:
+			i += self._size
+		if not 0 <= i < self._size:
+			raise IndexError(f"rank {i} out of range for {self._size} keys")
+		return decode_key(select_walk(0, self._edges, self._is_terminal, self._count, i), self.key_type)
+
+	def floor(self, key: Key) -> Optional[Key]:
+		"""
+		Get the greatest string in the frozen trie that is smaller than or equal to a string.
+		:param key: the string
+		:return: the greatest string smaller than or equal to the string, None if there is none
+		"""
+		if key in self:
+			return decode_key(encode_key(key), self.key_type)
+		rank = self.rank(key)
+		return self.select(rank - 1) if rank > 0 else None
+
+	def ceiling(self, key: Key) -> Optional[Key]:
+		"""
+		Get the smallest string in the frozen trie that is greater than or equal to a string.
+		:param key: the string
+		:return: the smallest string greater than or equal to the string, None if there is none
+		"""
+		rank = self.rank(key)
+		return self.select(rank) if rank < self._size else None
+
+	def keys_between(self, lo: Optional[Key] = None, hi: Optional[Key] = None) -> list[Key]:
+		"""
+		Get the strings between two bounds, both included, in lexicographic order.
+		:param lo: the lower bound, None for no lower bound
+		:param hi: the upper bound, None for no upper bound
+		:return: list of the strings between the bounds
+		"""
+		key_type = self.key_type
+		upper = encode_key(hi) if hi is not None else None
+		lower = encode_key(lo) if lo is not None else None
+		results = []
+		if lower is not None and (upper is None or lower <= upper) and lo in self:
+			results.append(decode_key(lower, key_type))
+		for path, _ in ordered_walk(b"", 0, self._edges, self._is_terminal, lower):
+			if upper is not None and path > upper:
+				break
+			results.append(decode_key(path, key_type))
+		return results
+
+	def top_k(self, q: Key, k: int) -> list[Key]:
+		"""
+		Get the k strings with the highest weights among those with a given prefix.
+		:param q: prefix to search for
+		:param k: number of strings to return
+		:return: list of at most k strings, by descending weight
+		"""
+		if not self.weighted:
+			raise ValueError("The frozen trie is not weighted")
+		if k < 0:
+			raise ValueError(f"k must be non-negative, got {k}")
+		located = self._locate(encode_key(q))
+		if located is None or k == 0:
+			return []
+		paths = best_first(
+			*located, self._edges, self._is_terminal, self._weight.__getitem__, self._max_weight.__getitem__, k
+		)
+		return [decode_key(path, self.key_type) for path in paths]
+
+	def fuzzy_search(self, q: Key, max_distance: int) -> list[tuple[Key, int]]:
+		"""
+		Search for all strings within a Levenshtein distance of a query.
+		:param q: the query
+		:param max_distance: the maximum number of inserted, deleted or substituted characters
+		:return: list of (string, distance) pairs, in lexicographic order
+		"""
+		return self._fuzzy_search(q, max_distance, False)
+
+	def fuzzy_prefix_search(self, q: Key, max_distance: int) -> list[tuple[Key, int]]:
+		"""
+		Search for all strings with a prefix within a Levenshtein distance of a query.
+		:param q: the query
+		:param max_distance: the maximum number of inserted, deleted or substituted characters
+		:return: list of (string, smallest distance between the query and a prefix of the string) pairs,
+			in lexicographic order
+		"""
+		return self._fuzzy_search(q, max_distance, True)
+
+	def _fuzzy_search(self, q: Key, max_distance: int, prefix: bool) -> list[tuple[Key, int]]:
+		if max_distance < 0:
+			raise ValueError(f"max_distance must be non-negative, got {max_distance}")
+		code_points = self.key_type is str
+		query = characters(encode_key(q), code_points)
+		key_type = self.key_type
+		return [
+			(decode_key(path, key_type), distance)
+			for path, _, distance in fuzzy_walk(
+				b"", 0, self._edges, self._is_terminal, query, max_distance, prefix, code_points
+			)
+		]
+
+	def match(self, pattern: Key, regex: bool = False) -> list[Key]:
+		"""
+		Search for all strings matching a glob pattern or a regular expression.
+		:param pattern: the pattern (see trie.pattern.compile_pattern for the supported syntax)
+		:param regex: whether the pattern is a regular expression instead of a glob pattern
+		:return: list of matching strings, in lexicographic order
+		"""
+		automaton = compile_pattern(pattern_characters(pattern, self.key_type), regex)
+		key_type = self.key_type
+		return [
+			decode_key(path, key_type)
+			for path, _ in automaton_walk(b"", 0, self._edges, self._is_terminal, automaton, key_type is str)
+		]
+
+	def _prefix_nodes(self, q: bytes) -> Iterator[tuple[int, int]]:
+		"""
+		Walk down the path of a string once, yielding the terminal nodes of the keys that are prefixes of it.
+		:param q: encoded string
+		:return: iterator of (length of the key, terminal node) pairs, shortest key first
+		"""
+		p, l = 0, len(q)
+		node = 0
+		if self._terminal[node]:
+			yield 0, node
+		while p < l:
+			node = self._child(node, q[p])
+			if node < 0:
+				return
+			label = self._label(node)
+			if not q.startswith(label, p):
+				return
+			p += len(label)
+			if self._terminal[node]:
+				yield p, node
+
+	def prefixes_of(self, q: Key) -> list[Key]:
+		"""
+		Get all strings in the frozen trie that are prefixes of a query, in a single walk down its path.
+		:param q: the query
+		:return: list of strings that are prefixes of the query (including the query itself), shortest first
+		"""
+		encoded = encode_key(q)
+		key_type = self.key_type
+		return [decode_key(encoded[:length], key_type) for length, _ in self._prefix_nodes(encoded)]
+
+	def longest_prefix(self, q: Key) -> Optional[Key]:
+		"""
+		Get the longest string in the frozen trie that is a prefix of a query.
+		:param q: the query
+		:return: the longest string that is a prefix of the query (possibly the query itself), None if there is none
+		"""
+		item = self.longest_prefix_item(q)
+		return item[0] if item is not None else None
+
+	def longest_prefix_item(self, q: Key) -> Optional[tuple[Key, Any]]:
+		"""
+		Get the longest string in the frozen trie that is a prefix of a query, along with its value.
+		:param q: the query
+		:return: (string, value) pair, None if no string is a prefix of the query
+		"""
+		encoded = encode_key(q)
+		longest = None
+		for longest in self._prefix_nodes(encoded):
+			pass
+		if longest is None:
+			return None
+		length, node = longest
+		return decode_key(encoded[:length], self.key_type), self._value(node)
+
+	def __getitem__(self, key: Key) -> Any:
+		node = self._search(encode_key(key))
+		if node < 0 or not self._terminal[node]:
+			raise KeyError(key)
+		return self._value(node)
+
+	def __contains__(self, key: object) -> bool:
+		try:
+			node = self._search(encode_key(key))
+		except TypeError:
+			return False
+		return node >= 0 and self._terminal[node] != 0
+
+	def __len__(self) -> int:
+		return self._size
+
+	def __iter__(self) -> Iterator[Key]:
+		key_type = self.key_type
+		for path, _ in ordered_walk(b"", 0, self._edges, self._is_terminal):
+			yield decode_key(path, key_type)
+
+	def __repr__(self) -> str:
+		return f"{type(self).__name__}(node_count={self.node_count}, key_count={self._size})"
@@ -0,0 +1,139 @@
+import gzip
+import io
+import mmap as mmap_module
+import os
+import unicodedata
+from typing import Iterable, Iterator, Optional, Union
+
+from .keys import Key, check_key_type
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+"""Size of the read buffer of read_keys, in bytes."""
+
+COMPRESSIONS = ("gzip", "zstd")
+"""Compressed formats read by read_keys."""
+
+_MAGIC_NUMBERS = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+
+
+def detect_compression(path: Union[str, os.PathLike]) -> Optional[str]:
+	"""
+	Detect the compression of a file from its first bytes.
+	:param path: path of the file
+	:return: "gzip", "zstd", or None if the file is not compressed
+	"""
+	with open(path, "rb") as file:
+		head = file.read(4)
+	for magic, compression in _MAGIC_NUMBERS.items():
+		if head.startswith(magic):
+			return compression
+	return None
+
+
+def _zstd_reader(file):
+	"""
+	Open a zstd stream, with the standard library module of Python 3.14 or the zstandard package.
+	:param file: the compressed file
+	:return: a readable decompressed stream
+	"""
+	try:
+		from compression import zstd
+		return zstd.ZstdFile(file)
+	except ImportError:
+		pass
+	try:
+		import zstandard
+	except ImportError:
+		raise ImportError("Reading zstd files requires Python 3.14 or the zstandard package") from None
+	return zstandard.ZstdDecompressor().stream_reader(file)
+
+
+def read_keys(
+		path: Union[str, os.PathLike], key_type: type = str, compression: Optional[str] = "auto", mmap: bool = False,
+		buffer_size: int = DEFAULT_BUFFER_SIZE
+) -> Iterator[Key]:
+	"""
+	Stream the keys of a file with one key per line, without reading the whole file into memory.
+	Only the line terminator ("\\n" or "\\r\\n") is removed; see normalize for further cleaning.
+	:param path: path of the file
+	:param key_type: the type of the keys, str (decoded from UTF-8, with invalid bytes kept as surrogates) or bytes
+	:param compression: "gzip", "zstd", None for an uncompressed file, or "auto" to detect it from the file
+	:param mmap: memory-map an uncompressed file instead of reading it through a buffer
+	:param buffer_size: size of the read buffer, in bytes
+	:return: iterator of the keys
+	"""
+	key_type = check_key_type(key_type)
+	if compression == "auto":
+		compression = detect_compression(path)
+	if compression is not None and compression not in COMPRESSIONS:
+		raise ValueError(f"Unknown compression {compression!r}, expected one of {', '.join(COMPRESSIONS)}")
+	if mmap and compression is not None:
+		raise ValueError("Compressed files cannot be memory-mapped")
+
+	with open(path, "rb", buffering=0) as file:
+		if mmap:
+			if os.fstat(file.fileno()).st_size == 0:  # empty files cannot be mapped
+				return
+			stream = mmap_module.mmap(file.fileno(), 0, access=mmap_module.ACCESS_READ)
+		elif compression == "gzip":
+			stream = gzip.GzipFile(fileobj=file)
+		elif compression == "zstd":
+			stream = _zstd_reader(file)
+		else:
+			stream = file
+		with stream:
+			lines = iter(stream.readline, b"") if mmap else io.BufferedReader(stream, buffer_size)
+			for line in lines:
+				if line.endswith(b"\n"):
+					line = line[:-2] if line.endswith(b"\r\n") else line[:-1]
+				yield line.decode("utf-8", "surrogateescape") if key_type is str else line
+
+
+def normalize(
+		keys: Iterable[Key], strip: bool = True, lower: bool = False, form: Optional[str] = None,
+		skip_empty: bool = True
+) -> Iterator[Key]:
+	"""
+	Clean a stream of keys lazily.
+	:param keys: the keys
+	:param strip: remove leading and trailing whitespace
+	:param lower: convert to lowercase
+	:param form: Unicode normalization form of str keys ("NFC", "NFD", "NFKC" or "NFKD"), None to keep them as they are
+	:param skip_empty: drop keys that are empty after cleaning
+	:return: iterator of the cleaned keys
+	"""
+	for key in keys:
+		if strip:
+			key = key.strip()
+		if lower:
+			key = key.lower()
+		if form is not None and isinstance(key, str):
+			key = unicodedata.normalize(form, key)
+		if skip_empty and not key:
+			continue
+		yield key
+
+
+def deduplicate(keys: Iterable[Key], presorted: bool = False) -> Iterator[Key]:
+	"""
+	Drop repeated keys from a stream, keeping the first occurrence.
+	Sorted streams only need to compare every key with the previous one, in constant memory;
+	otherwise the keys seen so far are kept in a set, which grows with the number of distinct keys.
+	Inserting into a trie already ignores repeated keys, so this is only needed for other consumers
+	or to avoid the cost of repeated inserts.
+	:param keys: the keys
+	:param presorted: whether repeated keys are adjacent, as in a sorted stream
+	:return: iterator of the distinct keys
+	"""
+	if presorted:
+		previous = None
+		for key in keys:
+			if key != previous:
+				yield key
+			previous = key
+		return
+	seen = set()
+	for key in keys:
+		if key not in seen:
+			seen.add(key)
+			yield key
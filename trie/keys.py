@@ -0,0 +1,72 @@
+from typing import Union
+
+Key = Union[str, bytes]
+"""A trie key: either a string, stored as its UTF-8 encoding, or raw bytes."""
+
+KEY_TYPES = (str, bytes)
+
+BYTE_LABELS = tuple(bytes((b,)) for b in range(256))
+"""Single-byte edge labels, indexed by byte value."""
+
+
+def encode_key(key: Key) -> bytes:
+	"""
+	Encode a key into the bytes stored along the edges of a trie.
+	Strings are encoded as UTF-8, so code points of any size become byte transitions.
+	Lone surrogates produced by decoding invalid UTF-8 (surrogateescape) map back to their original bytes.
+	:param key: the key to encode
+	:return: the encoded key
+	"""
+	if isinstance(key, str):
+		return key.encode("utf-8", "surrogateescape")
+	if isinstance(key, bytes):
+		return key
+	if isinstance(key, (bytearray, memoryview)):
+		return bytes(key)
+	raise TypeError(f"Trie keys must be str or bytes, got {type(key).__name__}")
+
+
+def decode_key(data: bytes, key_type: type) -> Key:
+	"""
+	Decode the bytes along a trie path back into a key.
+	:param data: the encoded key
+	:param key_type: str or bytes
+	:return: the decoded key
+	"""
+	if key_type is str:
+		return data.decode("utf-8", "surrogateescape")
+	return data
+
+
+def pattern_characters(pattern: Key, key_type: type) -> str:
+	"""
+	Convert a pattern into the characters matched against the keys of a trie:
+	code points for str keys, and bytes (as the code points 0-255) for bytes keys.
+	:param pattern: the pattern, str or bytes
+	:param key_type: the key type of the trie
+	:return: the pattern as a string with one character per matched character
+	"""
+	encoded = encode_key(pattern)
+	if key_type is str:
+		return encoded.decode("utf-8", "surrogateescape")
+	return encoded.decode("latin-1")
+
+
+def check_key_type(key_type: type) -> type:
+	"""
+	Validate the key type of a trie.
+	:param key_type: str or bytes
+	:return: the key type
+	"""
+	if key_type not in KEY_TYPES:
+		raise TypeError(f"Trie key type must be str or bytes, got {key_type!r}")
+	return key_type
+
+
+def format_label(label: bytes) -> str:
+	"""
+	Format an edge label for display, escaping bytes that are not valid UTF-8.
+	:param label: the edge label
+	:return: the printable label
+	"""
+	return label.decode("utf-8", "backslashreplace")
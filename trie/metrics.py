@@ -0,0 +1,261 @@
+import functools
+import time
+from typing import Any, Callable, Optional
+
+INSTRUMENTED_OPERATIONS = (
+	"insert", "remove", "search", "get", "range_search", "count_prefix", "longest_prefix", "top_k",
+)
+"""Operations of a trie that are timed and counted once its metrics are enabled."""
+
+_LATENCY_BOUNDS = tuple(2 ** k for k in range(8, 35))  # 256 ns to 17 s
+_NODES_VISITED_BOUNDS = tuple(2 ** k for k in range(11))  # 1 to 1024 nodes
+
+
+class Histogram:
+	"""
+	A histogram of non-negative integers with a bounded relative error, in the style of HdrHistogram.
+
+	Values up to 2^significant_bits are counted exactly. Above, every range between powers of two is split into
+	2^(significant_bits - 1) buckets of equal width, so a value is known to within 2^(1 - significant_bits)
+	of itself (about 3% with the default 5 bits) at any magnitude, and recording is a couple of integer operations
+	into a list that grows with the largest value.
+	The ranges include their upper power of two, so that every power of two is the largest value of its bucket
+	and the count of the values at or below it is exact, as for the inclusive le buckets of Prometheus.
+
+	Attributes:
+		significant_bits: the number of significant bits kept of every value
+		counts: the number of values in every bucket
+		count: the number of values
+		total: the sum of the values
+		min: the smallest value, None if empty
+		max: the largest value, None if empty
+	"""
+
+	def __init__(self, significant_bits: int = 5):
+		"""
+		Initializes an empty histogram.
+		:param significant_bits: the number of significant bits kept of every value, at least 2
+		"""
+		if significant_bits < 2:
+			raise ValueError(f"significant_bits must be at least 2, got {significant_bits}")
+		self.significant_bits = significant_bits
+		self._sub_buckets = 1 << significant_bits
+		self._half = self._sub_buckets >> 1
+		self.counts: list[int] = []
+		self.count = 0
+		self.total = 0
+		self.min: Optional[int] = None
+		self.max: Optional[int] = None
+
+	def _index(self, value: int) -> int:
+		"""
+		Get the bucket of a value.
+		:param value: the value
+		:return: the index of the bucket
+		"""
+		if value <= self._sub_buckets:
+			return value
+		value -= 1  # (2^k, 2^(k + 1)] shares the buckets of [2^k, 2^(k + 1))
+		shift = value.bit_length() - self.significant_bits
+		return shift * self._half + (value >> shift) + 1
+
+	def _upper_bound(self, index: int) -> int:
+		"""
+		Get the largest value of a bucket.
+		:param index: the index of the bucket
+		:return: the largest value counted in the bucket
+		"""
+		if index <= self._sub_buckets:
+			return index
+		index -= 1
+		shift = index // self._half - 1
+		return (index - shift * self._half + 1) << shift
+
+	def record(self, value: int):
+		"""
+		Record a value.
+		:param value: the value, a non-negative integer
+		"""
+		index = self._index(value)
+		counts = self.counts
+		if index >= len(counts):
+			counts.extend([0] * (index + 1 - len(counts)))
+		counts[index] += 1
+		self.count += 1
+		self.total += value
+		if self.max is None or value > self.max:
+			self.max = value
+		if self.min is None or value < self.min:
+			self.min = value
+
+	@property
+	def mean(self) -> float:
+		return self.total / self.count if self.count else 0.0
+
+	def percentile(self, p: float) -> int:
+		"""
+		Get a percentile of the values, as the largest value of the bucket holding it.
+		:param p: the percentile, between 0 and 100
+		:return: the value, 0 if empty
+		"""
+		if not 0 <= p <= 100:
+			raise ValueError(f"p must be between 0 and 100, got {p}")
+		if not self.count:
+			return 0
+		rank = max(1, -(-self.count * p // 100))  # the ceiling, at least the first value
+		seen = 0
+		for index, bucket_count in enumerate(self.counts):
+			seen += bucket_count
+			if seen >= rank:
+				return max(min(self._upper_bound(index), self.max), self.min)
+		return self.max
+
+	def count_at_most(self, value: int) -> int:
+		"""
+		Count the values of the buckets that lie entirely at or below a value.
+		:param value: the value
+		:return: the number of values
+		"""
+		return sum(
+			bucket_count for index, bucket_count in enumerate(self.counts[:self._index(value) + 1])
+			if self._upper_bound(index) <= value
+		)
+
+	def summary(self, scale: float = 1.0) -> dict[str, float]:
+		"""
+		Summarize the histogram.
+		:param scale: factor applied to the values, such as 1e-9 for nanoseconds to seconds
+		:return: dictionary of the count, the mean, the maximum and the 50th, 90th, 99th and 99.9th percentiles
+		"""
+		summary = {"count": self.count, "mean": self.mean * scale}
+		for p in (50, 90, 99, 99.9):
+			summary[f"p{p:g}".replace(".", "")] = self.percentile(p) * scale
+		summary["max"] = (self.max or 0) * scale
+		return summary
+
+
+class TrieMetrics:
+	"""
+	Counters and histograms of the operations of a trie, created by Trie.enable_metrics.
+	They are updated without locking, so threads sharing a trie may lose a few counts.
+
+	Attributes:
+		operations: the number of calls of every instrumented operation
+		latency: histogram of the latencies of every operation, in nanoseconds
+		nodes_visited: histogram of the nodes visited by every operation: the root and the nodes reached from it
+			on the path of the key or prefix, and the nodes reached in the subtrees that range_search and top_k walk
+		edge_splits: the number of edges split by inserts (Patricia tries)
+		edge_merges: the number of edges merged by removes (Patricia tries)
+		visited: the nodes visited so far by the operation in progress, added to by the walks of the trie
+	"""
+
+	def __init__(self, operations: tuple[str, ...] = INSTRUMENTED_OPERATIONS):
+		"""
+		Initializes empty metrics.
+		:param operations: the instrumented operations
+		"""
+		self.operations = {operation: 0 for operation in operations}
+		self.latency = {operation: Histogram() for operation in operations}
+		self.nodes_visited = {operation: Histogram() for operation in operations}
+		self.edge_splits = 0
+		self.edge_merges = 0
+		self.visited = 0
+
+	def reset(self):
+		"""
+		Clear all counters and histograms.
+		"""
+		self.__init__(tuple(self.operations))
+
+	def to_dict(self) -> dict[str, Any]:
+		"""
+		Export the metrics as a dictionary, with latencies in seconds.
+		:return: dictionary of the counters and of summaries of the histograms of the operations that were called
+		"""
+		called = [operation for operation, count in self.operations.items() if count]
+		return {
+			"operations": dict(self.operations),
+			"edge_splits": self.edge_splits,
+			"edge_merges": self.edge_merges,
+			"latency_seconds": {operation: self.latency[operation].summary(1e-9) for operation in called},
+			"nodes_visited": {operation: self.nodes_visited[operation].summary() for operation in called},
+		}
+
+	def to_prometheus(self, namespace: str = "trie", labels: Optional[dict[str, str]] = None) -> str:
+		"""
+		Export the metrics in the Prometheus text exposition format.
+		The histograms are exported with fixed buckets at powers of two (of nanoseconds for the latencies),
+		which are the upper bounds of buckets of the underlying histograms, so the cumulative counts are exact.
+		:param namespace: the prefix of the metric names
+		:param labels: labels added to every sample, such as the name of the trie
+		:return: the exposition text
+		"""
+		base_labels = [f'{name}="{_escape(value)}"' for name, value in (labels or {}).items()]
+
+		def sample(name: str, value: float, **extra: str) -> str:
+			pairs = base_labels + [f'{label}="{_escape(label_value)}"' for label, label_value in extra.items()]
+			return f"{namespace}_{name}{{{','.join(pairs)}}} {value:g}" if pairs else f"{namespace}_{name} {value:g}"
+
+		lines = [
+			f"# HELP {namespace}_operations_total Number of calls of every operation.",
+			f"# TYPE {namespace}_operations_total counter",
+		]
+		lines += [sample("operations_total", count, operation=operation) for operation, count in self.operations.items()]
+		for name, value, description in [
+			("edge_splits_total", self.edge_splits, "Number of edges split by inserts."),
+			("edge_merges_total", self.edge_merges, "Number of edges merged by removes."),
+		]:
+			lines += [f"# HELP {namespace}_{name} {description}", f"# TYPE {namespace}_{name} counter", sample(name, value)]
+		for name, histograms, bounds, scale, description in [
+			("operation_latency_seconds", self.latency, _LATENCY_BOUNDS, 1e-9, "Latency of every operation."),
+			("nodes_visited", self.nodes_visited, _NODES_VISITED_BOUNDS, 1, "Nodes visited by every operation."),
+		]:
+			lines += [f"# HELP {namespace}_{name} {description}", f"# TYPE {namespace}_{name} histogram"]
+			for operation, histogram in histograms.items():
+				for bound in bounds:
+					lines.append(sample(
+						f"{name}_bucket", histogram.count_at_most(bound), operation=operation, le=f"{bound * scale:g}"
+					))
+				lines.append(sample(f"{name}_bucket", histogram.count, operation=operation, le="+Inf"))
+				lines.append(sample(f"{name}_sum", histogram.total * scale, operation=operation))
+				lines.append(sample(f"{name}_count", histogram.count, operation=operation))
+		return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+	"""
+	Escape a label value for the Prometheus text format.
+	:param value: the value
+	:return: the escaped value
+	"""
+	return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def instrument(trie, name: str, metrics: TrieMetrics) -> Callable:
+	"""
+	Wrap an operation of a trie to count its calls, record its latency and the nodes it visits.
+	The walks of the trie add the nodes they visit to metrics.visited as they finish, so the operation is not
+	repeated to count them; an operation called by another one is counted for both.
+	:param trie: the trie
+	:param name: the name of the operation
+	:param metrics: the metrics to record into
+	:return: the wrapped operation, bound to the trie
+	"""
+	method = getattr(type(trie), name)
+	operations, latency, nodes_visited = metrics.operations, metrics.latency[name], metrics.nodes_visited[name]
+	perf_counter_ns = time.perf_counter_ns
+
+	@functools.wraps(method)
+	def wrapper(*args, **kwargs):
+		outer, metrics.visited = metrics.visited, 0
+		start = perf_counter_ns()
+		try:
+			return method(trie, *args, **kwargs)
+		finally:
+			latency.record(perf_counter_ns() - start)
+			visited = metrics.visited
+			nodes_visited.record(visited)
+			metrics.visited = outer + visited
+			operations[name] += 1
+
+	return wrapper
@@ -1,31 +1,48 @@
-from typing import Optional, Self
+import weakref
+from typing import Any, Iterator, Optional, Self, Union
 
-import numpy as np
 from graphviz import Digraph
 
+from .base import Trie
+from .children import ChildMap, SortedChildMap
+from .keys import Key, decode_key, encode_key, format_label
+from .walk import NO_WEIGHT
+
 
 class PatriciaTrieNode:
 	"""
 	A node in a Patricia trie.
 
 	Attributes:
-		s: the string
+		s: the encoded key the substring is taken from; s[:p + l] is the path from the root to this node
 		p: the starting index of the substring
 		l: the length of the substring
-		parent: the parent node
-		children: array of children, indexed by ASCII values
-		num_children: number of non-None children
+		parent: the parent node, not maintained once the trie is persistent (nodes are then shared between versions)
+		children: map of children, keyed by the first bytes of their substrings
+		terminal: whether a key ends at this node
+		value: the value stored with the key ending at this node
+		count: the number of keys in the subtree of this node
 	"""
+	__slots__ = ("s", "p", "l", "parent", "children", "terminal", "value", "count")
 
-	def __init__(self, s: Optional[str], p: int, l: int):
+	def __init__(self, s: Optional[bytes], p: int, l: int, child_map: type[ChildMap] = SortedChildMap):
 		self.s = s
 		self.p = p
 		self.l = l
 		self.parent = None
-		self.children = np.full(256, None)
-		self.num_children = 0
+		self.children = child_map()
+		self.terminal = False
+		self.value = None
+		self.count = 0
+
+	@property
+	def num_children(self) -> int:
+		"""
+		Number of children of the node.
+		"""
+		return len(self.children)
 
-	def substring(self) -> str:
+	def substring(self) -> bytes:
 		"""
 		Get the substring of the node.
 		:return: the substring of the node
@@ -37,25 +54,30 @@ class PatriciaTrieNode:
 		Check if the node is a leaf.
 		:return: True if the node is a leaf, False otherwise
 		"""
-		return self.num_children == 0
+		return len(self.children) == 0
+
+	def key(self) -> bytes:
+		"""
+		Get the encoded path from the root to the node, which is the key if the node is terminal.
+		:return: the path of the node
+		"""
+		return self.s[:self.p + self.l] if self.s is not None else b""
 
-	def transition(self, c: chr) -> Optional[Self]:
+	def transition(self, b: int) -> Optional[Self]:
 		"""
-		Transition to the child node corresponding to the substring starting with character c.
-		:param c: first character of the substring to transition to
-		:return: the child node corresponding to the substring starting with character c if it exists, None otherwise
+		Transition to the child node corresponding to the substring starting with byte b.
+		:param b: first byte of the substring to transition to
+		:return: the child node corresponding to the substring starting with byte b if it exists, None otherwise
 		"""
-		return self.children[ord(c)]
+		return self.children.get(b)
 
 	def insert(self, node: Self):
 		"""
 		Insert a node into the Patricia trie
 		:param node: the node to insert
 		"""
-		if self.children[ord(node.s[node.p])] is None:
-			self.num_children += 1
 		node.parent = self
-		self.children[ord(node.s[node.p])] = node
+		self.children.set(node.s[node.p], node)
 
 	def remove(self, node: Self) -> bool:
 		"""
@@ -63,11 +85,9 @@ class PatriciaTrieNode:
 		:param node: the node to remove
 		:return: True if the node was removed, False otherwise
 		"""
-		child = self.children[ord(node.s[node.p])]
+		child = self.children.pop(node.s[node.p])
 		if child is not None:
 			child.parent = None
-			self.num_children -= 1
-			self.children[ord(node.s[node.p])] = None
 			return True
 		return False
 
@@ -76,155 +96,646 @@ class PatriciaTrieNode:
 		Check how many children does the node have.
 		:return: the first child if it exists, and a boolean indicating if it is the only child
 		"""
-		if self.num_children > 0:
-			for child in self.children:
-				if child is not None:
-					return child, self.num_children == 1
+		first_child = self.children.first()
+		if first_child is not None:
+			return first_child, len(self.children) == 1
 		return None, False
 
 
-class PatriciaTrie:
+class WeightedPatriciaTrieNode(PatriciaTrieNode):
+	"""
+	A node in a weighted Patricia trie.
+
+	Attributes:
+		weight: the weight of the key ending at this node
+		max_weight: the maximum weight of the keys in the subtree of this node
+	"""
+	__slots__ = ("weight", "max_weight")
+
+	def __init__(self, s: Optional[bytes], p: int, l: int, child_map: type[ChildMap] = SortedChildMap):
+		super().__init__(s, p, l, child_map)
+		self.weight = None
+		self.max_weight = NO_WEIGHT
+
+
+def _label_matches(s: bytes, end: int, node: PatriciaTrieNode) -> bool:
+	"""
+	Check that an encoded string matches a node's edge label up to position end, knowing that the string
+	matches the path down to the node and the first byte of the label.
+	Since node.s[:node.p] is that path, the label is compared in place, without copying it:
+	the string and node.s are compared from the start when one of them ends at end (a label ending its key,
+	or a query ending on the edge), and through memoryviews sharing their buffers otherwise.
+	:param s: the encoded string, at least end bytes long
+	:param end: the position in the string where the comparison stops, at most node.p + node.l
+	:param node: the node below the edge
+	:return: True if s[:end] == node.s[:end], False otherwise
+	"""
+	node_s, start = node.s, node.p + 1
+	if end <= start:
+		return True
+	if len(node_s) == end:
+		return s.startswith(node_s)
+	if len(s) == end:
+		return node_s.startswith(s)
+	return memoryview(s)[start: end] == memoryview(node_s)[start: end]
+
+
+def _split_point(s: bytes, p: int, node: PatriciaTrieNode) -> int:
+	"""
+	Get the length of the common prefix of a node's edge label and an encoded string from position p,
+	knowing that their first bytes match.
+	A full match, the common case on the way down, is checked in place with a single comparison;
+	the split point is only searched byte by byte on the edge where the string leaves the trie.
+	:param s: the encoded string
+	:param p: the position in the string where the edge starts, which is node.p
+	:param node: the node below the edge
+	:return: the length of the common prefix, node.l for a full match
+	"""
+	n, node_s = node.l, node.s
+	if n == 1:
+		return 1
+	m = len(s) - p
+	if m >= n and _label_matches(s, p + n, node):
+		return n
+	k, m = 1, min(n, m)
+	while k < m and s[p + k] == node_s[p + k]:
+		k += 1
+	return k
+
+
+class PatriciaTrie(Trie):
 	"""
 	Initializes a Patricia trie.
+	Keys are str (stored as UTF-8) or bytes, and edges are labelled with byte substrings.
+	It is a mutable mapping, with the value of every key stored on its terminal node.
+
+	Once a snapshot has been taken, the trie becomes persistent: instead of changing nodes in place,
+	insert and remove copy the nodes on the path to the change (path copying), so every snapshot keeps
+	sharing the unchanged subtrees and is freed as soon as it is no longer referenced.
+	The first change after the last snapshot has been freed restores the parent links in one pass over the nodes,
+	and changes are made in place again from then on.
 
 	Attributes:
 		root: the root node
+		child_map: the child map representation used by the nodes
+		key_type: the type of the keys returned by queries (str or bytes)
+		weighted: whether keys carry weights and nodes cache the maximum weight of their subtree
+		persistent: whether nodes are copied instead of changed in place
 	"""
 
-	def __init__(self):
+	def __init__(self, child_map: Union[str, type[ChildMap]] = "sorted", key_type: type = str, weighted: bool = False):
 		"""
 		Initializes a Patricia trie.
+		:param child_map: the child map representation, either a name ("array", "dict", "sorted", "adaptive")
+			or a ChildMap subclass
+		:param key_type: the type of the keys returned by queries, str or bytes; both are accepted as input
+		:param weighted: whether keys carry weights, which enables top_k queries
 		"""
-		self.root = PatriciaTrieNode(None, 0, 0)
+		self.persistent = False
+		self._snapshots = 0
+		super().__init__(child_map, key_type, weighted)
 
-	def search(self, q: str) -> Optional[PatriciaTrieNode]:
+	def _new_node(self, s: Optional[bytes], p: int, l: int) -> PatriciaTrieNode:
+		"""
+		Create a node of the class used by this trie.
+		:param s: the encoded key the substring is taken from
+		:param p: the starting index of the substring
+		:param l: the length of the substring
+		:return: the new node
 		"""
-		Search for a string in the Patricia trie.
-		:param q: string to search for
+		if self.weighted:
+			return WeightedPatriciaTrieNode(s, p, l, self.child_map)
+		return PatriciaTrieNode(s, p, l, self.child_map)
+
+	def _new_root(self) -> PatriciaTrieNode:
+		return self._new_node(None, 0, 0)
+
+	def _edge_label(self, b: int, node: PatriciaTrieNode) -> bytes:
+		return node.substring()
+
+	def _label_length(self, node: PatriciaTrieNode) -> int:
+		return node.l
+
+	def _label_source(self, node: PatriciaTrieNode) -> Optional[bytes]:
+		return node.s
+
+	def _search(self, q: bytes) -> Optional[PatriciaTrieNode]:
+		"""
+		Search for the node at which an encoded string ends, terminal or not.
+		:param q: encoded string to search for
 		:return: the node corresponding to the string if it exists, None otherwise
 		"""
-		q = q + chr(0)
 		p, l = 0, len(q)
-		current_node = self.root
-		while not current_node.is_leaf() and p < l:
-			child_node = current_node.transition(q[p])
+		current_node, visited = self.root, 1
+		while p < l:
+			child_node = current_node.children.get(q[p])
 			if child_node is None:  # not found
-				return None
-			if q[p: p + child_node.l] != child_node.substring():  # partial match
-				return None
+				current_node = None
+				break
+			visited += 1
+			# The first byte matched in the child map; the rest of the label is compared in place
+			n = child_node.l
+			if n > 1 and (p + n > l or not _label_matches(q, p + n, child_node)):  # partial match
+				current_node = None
+				break
+			p += n
+			current_node = child_node
+		if self.metrics is not None:
+			self.metrics.visited += visited
+		return current_node
+
+	def _prefix_nodes(self, q: bytes) -> Iterator[tuple[int, PatriciaTrieNode]]:
+		"""
+		Walk down the path of a string once, yielding the terminal nodes of the keys that are prefixes of it.
+		Edge labels are compared in place against the query, without building them.
+		:param q: encoded string
+		:return: iterator of (length of the key, terminal node) pairs, shortest key first
+		"""
+		p, l = 0, len(q)
+		current_node, visited = self.root, 1
+		if current_node.terminal:
+			yield 0, current_node
+		while p < l:
+			child_node = current_node.children.get(q[p])
+			if child_node is None:
+				break
+			visited += 1
+			if p + child_node.l > l or not _label_matches(q, p + child_node.l, child_node):  # partial match
+				break
 			p += child_node.l
 			current_node = child_node
-		return current_node if p == l else None
+			if current_node.terminal:
+				yield p, current_node
+		if self.metrics is not None:
+			self.metrics.visited += visited
 
-	def range_search(self, q: str) -> set[str]:
+	def _range_search(self, q: bytes) -> set[Key]:
 		"""
-		Search for all strings with a given prefix in the Patricia trie.
-		:param q: prefix to search for
-		:return: list of strings with the given prefix
+		Search for all strings with a given encoded prefix in the Patricia trie.
+		:param q: encoded prefix to search for
+		:return: set of strings with the given prefix
 		"""
 		p, l = 0, len(q)
-		current_node = self.root
-		while not current_node.is_leaf() and p < l:
-			child_node = current_node.transition(q[p])
+		current_node, visited = self.root, 1
+		results = set()
+		while p < l:
+			child_node = current_node.children.get(q[p])
 			if child_node is None:  # not found
-				return set()
+				current_node = None
+				break
+			visited += 1
 			prefix_len = min(child_node.l, l - p)
-			if q[p: p + prefix_len] != child_node.substring()[:prefix_len]:
-				return set()
+			if not _label_matches(q, p + prefix_len, child_node):
+				current_node = None
+				break
 			p += prefix_len
 			current_node = child_node
-		results = set()
-		stack = [current_node]
+		stack = [current_node] if current_node is not None else []
 		while stack:
 			current_node = stack.pop()
-			if current_node.is_leaf():
-				results.add(current_node.s.replace(chr(0), ""))
-			else:
-				stack.extend([child for child in current_node.children if child is not None])
+			if current_node.terminal:
+				results.add(decode_key(current_node.key(), self.key_type))
+			visited += len(current_node.children)
+			stack.extend(current_node.children.values())
+		if self.metrics is not None:
+			self.metrics.visited += visited
 		return results
 
-	def insert(self, s: str) -> PatriciaTrieNode:
+	def insert(self, s: Key, value: Any = None, weight: Optional[float] = None) -> PatriciaTrieNode:
 		"""
-		Insert a string into the Patricia trie.
+		Insert a string into the Patricia trie, or replace the value of an existing one.
 		:param s: string to insert
+		:param value: value stored with the string
+		:param weight: weight of the string in a weighted trie; None keeps the current weight (0 for a new string)
 		:return: the final node inserted, which corresponds to the given string
 		"""
-		s = s + chr(0)
+		self._check_weight(weight)
+		s = encode_key(s)
+		if self._copy_on_write():
+			return self._insert_persistent(s, value, weight)
+		node, is_new = self._insert(s)
+		if is_new and self.cache is not None:  # a new key changes the results of its prefixes
+			self.cache.invalidate(s)
+		node.value = value
+		if self.weighted:
+			self._set_weight(node, weight, is_new)
+			self._update_max_weights(node)
+		return node
+
+	def _insert(self, s: bytes) -> tuple[PatriciaTrieNode, bool]:
+		"""
+		Insert an encoded string into the Patricia trie and mark its final node as terminal.
+		:param s: encoded string to insert
+		:return: the final node, and whether the string was not in the trie before
+		"""
 		p, l = 0, len(s)
-		current_node = self.root
-		while current_node == self.root or not current_node.is_leaf():
-			child_node = current_node.transition(s[p])
+		current_node, visited = self.root, 1
+		while p < l:
+			visited += 1
+			child_node = current_node.children.get(s[p])
 			if child_node is None:  # insert
-				node_to_insert = PatriciaTrieNode(s, p, l - p)
-				current_node.insert(node_to_insert)
-				return node_to_insert
-			if s[p: p + child_node.l] == child_node.substring():  # full match
-				p, current_node = p + child_node.l, child_node
+				child_node = self._new_node(s, p, l - p)
+				current_node.insert(child_node)
+				current_node = child_node
+				break
+			k = _split_point(s, p, child_node)
+			if k == child_node.l:  # full match
+				p, current_node = p + k, child_node
 				continue
-			k = 1
-			for i in range(1, child_node.l):  # partial match
-				if s[p + i] != child_node.s[child_node.p + i]:
-					k = i
-					break
-			middle_node = PatriciaTrieNode(child_node.s, child_node.p, k)
+			# partial match, split the edge
+			if self.metrics is not None:
+				self.metrics.edge_splits += 1
+			middle_node = self._new_node(child_node.s, child_node.p, k)
+			middle_node.count = child_node.count
 			child_node.p, child_node.l = child_node.p + k, child_node.l - k
 			current_node.insert(middle_node)
 			middle_node.insert(child_node)
-			end_node = PatriciaTrieNode(s, p + k, l - p - k)
-			middle_node.insert(end_node)
-			return end_node
+			current_node = middle_node
+			if p + k < l:  # the string continues past the split
+				visited += 1
+				current_node = self._new_node(s, p + k, l - p - k)
+				middle_node.insert(current_node)
+			break
+		if self.metrics is not None:
+			self.metrics.visited += visited
+		if current_node.terminal:
+			return current_node, False
+		current_node.terminal = True
+		self._size += 1
+		self._update_counts(current_node, 1)
+		return current_node, True
+
+	def _load_sorted(self, records: Iterator[tuple[bytes, Any, Optional[float], int]]):
+		"""
+		Fill an empty Patricia trie from sorted records.
+		The nodes on the path of the previous key are kept on a stack; a new key closes the nodes below its common
+		prefix with the previous key, splits at most one edge, and appends a single leaf.
+		:param records: (encoded key, value, weight, length of the common prefix with the previous key) tuples
+		"""
+		weighted = self.weighted
+		stack = [(self.root, 0)]  # (node, length of the path to the end of the node)
+		for s, value, weight, h in records:
+			l = len(s)
+			closed_node = None
+			while stack[-1][1] > h:  # close the nodes below the common prefix
+				closed_node = stack.pop()[0]
+				if weighted:
+					self._compute_max_weight(closed_node)
+			current_node, depth = stack[-1]
+			if depth < h:  # the common prefix ends inside the edge of the last closed node, split it
+				k = h - depth
+				middle_node = self._new_node(closed_node.s, closed_node.p, k)
+				middle_node.count = closed_node.count
+				closed_node.p, closed_node.l = closed_node.p + k, closed_node.l - k
+				current_node.insert(middle_node)
+				middle_node.insert(closed_node)
+				current_node, depth = middle_node, h
+				stack.append((middle_node, h))
+			if l > depth:
+				child_node = self._new_node(s, depth, l - depth)
+				current_node.insert(child_node)
+				current_node = child_node
+				stack.append((child_node, l))
+			is_new = not current_node.terminal
+			if is_new:
+				current_node.terminal = True
+				self._size += 1
+				for node, _ in stack:
+					node.count += 1
+			current_node.value = value
+			if weighted:
+				self._set_weight(current_node, weight, is_new)
+		if weighted:
+			while stack:
+				self._compute_max_weight(stack.pop()[0])
 
-	def remove(self, s: str) -> bool:
+	def remove(self, s: Key) -> bool:
 		"""
 		Remove a string from the Patricia trie.
 		:param s: string to remove
 		:return: True if the string was removed, False otherwise
 		"""
-		final_node = self.search(s)
-		if final_node is None:  # not found
+		s = encode_key(s)
+		if self._copy_on_write():
+			return self._remove_persistent(s)
+		final_node = self._search(s)
+		if final_node is None or not final_node.terminal:  # not found
 			return False
-		current_node = final_node.parent
-		if current_node is None:  # final node is root (shouldn't happen theoretically, I guess if None is passed as input string s?)
-			return False
-		current_node.remove(final_node)
+		if self.cache is not None:
+			self.cache.invalidate(s)
+		final_node.terminal, final_node.value = False, None
+		self._size -= 1
+		self._update_counts(final_node, -1)
+		if self.weighted:
+			final_node.weight = None
+		if final_node is self.root:  # the empty string
+			if self.weighted:
+				self._update_max_weights(final_node)
+			return True
+		current_node = final_node
+		if final_node.is_leaf():
+			current_node = final_node.parent
+			current_node.remove(final_node)
+		update_from = current_node
+		# A non-terminal node with a single child is merged with it
 		first_child, is_only_child = current_node.check_children()
-		if is_only_child and current_node.parent is not None:
+		if is_only_child and not current_node.terminal and current_node.parent is not None:
+			if self.metrics is not None:
+				self.metrics.edge_merges += 1
 			parent = current_node.parent
 			parent.remove(current_node)
 			first_child.p -= current_node.l
 			first_child.l += current_node.l
 			parent.insert(first_child)
-		if first_child is not None:
-			current_node = first_child
-			while current_node.parent is not None:
-				if current_node.parent.s == final_node.s:
-					current_node.parent.s = current_node.s
-				current_node = current_node.parent
+			current_node, update_from = first_child, parent
+		if self.weighted:
+			self._update_max_weights(update_from)
+		# Nodes on the path may still reference the removed string, so point them to a remaining one
+		removed_s = final_node.s
+		while current_node.parent is not None:
+			if current_node.s is removed_s:
+				first_child = current_node.children.first()
+				current_node.s = first_child.s if first_child is not None else current_node.key()
+			current_node = current_node.parent
 		return True
 
+	def snapshot(self) -> "PatriciaTrieSnapshot":
+		"""
+		Take an immutable, point-in-time view of the trie in O(1).
+		The snapshot shares all nodes with the trie, which becomes persistent for as long as any snapshot is alive,
+		so changes copy the nodes they touch instead of modifying the shared ones.
+		:return: the snapshot
+		"""
+		self.persistent = True
+		snapshot = PatriciaTrieSnapshot(self)
+		self._snapshots += 1
+		weakref.finalize(snapshot, _release_snapshot, weakref.ref(self))
+		return snapshot
+
+	def _copy_on_write(self) -> bool:
+		"""
+		Check whether a change has to copy the nodes it touches, because a snapshot may still share them.
+		Once every snapshot has been freed, the parent links, which path copying does not maintain,
+		are restored and the trie goes back to changing nodes in place.
+		:return: True if the trie is persistent
+		"""
+		if self.persistent and not self._snapshots:
+			stack = [self.root]
+			while stack:
+				node = stack.pop()
+				for child_node in node.children.values():
+					child_node.parent = node
+					stack.append(child_node)
+			self.root.parent = None
+			self.persistent = False
+		return self.persistent
+
+	def _current_version(self) -> tuple[PatriciaTrieNode, int]:
+		"""
+		Get the root and the number of keys of the current version.
+		:return: the root and the size
+		"""
+		return self.root, self._size
+
+	def _publish(self, root: PatriciaTrieNode, size: int):
+		"""
+		Make a new version of a persistent trie the current one.
+		:param root: the root of the new version
+		:param size: the number of keys of the new version
+		"""
+		self.root, self._size = root, size
+
+	def _copy(self, node: PatriciaTrieNode) -> PatriciaTrieNode:
+		"""
+		Copy a node, sharing its children but not its child map.
+		:param node: the node to copy
+		:return: the copy, which is not reachable from any version yet
+		"""
+		copy = self._new_node(node.s, node.p, node.l)
+		copy.children = node.children.copy()
+		copy.terminal, copy.value, copy.count = node.terminal, node.value, node.count
+		if self.weighted:
+			copy.weight, copy.max_weight = node.weight, node.max_weight
+		return copy
+
+	def _insert_persistent(self, s: bytes, value: Any, weight: Optional[float]) -> PatriciaTrieNode:
+		"""
+		Insert an encoded string by path copying, and publish the new version.
+		:param s: encoded string to insert
+		:param value: value stored with the string
+		:param weight: weight of the string in a weighted trie
+		:return: the final node of the string in the new version
+		"""
+		root, size = self._current_version()
+		path = self._insert_path(root, s)
+		node = path[-1]
+		is_new = not node.terminal
+		node.terminal, node.value = True, value
+		if is_new:
+			for copied_node in path:
+				copied_node.count += 1
+			if self.cache is not None:
+				self.cache.invalidate(s)
+		if self.weighted:
+			self._set_weight(node, weight, is_new)
+			for copied_node in reversed(path):
+				self._compute_max_weight(copied_node)
+		self._publish(path[0], size + is_new)
+		return node
+
+	def _insert_path(self, root: PatriciaTrieNode, s: bytes) -> list[PatriciaTrieNode]:
+		"""
+		Copy the path of an encoded string, creating and splitting nodes as needed, without publishing it.
+		:param root: the root of the current version
+		:param s: encoded string
+		:return: the copied nodes from the root to the final node of the string
+		"""
+		current_node = self._copy(root)
+		path = [current_node]
+		p, l = 0, len(s)
+		while p < l:
+			child_node = current_node.children.get(s[p])
+			if child_node is None:  # insert
+				child_node = self._new_node(s, p, l - p)
+				current_node.children.set(s[p], child_node)
+				path.append(child_node)
+				break
+			k = _split_point(s, p, child_node)
+			if k == child_node.l:  # full match
+				child_node = self._copy(child_node)
+				current_node.children.set(s[p], child_node)
+				p, current_node = p + k, child_node
+				path.append(child_node)
+				continue
+			# partial match, split a copy of the edge
+			if self.metrics is not None:
+				self.metrics.edge_splits += 1
+			middle_node = self._new_node(child_node.s, child_node.p, k)
+			middle_node.count = child_node.count
+			child_node = self._copy(child_node)
+			child_node.p, child_node.l = child_node.p + k, child_node.l - k
+			middle_node.children.set(child_node.s[child_node.p], child_node)
+			current_node.children.set(s[p], middle_node)
+			path.append(middle_node)
+			if p + k < l:  # the string continues past the split
+				child_node = self._new_node(s, p + k, l - p - k)
+				middle_node.children.set(s[p + k], child_node)
+				path.append(child_node)
+			break
+		if self.metrics is not None:
+			self.metrics.visited += len(path)
+		return path
+
+	def _remove_persistent(self, s: bytes) -> bool:
+		"""
+		Remove an encoded string by path copying, and publish the new version.
+		:param s: encoded string to remove
+		:return: True if the string was removed, False otherwise
+		"""
+		root, size = self._current_version()
+		path = self._copy_path(root, s)
+		if path is None:  # not found
+			return False
+		if self.cache is not None:
+			self.cache.invalidate(s)
+		for copied_node in path:
+			copied_node.count -= 1
+		final_node = path.pop()
+		final_node.terminal, final_node.value = False, None
+		if self.weighted:
+			final_node.weight = None
+		if not path:  # the empty string
+			path.append(final_node)
+		elif final_node.is_leaf():
+			path[-1].children.pop(s[final_node.p])
+		else:
+			path.append(final_node)
+		# A non-terminal node with a single child is merged with it
+		current_node = path[-1]
+		first_child, is_only_child = current_node.check_children()
+		if is_only_child and not current_node.terminal and len(path) > 1:
+			if self.metrics is not None:
+				self.metrics.edge_merges += 1
+			merged_node = self._copy(first_child)
+			merged_node.p -= current_node.l
+			merged_node.l += current_node.l
+			path[-2].children.set(merged_node.s[merged_node.p], merged_node)
+			path[-1] = merged_node
+		# Copied nodes may still reference the removed string, so point them to a remaining one
+		for current_node in path[1:]:
+			if current_node.s is final_node.s:
+				first_child = current_node.children.first()
+				current_node.s = first_child.s if first_child is not None else current_node.key()
+		if self.weighted:
+			for current_node in reversed(path):
+				self._compute_max_weight(current_node)
+		self._publish(path[0], size - 1)
+		return True
+
+	def _copy_path(self, root: PatriciaTrieNode, s: bytes) -> Optional[list[PatriciaTrieNode]]:
+		"""
+		Copy the path of an encoded string, without publishing it.
+		Nothing is copied if the string is not in the trie.
+		:param root: the root of the current version
+		:param s: encoded string
+		:return: the copied nodes from the root to the final node of the string if it is in the trie, None otherwise
+		"""
+		p, l = 0, len(s)
+		current_node, visited = root, 1
+		while p < l:
+			current_node = current_node.children.get(s[p])
+			if current_node is None:
+				break
+			visited += 1
+			n = current_node.l
+			if n > 1 and (p + n > l or not _label_matches(s, p + n, current_node)):
+				current_node = None
+				break
+			p += n
+		if self.metrics is not None:
+			self.metrics.visited += visited
+		if current_node is None or not current_node.terminal:
+			return None
+		current_node = self._copy(root)
+		path = [current_node]
+		p = 0
+		while p < l:
+			child_node = self._copy(current_node.children.get(s[p]))
+			current_node.children.set(s[p], child_node)
+			p, current_node = p + child_node.l, child_node
+			path.append(child_node)
+		return path
+
 	def visualize(self, file_name: str = "prefix_trie", directory_name: str = "graphviz", view: bool = False):
 		"""
 		Visualize the Patricia trie using graphviz.
+		Nodes where a key ends are drawn with a double border.
 		"""
 
-		def add_nodes(graph: Digraph, node: PatriciaTrieNode, parent_id: str, label: str):
+		def add_nodes(graph: Digraph, node: PatriciaTrieNode, parent_id: str, label: bytes):
 			current_id = str(id(node))
-			label = f"{label.replace(chr(0), '¤')}"
-			graph.node(current_id, label)
+			graph.node(current_id, format_label(label), peripheries="2" if node.terminal else "1")
 			if parent_id is not None:
 				graph.edge(parent_id, current_id)
 
-			for child_node in node.children:
-				if child_node is not None:
-					assert isinstance(child_node, PatriciaTrieNode)
-					add_nodes(graph, child_node, current_id, child_node.substring())
+			for child_node in node.children.values():
+				assert isinstance(child_node, PatriciaTrieNode)
+				add_nodes(graph, child_node, current_id, child_node.substring())
 
 		dot = Digraph(format="png", comment="Patricia Trie")
 		dot.attr(dpi="300")
-		dot.node(str(id(self.root)), "", shape="diamond", style="filled", fillcolor="black", width="0.1", height="0.1")
-		for child in self.root.children:
-			if child is not None:
-				assert isinstance(child, PatriciaTrieNode)
-				add_nodes(dot, child, str(id(self.root)), child.substring())
+		dot.node(
+			str(id(self.root)), "", shape="diamond", style="filled", fillcolor="black", width="0.1", height="0.1",
+			peripheries="2" if self.root.terminal else "1"
+		)
+		for child in self.root.children.values():
+			assert isinstance(child, PatriciaTrieNode)
+			add_nodes(dot, child, str(id(self.root)), child.substring())
 
 		dot.render(filename=file_name, directory=directory_name, view=view)
+
+
+def _release_snapshot(trie_reference: weakref.ref):
+	"""
+	Count a snapshot of a Patricia trie as freed, called when the snapshot is garbage collected.
+	:param trie_reference: weak reference to the trie the snapshot was taken from
+	"""
+	trie = trie_reference()
+	if trie is not None:
+		trie._snapshots -= 1
+
+
+class PatriciaTrieSnapshot(PatriciaTrie):
+	"""
+	An immutable version of a Patricia trie, returned by PatriciaTrie.snapshot.
+	It supports every query of the trie, answered as of the moment the snapshot was taken,
+	and raises TypeError on any change.
+
+	Attributes:
+		root: the root node, shared with the trie the snapshot was taken from
+		child_map: the child map representation used by the nodes
+		key_type: the type of the keys returned by queries (str or bytes)
+		weighted: whether keys carry weights and nodes cache the maximum weight of their subtree
+		persistent: always True
+	"""
+
+	def __init__(self, trie: PatriciaTrie):
+		"""
+		Initializes a snapshot of the current version of a persistent Patricia trie.
+		:param trie: the trie, whose nodes must no longer be changed in place
+		"""
+		self.child_map, self.key_type, self.weighted = trie.child_map, trie.key_type, trie.weighted
+		self.persistent = True
+		self.root, self._size = trie._current_version()
+
+	def snapshot(self) -> Self:
+		return self
+
+	def insert(self, s: Key, value: Any = None, weight: Optional[float] = None):
+		raise TypeError(f"{type(self).__name__} is immutable")
+
+	def remove(self, s: Key) -> bool:
+		raise TypeError(f"{type(self).__name__} is immutable")
+
+	def clear(self):
+		raise TypeError(f"{type(self).__name__} is immutable")
@@ -0,0 +1,396 @@
+from typing import Callable, Optional
+
+Matcher = Callable[[int], bool]
+"""Tell whether a character (a code point, or a byte) can be read by a transition."""
+
+_ANY: Matcher = lambda c: True
+_ANY_BUT_NEWLINE: Matcher = lambda c: c != 10
+_CLASS_ESCAPES: dict[str, Matcher] = {
+	"d": lambda c: chr(c).isdecimal(),
+	"w": lambda c: chr(c).isalnum() or c == 95,
+	"s": lambda c: chr(c).isspace(),
+}
+_LITERAL_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v", "0": "\0"}
+_REPEAT_CHARS = "*+?{"
+
+
+class Automaton:
+	"""
+	A pattern compiled into a nondeterministic finite automaton (Thompson's construction) over characters.
+	It runs as a lazily built deterministic automaton: a state stands for the set of NFA states reachable after
+	the characters read so far, and the transitions between states are computed on first use and cached.
+	States are numbered, with 0 as the dead state, from which nothing is accepted.
+
+	Attributes:
+		start: the start state
+	"""
+
+	DEAD = 0
+
+	def __init__(self, matchers: list[Optional[Matcher]], targets: list[int], epsilons: list[list[int]], accept: int):
+		"""
+		Initializes an automaton from the states of a nondeterministic automaton whose start state is 0.
+		:param matchers: the characters read by the transition out of every state, None for no transition
+		:param targets: the target of the transition out of every state
+		:param epsilons: the targets of the empty transitions out of every state
+		:param accept: the accepting state
+		"""
+		self._matchers = matchers
+		self._targets = targets
+		self._epsilons = epsilons
+		self._accept = accept
+		self._sets: list[frozenset] = []  # the NFA states of every state
+		self._ids: dict[frozenset, int] = {}
+		self._transitions: list[dict[int, int]] = []
+		self._accepting: list[bool] = []
+		self._state(frozenset())
+		self.start = self._state(self._closure([0]))
+
+	def _state(self, nfa_states: frozenset) -> int:
+		"""
+		Get the state standing for a set of NFA states, numbering it if it is new.
+		:param nfa_states: the set of NFA states, closed under empty transitions
+		:return: the state
+		"""
+		state = self._ids.get(nfa_states)
+		if state is None:
+			state = self._ids[nfa_states] = len(self._sets)
+			self._sets.append(nfa_states)
+			self._transitions.append({})
+			self._accepting.append(self._accept in nfa_states)
+		return state
+
+	def _closure(self, states: list[int]) -> frozenset:
+		"""
+		Get the states reachable from some states through empty transitions.
+		:param states: the states
+		:return: the closure of the states
+		"""
+		closure = set(states)
+		stack = list(states)
+		while stack:
+			for target in self._epsilons[stack.pop()]:
+				if target not in closure:
+					closure.add(target)
+					stack.append(target)
+		return frozenset(closure)
+
+	def step(self, state: int, c: int) -> int:
+		"""
+		Read a character.
+		:param state: the current state
+		:param c: the character
+		:return: the next state
+		"""
+		transitions = self._transitions[state]
+		next_state = transitions.get(c)
+		if next_state is None:
+			matchers, targets = self._matchers, self._targets
+			nfa_states = [targets[s] for s in self._sets[state] if matchers[s] is not None and matchers[s](c)]
+			next_state = transitions[c] = self._state(self._closure(nfa_states))
+		return next_state
+
+	def accepts(self, state: int) -> bool:
+		"""
+		Check if a state accepts the characters read so far.
+		:param state: the state
+		:return: True if the state is accepting, False otherwise
+		"""
+		return self._accepting[state]
+
+
+def compile_pattern(pattern: str, regex: bool = False) -> Automaton:
+	"""
+	Compile a glob or regular expression pattern, which has to match whole keys.
+	Glob patterns support ? (any character), * (any string) and [...] classes, negated with [!...],
+	like fnmatch.fnmatchcase. Regular expressions support literals and escapes, ., [...] classes with \\d, \\w, \\s,
+	groups, alternation and the quantifiers *, +, ?, {m}, {m,}, {,n} and {m,n}; ^ and $ are allowed at the ends.
+	:param pattern: the pattern, with one character per code point (or per byte for bytes keys)
+	:param regex: whether the pattern is a regular expression instead of a glob pattern
+	:return: the automaton
+	"""
+	tree = _RegexParser(pattern).parse() if regex else _parse_glob(pattern)
+	builder = _NfaBuilder()
+	start = builder.new_state()
+	accept = builder.build(tree, start)
+	return Automaton(builder.matchers, builder.targets, builder.epsilons, accept)
+
+
+def _parse_glob(pattern: str) -> tuple:
+	"""
+	Parse a glob pattern into a syntax tree.
+	:param pattern: the glob pattern
+	:return: the syntax tree
+	"""
+	items = []
+	i, n = 0, len(pattern)
+	while i < n:
+		c = pattern[i]
+		if c == "*":
+			if not items or items[-1] != ("repeat", ("char", _ANY), 0, None):  # ** is the same as *
+				items.append(("repeat", ("char", _ANY), 0, None))
+			i += 1
+		elif c == "?":
+			items.append(("char", _ANY))
+			i += 1
+		elif c == "[" and pattern.find("]", i + 2) >= 0:
+			matcher, i = _parse_class(pattern, i + 1, "!", regex=False)
+			items.append(("char", matcher))
+		else:
+			items.append(("char", _literal(c)))
+			i += 1
+	return ("cat", items)
+
+
+def _parse_class(pattern: str, i: int, negation: str, regex: bool) -> tuple[Matcher, int]:
+	"""
+	Parse a character class, starting after its opening bracket.
+	:param pattern: the pattern
+	:param i: the index after the opening bracket
+	:param negation: the character negating the class when it comes first
+	:param regex: whether escapes are supported
+	:return: the matcher of the class, and the index after the closing bracket
+	"""
+	negated = i < len(pattern) and pattern[i] == negation
+	if negated:
+		i += 1
+	ranges, predicates = [], []
+	first = True
+	while True:
+		if i >= len(pattern):
+			raise ValueError(f"Unterminated character class in pattern {pattern!r}")
+		c = pattern[i]
+		if c == "]" and not first:
+			i += 1
+			break
+		first = False
+		if regex and c == "\\":
+			if i + 1 >= len(pattern):
+				raise ValueError(f"Pattern {pattern!r} ends with a backslash")
+			escape = pattern[i + 1]
+			i += 2
+			if escape.lower() in _CLASS_ESCAPES:
+				predicates.append(_escape_matcher(escape))
+				continue
+			c = _LITERAL_ESCAPES.get(escape, escape)
+		else:
+			i += 1
+		low = ord(c)
+		if i + 1 < len(pattern) and pattern[i] == "-" and pattern[i + 1] != "]":  # a range
+			high_char = pattern[i + 1]
+			i += 2
+			if regex and high_char == "\\" and i < len(pattern):
+				high_char = _LITERAL_ESCAPES.get(pattern[i], pattern[i])
+				i += 1
+			if ord(high_char) < low:
+				raise ValueError(f"Bad character range {c}-{high_char} in pattern {pattern!r}")
+			ranges.append((low, ord(high_char)))
+		else:
+			ranges.append((low, low))
+
+	def matcher(c: int) -> bool:
+		found = any(low <= c <= high for low, high in ranges) or any(predicate(c) for predicate in predicates)
+		return found != negated
+
+	return matcher, i
+
+
+def _literal(c: str) -> Matcher:
+	"""
+	Get the matcher of a single character.
+	:param c: the character
+	:return: the matcher
+	"""
+	code = ord(c)
+	return lambda d: d == code
+
+
+def _escape_matcher(escape: str) -> Matcher:
+	"""
+	Get the matcher of a class escape such as \\d or \\W.
+	:param escape: the letter of the escape
+	:return: the matcher
+	"""
+	predicate = _CLASS_ESCAPES[escape.lower()]
+	if escape.isupper():
+		return lambda c: not predicate(c)
+	return predicate
+
+
+class _RegexParser:
+	"""
+	A recursive descent parser of regular expressions into syntax trees.
+	The trees are tuples: ("char", matcher), ("cat", items), ("alt", options) and ("repeat", item, min, max),
+	with None as the max of an unbounded repetition.
+
+	Attributes:
+		pattern: the regular expression
+		i: the index of the next character to parse
+	"""
+
+	def __init__(self, pattern: str):
+		self.pattern = pattern
+		self.i = 0
+
+	def parse(self) -> tuple:
+		pattern = self.pattern
+		if pattern.startswith("^"):
+			self.i = 1
+		if pattern.endswith("$") and not pattern.endswith("\\$"):
+			self.pattern = pattern = pattern[:-1]
+		tree = self._alternation()
+		if self.i < len(pattern):
+			raise ValueError(f"Unbalanced parenthesis at position {self.i} in pattern {pattern!r}")
+		return tree
+
+	def _peek(self) -> Optional[str]:
+		return self.pattern[self.i] if self.i < len(self.pattern) else None
+
+	def _alternation(self) -> tuple:
+		options = [self._sequence()]
+		while self._peek() == "|":
+			self.i += 1
+			options.append(self._sequence())
+		return options[0] if len(options) == 1 else ("alt", options)
+
+	def _sequence(self) -> tuple:
+		items = []
+		while self._peek() not in (None, "|", ")"):
+			items.append(self._repeat())
+		return ("cat", items)
+
+	def _repeat(self) -> tuple:
+		item = self._atom()
+		while (c := self._peek()) is not None and c in _REPEAT_CHARS:
+			if c == "{":
+				bounds = self._bounds()
+				if bounds is None:  # a literal brace
+					break
+				low, high = bounds
+			else:
+				self.i += 1
+				low, high = {"*": (0, None), "+": (1, None), "?": (0, 1)}[c]
+			if self._peek() == "?":  # lazy quantifiers match the same keys
+				self.i += 1
+			item = ("repeat", item, low, high)
+		return item
+
+	def _bounds(self) -> Optional[tuple[int, Optional[int]]]:
+		end = self.pattern.find("}", self.i)
+		if end < 0:
+			return None
+		low, comma, high = self.pattern[self.i + 1: end].partition(",")
+		if not (low.isdigit() or (comma and not low)) or (high and not high.isdigit()):
+			return None
+		low = int(low) if low else 0
+		high = (int(high) if high else None) if comma else low
+		if high is not None and high < low:
+			raise ValueError(f"Bad repetition bounds in pattern {self.pattern!r}")
+		self.i = end + 1
+		return low, high
+
+	def _atom(self) -> tuple:
+		pattern = self.pattern
+		c = pattern[self.i]
+		self.i += 1
+		if c == "(":
+			if pattern.startswith("?:", self.i):
+				self.i += 2
+			tree = self._alternation()
+			if self._peek() != ")":
+				raise ValueError(f"Missing closing parenthesis in pattern {pattern!r}")
+			self.i += 1
+			return tree
+		if c == ".":
+			return ("char", _ANY_BUT_NEWLINE)
+		if c == "[":
+			matcher, self.i = _parse_class(pattern, self.i, "^", regex=True)
+			return ("char", matcher)
+		if c == "\\":
+			if self.i >= len(pattern):
+				raise ValueError(f"Pattern {pattern!r} ends with a backslash")
+			escape = pattern[self.i]
+			self.i += 1
+			if escape.lower() in _CLASS_ESCAPES:
+				return ("char", _escape_matcher(escape))
+			return ("char", _literal(_LITERAL_ESCAPES.get(escape, escape)))
+		if c in _REPEAT_CHARS and c != "{":
+			raise ValueError(f"Nothing to repeat at position {self.i - 1} in pattern {pattern!r}")
+		return ("char", _literal(c))
+
+
+class _NfaBuilder:
+	"""
+	Builds the states of a nondeterministic automaton from a syntax tree, with Thompson's construction.
+
+	Attributes:
+		matchers: the characters read by the transition out of every state, None for no transition
+		targets: the target of the transition out of every state
+		epsilons: the targets of the empty transitions out of every state
+	"""
+
+	def __init__(self):
+		self.matchers: list[Optional[Matcher]] = []
+		self.targets: list[int] = []
+		self.epsilons: list[list[int]] = []
+
+	def new_state(self) -> int:
+		self.matchers.append(None)
+		self.targets.append(-1)
+		self.epsilons.append([])
+		return len(self.matchers) - 1
+
+	def build(self, tree: tuple, start: int) -> int:
+		"""
+		Add the states of a syntax tree.
+		:param tree: the syntax tree
+		:param start: the state the tree starts from
+		:return: the state the tree ends in
+		"""
+		kind = tree[0]
+		if kind == "char":
+			end = self.new_state()
+			self.matchers[start], self.targets[start] = tree[1], end
+			return end
+		if kind == "cat":
+			for item in tree[1]:
+				start = self._build_separate(item, start)
+			return start
+		if kind == "alt":
+			end = self.new_state()
+			for option in tree[1]:
+				option_start = self.new_state()
+				self.epsilons[start].append(option_start)
+				self.epsilons[self.build(option, option_start)].append(end)
+			return end
+		_, item, low, high = tree
+		for _ in range(low):
+			start = self._build_separate(item, start)
+		if high is None:  # a loop back to the start of the item
+			loop_start = self.new_state()
+			self.epsilons[start].append(loop_start)
+			loop_end = self.build(item, loop_start)
+			self.epsilons[loop_end].append(loop_start)
+			end = self.new_state()
+			self.epsilons[start].append(end)
+			self.epsilons[loop_end].append(end)
+			return end
+		end = self.new_state()
+		for _ in range(high - low):  # every optional copy can skip to the end
+			self.epsilons[start].append(end)
+			start = self._build_separate(item, start)
+		self.epsilons[start].append(end)
+		return end
+
+	def _build_separate(self, tree: tuple, start: int) -> int:
+		"""
+		Add the states of a syntax tree starting from a fresh state, so the transition out of start stays free.
+		:param tree: the syntax tree
+		:param start: the state the tree starts from
+		:return: the state the tree ends in
+		"""
+		if self.matchers[start] is None and tree[0] == "char":
+			return self.build(tree, start)
+		item_start = self.new_state()
+		self.epsilons[start].append(item_start)
+		return self.build(tree, item_start)
@@ -1,8 +1,12 @@
-from typing import Optional, Self
+from typing import Any, Iterator, Optional, Self, Union
 
-import numpy as np
 from graphviz import Digraph
 
+from .base import Trie
+from .children import ChildMap, SortedChildMap
+from .keys import BYTE_LABELS, Key, decode_key, encode_key, format_label
+from .walk import NO_WEIGHT
+
 
 class PrefixTrieNode:
 	"""
@@ -10,170 +14,278 @@ class PrefixTrieNode:
 
 	Attributes:
 		parent: the parent node
-		children: array of children, indexed by ASCII values
-		num_children: number of non-None children
+		children: map of children, keyed by byte values
+		terminal: whether a key ends at this node
+		value: the value stored with the key ending at this node
+		count: the number of keys in the subtree of this node
 	"""
+	__slots__ = ("parent", "children", "terminal", "value", "count")
 
-	def __init__(self, parent: Optional[Self] = None):
+	def __init__(self, parent: Optional[Self] = None, child_map: type[ChildMap] = SortedChildMap):
 		"""
 		Initializes a prefix trie node.
 		:param parent: the parent node
+		:param child_map: the child map representation
 		"""
 		self.parent = parent
-		self.children = np.full(256, None, dtype=object)
-		self.num_children = 0
+		self.children = child_map()
+		self.terminal = False
+		self.value = None
+		self.count = 0
+
+	@property
+	def num_children(self) -> int:
+		"""
+		Number of children of the node.
+		"""
+		return len(self.children)
 
 	def is_leaf(self) -> bool:
 		"""
 		Check if the node is a leaf.
 		:return: True if the node is a leaf, False otherwise
 		"""
-		return self.num_children == 0
+		return len(self.children) == 0
 
-	def transition(self, c: chr) -> Optional[Self]:
+	def transition(self, b: int) -> Optional[Self]:
 		"""
-		Transition to the child node corresponding to the character c.
-		:param c: character to transition to
-		:return: the child node corresponding to the character c if it exists, None otherwise
+		Transition to the child node corresponding to the byte b.
+		:param b: byte to transition to
+		:return: the child node corresponding to the byte b if it exists, None otherwise
 		"""
-		return self.children[ord(c)]
+		return self.children.get(b)
 
-	def insert(self, c: chr) -> Self:
+	def insert(self, b: int) -> Self:
 		"""
 		Insert a node into the prefix trie.
-		:param c: character for the transition
+		:param b: byte for the transition
 		:return: the inserted node
 		"""
-		child_node = self.transition(c)
+		child_node = self.children.get(b)
 		if child_node is None:
-			child_node = PrefixTrieNode(self)
-			self.children[ord(c)] = child_node
-			self.num_children += 1
+			child_node = type(self)(self, type(self.children))
+			self.children.set(b, child_node)
 		return child_node
 
-	def remove(self, c: chr) -> bool:
+	def remove(self, b: int) -> bool:
 		"""
 		Remove a node from the prefix trie.
-		:param c: character for the transition
+		:param b: byte for the transition
 		:return: True if the node was removed, False otherwise
 		"""
-		child_node = self.transition(c)
+		child_node = self.children.pop(b)
 		if child_node is not None:
 			child_node.parent = None
-			self.children[ord(c)] = None
-			self.num_children -= 1
 			return True
 		return False
 
 
-class PrefixTrie:
+class WeightedPrefixTrieNode(PrefixTrieNode):
+	"""
+	A node in a weighted prefix trie.
+
+	Attributes:
+		weight: the weight of the key ending at this node
+		max_weight: the maximum weight of the keys in the subtree of this node
+	"""
+	__slots__ = ("weight", "max_weight")
+
+	def __init__(self, parent: Optional[Self] = None, child_map: type[ChildMap] = SortedChildMap):
+		"""
+		Initializes a weighted prefix trie node.
+		:param parent: the parent node
+		:param child_map: the child map representation
+		"""
+		super().__init__(parent, child_map)
+		self.weight = None
+		self.max_weight = NO_WEIGHT
+
+
+class PrefixTrie(Trie):
 	"""
 	A prefix trie.
+	Keys are str (stored as UTF-8) or bytes, with one byte per transition.
+	It is a mutable mapping, with the value of every key stored on its terminal node.
 
 	Attributes:
 		root: the root node
+		child_map: the child map representation used by the nodes
+		key_type: the type of the keys returned by queries (str or bytes)
+		weighted: whether keys carry weights and nodes cache the maximum weight of their subtree
 	"""
 
-	def __init__(self):
+	def __init__(self, child_map: Union[str, type[ChildMap]] = "sorted", key_type: type = str, weighted: bool = False):
 		"""
 		Initializes a prefix trie.
+		:param child_map: the child map representation, either a name ("array", "dict", "sorted", "adaptive")
+			or a ChildMap subclass
+		:param key_type: the type of the keys returned by queries, str or bytes; both are accepted as input
+		:param weighted: whether keys carry weights, which enables top_k queries
 		"""
-		self.root = PrefixTrieNode(None)
+		super().__init__(child_map, key_type, weighted)
+
+	def _new_root(self) -> PrefixTrieNode:
+		node_class = WeightedPrefixTrieNode if self.weighted else PrefixTrieNode
+		return node_class(None, self.child_map)
+
+	def _edge_label(self, b: int, node: PrefixTrieNode) -> bytes:
+		return BYTE_LABELS[b]
 
-	def _search(self, prefix: str) -> Optional[PrefixTrieNode]:
+	def _label_length(self, node: PrefixTrieNode) -> int:
+		return 0 if node.parent is None else 1
+
+	def _search(self, prefix: bytes) -> Optional[PrefixTrieNode]:
 		"""
 		Search for a prefix in the prefix trie.
-		:param prefix: prefix to search for
+		:param prefix: encoded prefix to search for
 		:return: the final node of the prefix if it exists, None otherwise
 		"""
-		if self.root is None:
-			return None
-		current_node = self.root
-		for c in prefix:
-			current_node = current_node.transition(c)
+		current_node, visited = self.root, 1
+		for b in prefix:
+			current_node = current_node.children.get(b)
 			if current_node is None:
-				return None
+				break
+			visited += 1
+		if self.metrics is not None:
+			self.metrics.visited += visited
 		return current_node
 
-	def search(self, q: str) -> Optional[PrefixTrieNode]:
+	def _range_search(self, q: bytes) -> set[Key]:
 		"""
-		Search for a string in the prefix trie.
-		:param q: string to search for
-		:return: the final node of the string if it exists, None otherwise
-		"""
-		return self._search(q + chr(0))
-
-	def range_search(self, q: str) -> set[str]:
-		"""
-		Search for all strings with a given prefix in the prefix trie.
-		:param q: prefix to search for
-		:return: list of strings with the given prefix
+		Search for all strings with a given encoded prefix in the prefix trie.
+		:param q: encoded prefix to search for
+		:return: set of strings with the given prefix
 		"""
 		current_node = self._search(q)
 		if current_node is None:
 			return set()
 		words = set()
+		visited = 0
 		stack = [(q, current_node)]
 		while stack:
 			current_prefix, current_node = stack.pop()
-			for j, child_node in enumerate(current_node.children):
-				if child_node is not None:
-					if chr(j) == chr(0):
-						words.add(current_prefix)
-					else:
-						stack.append((current_prefix + chr(j), child_node))
+			if current_node.terminal:
+				words.add(decode_key(current_prefix, self.key_type))
+			visited += len(current_node.children)
+			for j, child_node in current_node.children.items():
+				stack.append((current_prefix + BYTE_LABELS[j], child_node))
+		if self.metrics is not None:
+			self.metrics.visited += visited
 		return words
 
-	def insert(self, s: str):
+	def insert(self, s: Key, value: Any = None, weight: Optional[float] = None):
 		"""
-		Insert a string into the prefix trie.
+		Insert a string into the prefix trie, or replace the value of an existing one.
 		:param s: string to insert
+		:param value: value stored with the string
+		:param weight: weight of the string in a weighted trie; None keeps the current weight (0 for a new string)
 		"""
+		self._check_weight(weight)
+		s = encode_key(s)
 		current_node = self.root
-		for c in s + chr(0):
-			current_node = current_node.insert(c)
+		for b in s:
+			current_node = current_node.insert(b)
+		if self.metrics is not None:
+			self.metrics.visited += len(s) + 1
+		is_new = not current_node.terminal
+		if is_new:
+			if self.cache is not None:  # a new key changes the results of its prefixes
+				self.cache.invalidate(s)
+			current_node.terminal = True
+			self._size += 1
+			self._update_counts(current_node, 1)
+		current_node.value = value
+		if self.weighted:
+			self._set_weight(current_node, weight, is_new)
+			self._update_max_weights(current_node)
+
+	def _load_sorted(self, records: Iterator[tuple[bytes, Any, Optional[float], int]]):
+		"""
+		Fill an empty prefix trie from sorted records.
+		The nodes on the path of the previous key are kept on a stack indexed by depth, so every key only
+		creates the nodes below its common prefix with the previous key.
+		:param records: (encoded key, value, weight, length of the common prefix with the previous key) tuples
+		"""
+		weighted = self.weighted
+		node_class, child_map = type(self.root), self.child_map
+		stack = [self.root]  # stack[d] is the node at depth d on the path of the previous key
+		for s, value, weight, h in records:
+			while len(stack) > h + 1:  # close the nodes below the common prefix
+				closed_node = stack.pop()
+				if weighted:
+					self._compute_max_weight(closed_node)
+			current_node = stack[-1]
+			for i in range(h, len(s)):
+				child_node = node_class(current_node, child_map)
+				current_node.children.set(s[i], child_node)
+				current_node = child_node
+				stack.append(child_node)
+			is_new = not current_node.terminal
+			if is_new:
+				current_node.terminal = True
+				self._size += 1
+				for node in stack:
+					node.count += 1
+			current_node.value = value
+			if weighted:
+				self._set_weight(current_node, weight, is_new)
+		if weighted:
+			while stack:
+				self._compute_max_weight(stack.pop())
 
-	def remove(self, s: str) -> bool:
+	def remove(self, s: Key) -> bool:
 		"""
 		Remove a string from the prefix trie.
 		:param s: string to remove
 		:return: True if the string was removed, False otherwise
 		"""
+		s = encode_key(s)
 		# Firstly, find the end node of the string
-		end_node = self.search(s)
-		if end_node is None:
+		end_node = self._search(s)
+		if end_node is None or not end_node.terminal:
 			return False
-		# Then, remove the nodes one by one in reverse order
+		if self.cache is not None:
+			self.cache.invalidate(s)
+		end_node.terminal = False
+		end_node.value = None
+		self._size -= 1
+		self._update_counts(end_node, -1)
+		# Then, remove the nodes one by one in reverse order, as long as they lead to no other key
 		current_node = end_node
-		for c in reversed(s + chr(0)):
-			if not current_node.is_leaf():
+		for b in reversed(s):
+			if not current_node.is_leaf() or current_node.terminal:
 				break
 			current_node = current_node.parent
-			current_node.remove(c)
+			current_node.remove(b)
+		if self.weighted:
+			end_node.weight = None
+			self._update_max_weights(current_node)
+		return True
 
 	def visualize(self, file_name: str = "prefix_trie", directory_name: str = "graphviz", view: bool = False):
 		"""
 		Visualize the prefix trie using graphviz.
+		Nodes where a key ends are drawn with a double border.
 		"""
 
-		def add_nodes(graph: Digraph, node: PrefixTrieNode, parent_id: str, char: chr):
+		def add_nodes(graph: Digraph, node: PrefixTrieNode, parent_id: str, b: int):
 			current_id = str(id(node))
-			label = '¤' if char == chr(0) else char
-			graph.node(current_id, label)
+			graph.node(current_id, format_label(bytes((b,))), peripheries="2" if node.terminal else "1")
 			if parent_id is not None:
 				graph.edge(parent_id, current_id)
 
-			for j, child_node in enumerate(node.children):
-				if child_node is not None:
-					assert isinstance(child_node, PrefixTrieNode)
-					add_nodes(graph, child_node, current_id, chr(j))
+			for j, child_node in node.children.items():
+				assert isinstance(child_node, PrefixTrieNode)
+				add_nodes(graph, child_node, current_id, j)
 
 		dot = Digraph(format="png", comment="Prefix Trie")
 		dot.attr(dpi="300")
-		dot.node(str(id(self.root)), "", shape="diamond", style="filled", fillcolor="black", width="0.2", height="0.2")
-		for i, child in enumerate(self.root.children):
-			if child is not None:
-				assert isinstance(child, PrefixTrieNode)
-				add_nodes(dot, child, str(id(self.root)), chr(i))
+		dot.node(
+			str(id(self.root)), "", shape="diamond", style="filled", fillcolor="black", width="0.2", height="0.2",
+			peripheries="2" if self.root.terminal else "1"
+		)
+		for i, child in self.root.children.items():
+			assert isinstance(child, PrefixTrieNode)
+			add_nodes(dot, child, str(id(self.root)), i)
 
 		dot.render(filename=file_name, directory=directory_name, view=view)
@@ -0,0 +1,139 @@
+import ipaddress
+from collections.abc import MutableMapping
+from typing import Any, Iterator, Optional, Union
+
+from .children import ChildMap
+from .patricia import PatriciaTrie
+
+Network = Union[str, ipaddress.IPv4Network, ipaddress.IPv6Network]
+Address = Union[str, int, ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+_FAMILIES = {4: b"4", 6: b"6"}
+_NETWORK_CLASSES = {ord("4"): (ipaddress.IPv4Network, 32), ord("6"): (ipaddress.IPv6Network, 128)}
+
+
+def network_key(network: Network) -> bytes:
+	"""
+	Encode an IP network as a binary trie key: a byte for the address family followed by one byte ("0" or "1")
+	per bit of the network prefix, so that the prefixes of the key are exactly the supernets of the network.
+	:param network: the network, such as "10.0.0.0/8" or "2001:db8::/32"
+	:return: the encoded key
+	"""
+	if not isinstance(network, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+		network = ipaddress.ip_network(network)
+	bits = format(int(network.network_address), f"0{network.max_prefixlen}b")[:network.prefixlen]
+	return _FAMILIES[network.version] + bits.encode("ascii")
+
+
+def address_key(address: Address) -> bytes:
+	"""
+	Encode an IP address as a binary trie key with all of its bits, like a network with the longest prefix.
+	:param address: the address, such as "10.1.2.3"
+	:return: the encoded key
+	"""
+	if not isinstance(address, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+		address = ipaddress.ip_address(address)
+	return _FAMILIES[address.version] + format(int(address), f"0{address.max_prefixlen}b").encode("ascii")
+
+
+def decode_network(key: bytes) -> Union[ipaddress.IPv4Network, ipaddress.IPv6Network]:
+	"""
+	Decode a binary trie key back into an IP network.
+	:param key: the encoded key
+	:return: the network
+	"""
+	(network_class, max_prefixlen), bits = _NETWORK_CLASSES[key[0]], key[1:]
+	address = int(bits, 2) << (max_prefixlen - len(bits)) if bits else 0
+	return network_class((address, len(bits)))
+
+
+class RoutingTable(MutableMapping):
+	"""
+	A routing table mapping IPv4 and IPv6 networks to values, with longest-prefix match lookups.
+
+	The networks are stored in a Patricia trie in binary key mode, with one edge byte per bit of the prefix
+	(see network_key), so that an address is routed by a single walk down the bits of the address,
+	and runs of bits shared by all routes below a node are compared as a single edge label.
+
+	Attributes:
+		trie: the Patricia trie of the encoded networks
+	"""
+
+	def __init__(self, routes=(), child_map: Union[str, type[ChildMap]] = "sorted"):
+		"""
+		Initializes a routing table.
+		:param routes: (network, value) pairs or a mapping of networks to values
+		:param child_map: the child map representation of the trie
+		"""
+		self.trie = PatriciaTrie(child_map=child_map, key_type=bytes)
+		self.update(routes)
+
+	def insert(self, network: Network, value: Any = None):
+		"""
+		Add a route, or replace the value of an existing one.
+		:param network: the network, whose host bits must be zero
+		:param value: the value of the route, such as the next hop
+		"""
+		self.trie.insert(network_key(network), value)
+
+	def remove(self, network: Network) -> bool:
+		"""
+		Remove a route.
+		:param network: the network
+		:return: True if the route was removed, False if it did not exist
+		"""
+		return self.trie.remove(network_key(network))
+
+	def lookup(self, address: Address, default: Any = None) -> Any:
+		"""
+		Route an address by longest-prefix match.
+		:param address: the address
+		:param default: value returned if no route matches
+		:return: the value of the most specific route containing the address
+		"""
+		item = self.trie.longest_prefix_item(address_key(address))
+		return item[1] if item is not None else default
+
+	def route(self, address: Address) -> Optional[tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], Any]]:
+		"""
+		Find the most specific route containing an address.
+		:param address: the address
+		:return: (network, value) pair, None if no route matches
+		"""
+		item = self.trie.longest_prefix_item(address_key(address))
+		return (decode_network(item[0]), item[1]) if item is not None else None
+
+	def routes(self, address: Address) -> list[tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], Any]]:
+		"""
+		Find all routes containing an address.
+		:param address: the address
+		:return: list of (network, value) pairs, from the least to the most specific
+		"""
+		encoded = address_key(address)
+		return [
+			(decode_network(encoded[:length]), node.value) for length, node in self.trie._prefix_nodes(encoded)
+		]
+
+	def __getitem__(self, network: Network) -> Any:
+		return self.trie[network_key(network)]
+
+	def __setitem__(self, network: Network, value: Any):
+		self.insert(network, value)
+
+	def __delitem__(self, network: Network):
+		del self.trie[network_key(network)]
+
+	def __contains__(self, network: object) -> bool:
+		try:
+			return network_key(network) in self.trie
+		except (TypeError, ValueError):
+			return False
+
+	def __len__(self) -> int:
+		return len(self.trie)
+
+	def __iter__(self) -> Iterator[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+		return (decode_network(key) for key in self.trie)
+
+	def __repr__(self) -> str:
+		return f"{type(self).__name__}({len(self)} routes)"
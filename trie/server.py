@@ -0,0 +1,405 @@
+import asyncio
+import itertools
+import json
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Optional
+
+from .base import Trie
+from .keys import Key, decode_key, encode_key
+
+OPERATIONS = ("search", "range_search", "insert", "remove")
+"""Operations exposed by the server."""
+
+
+class TrieServerError(RuntimeError):
+	"""
+	Error returned by the server for a request, raised by the client.
+	"""
+
+
+class TrieServer:
+	"""
+	An asyncio server exposing a trie over TCP or a Unix socket.
+
+	The protocol is line-based: every request is a JSON object on its own line (ASCII, with escapes), such as
+	{"id": 1, "op": "search", "key": "hello"}, and the server answers with {"id": 1, "result": ...}
+	or {"id": 1, "error": "..."}. Requests can be pipelined; the responses carry the id of their request
+	and may come back in any order across connections, but in order within a batch.
+
+	Requests from all connections are coalesced into micro-batches of up to max_batch requests, and every batch
+	runs in the executor, so the event loop keeps accepting and parsing requests while the trie is busy.
+	A batch takes the requests that queued up while the previous one ran; with a batch_delay, the first request
+	of a batch also waits that long for others, which trades latency under light load for larger batches.
+	The default executor has a single thread, so the trie only ever sees one batch at a time
+	and does not have to be thread-safe.
+	A request line longer than max_line_length is answered with an error whose id is null,
+	after the pending requests of the connection, and the connection is closed.
+
+	Operations:
+		search: {"key"} -> {"found": bool, "value": value}
+		range_search: {"prefix", "limit" (optional)} -> sorted list of keys
+		insert: {"key", "value" (optional)} -> null
+		remove: {"key"} -> whether the key was removed
+
+	Attributes:
+		trie: the trie
+		max_batch: the maximum number of requests executed together
+		batch_delay: how long the first request of a batch waits for others, in seconds
+		max_line_length: the maximum length of a request line, in bytes
+	"""
+
+	def __init__(
+			self, trie: Trie, max_batch: int = 256, batch_delay: float = 0.0, executor: Optional[Executor] = None,
+			max_line_length: int = 1 << 16
+	):
+		"""
+		Initializes a trie server.
+		:param trie: the trie to serve; its values must be serializable as JSON
+		:param max_batch: the maximum number of requests executed together, 1 to disable batching
+		:param batch_delay: how long the first request of a batch waits for others, in seconds
+		:param executor: the executor running the batches, None for a single thread
+		:param max_line_length: the maximum length of a request line, in bytes
+		"""
+		if max_batch < 1:
+			raise ValueError(f"max_batch must be positive, got {max_batch}")
+		self.trie = trie
+		self.max_batch = max_batch
+		self.batch_delay = batch_delay
+		self.max_line_length = max_line_length
+		self._executor = executor
+		self._own_executor = executor is None
+		self._queue: Optional[asyncio.Queue] = None
+		self._batcher: Optional[asyncio.Task] = None
+		self._servers: list[asyncio.AbstractServer] = []
+
+	async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> tuple[str, int]:
+		"""
+		Start listening on a TCP socket.
+		:param host: the host to bind to
+		:param port: the port to bind to, 0 for any free port
+		:return: the bound address
+		"""
+		self._start_batcher()
+		server = await asyncio.start_server(self._handle_connection, host, port, limit=self.max_line_length)
+		self._servers.append(server)
+		return server.sockets[0].getsockname()[:2]
+
+	async def start_unix(self, path: str):
+		"""
+		Start listening on a Unix socket.
+		:param path: the path of the socket
+		"""
+		self._start_batcher()
+		self._servers.append(await asyncio.start_unix_server(
+			self._handle_connection, path, limit=self.max_line_length
+		))
+
+	async def serve_forever(self):
+		"""
+		Serve until cancelled.
+		"""
+		await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+	async def close(self):
+		"""
+		Stop listening, fail the requests that have not run yet and release the executor.
+		"""
+		for server in self._servers:
+			server.close()
+			await server.wait_closed()
+		self._servers = []
+		if self._batcher is not None:
+			self._batcher.cancel()
+			try:
+				await self._batcher
+			except asyncio.CancelledError:
+				pass
+			self._batcher = None
+			while not self._queue.empty():
+				_, future = self._queue.get_nowait()
+				if not future.done():
+					future.set_exception(ConnectionError("Server closed"))
+		if self._own_executor and self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.close()
+
+	def _start_batcher(self):
+		"""
+		Start the task that forms and runs the batches, once.
+		"""
+		if self._batcher is None:
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trie-server")
+			self._queue = asyncio.Queue()
+			self._batcher = asyncio.create_task(self._run_batches())
+
+	async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+		"""
+		Read the requests of a connection, line by line, and write every response as soon as it is ready.
+		:param reader: the stream reader of the connection
+		:param writer: the stream writer of the connection
+		"""
+		pending = set()
+		error = None
+		try:
+			try:
+				while line := await reader.readline():
+					task = asyncio.create_task(self._respond(line, writer))
+					pending.add(task)
+					task.add_done_callback(pending.discard)
+			except (ValueError, asyncio.LimitOverrunError):  # the line does not fit in the buffer of the reader
+				error = f"ValueError: request line longer than {self.max_line_length} bytes"
+			if pending:
+				await asyncio.gather(*pending)
+			if error is not None:
+				writer.write(json.dumps({"id": None, "error": error}).encode("utf-8") + b"\n")
+				await writer.drain()
+		except ConnectionError:
+			pass
+		finally:
+			writer.close()
+
+	async def _respond(self, line: bytes, writer: asyncio.StreamWriter):
+		"""
+		Answer a single request line.
+		:param line: the request
+		:param writer: the stream writer of the connection
+		"""
+		request_id = None
+		try:
+			request = json.loads(line)
+			request_id = request.get("id")
+			if request.get("op") not in OPERATIONS:
+				raise ValueError(f"Unknown operation {request.get('op')!r}")
+			future = asyncio.get_running_loop().create_future()
+			await self._queue.put((request, future))
+			response = {"id": request_id, "result": await future}
+		except Exception as error:
+			response = {"id": request_id, "error": f"{type(error).__name__}: {error}"}
+		try:
+			data = json.dumps(response)
+		except (TypeError, ValueError) as error:  # a value that is not serializable as JSON
+			data = json.dumps({"id": request_id, "error": f"{type(error).__name__}: {error}"})
+		writer.write(data.encode("utf-8") + b"\n")
+		await writer.drain()
+
+	async def _run_batches(self):
+		"""
+		Collect the queued requests into batches and run every batch in the executor.
+		"""
+		loop = asyncio.get_running_loop()
+		queue = self._queue
+		while True:
+			batch = [await queue.get()]
+			deadline = loop.time() + self.batch_delay
+			while len(batch) < self.max_batch:
+				if queue.empty():
+					timeout = deadline - loop.time()
+					if timeout <= 0:
+						break
+					try:
+						batch.append(await asyncio.wait_for(queue.get(), timeout))
+					except asyncio.TimeoutError:
+						break
+				else:
+					batch.append(queue.get_nowait())
+			outcomes = await loop.run_in_executor(self._executor, self._execute, [request for request, _ in batch])
+			for (_, future), (ok, result) in zip(batch, outcomes):
+				if future.done():  # the connection went away
+					continue
+				if ok:
+					future.set_result(result)
+				else:
+					future.set_exception(result)
+
+	def _execute(self, requests: list[dict]) -> list[tuple[bool, Any]]:
+		"""
+		Run a batch of requests against the trie, in order. Runs in the executor.
+		:param requests: the requests
+		:return: (True, result) or (False, exception) for every request
+		"""
+		outcomes = []
+		for request in requests:
+			try:
+				outcomes.append((True, self._dispatch(request)))
+			except Exception as error:
+				outcomes.append((False, error))
+		return outcomes
+
+	def _dispatch(self, request: dict) -> Any:
+		"""
+		Run a single request against the trie.
+		:param request: the request
+		:return: the result, serializable as JSON
+		"""
+		trie, operation = self.trie, request["op"]
+		if operation == "search":
+			node = trie.search(request["key"])
+			return {"found": node is not None, "value": node.value if node is not None else None}
+		if operation == "range_search":
+			keys = trie.iter_prefix(request.get("prefix", ""), request.get("limit"))
+			return [decode_key(encode_key(key), str) for key in keys]
+		if operation == "insert":
+			trie.insert(request["key"], request.get("value"))
+			return None
+		return trie.remove(request["key"])
+
+
+class TrieClient:
+	"""
+	An asyncio client of a TrieServer.
+	Requests are pipelined: any number of coroutines can send requests over the same connection concurrently,
+	and every response is matched to its request by id.
+
+	Attributes:
+		reader: the stream reader of the connection
+		writer: the stream writer of the connection
+	"""
+
+	def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+		"""
+		Initializes a client over an open connection; use connect or connect_unix instead.
+		:param reader: the stream reader of the connection
+		:param writer: the stream writer of the connection
+		"""
+		self.reader = reader
+		self.writer = writer
+		self._ids = itertools.count()
+		self._pending: dict[int, asyncio.Future] = {}
+		self._receiver = asyncio.create_task(self._receive())
+
+	@classmethod
+	async def connect(cls, host: str = "127.0.0.1", port: int = 0) -> "TrieClient":
+		"""
+		Connect to a server over TCP.
+		:param host: the host of the server
+		:param port: the port of the server
+		:return: the client
+		"""
+		return cls(*await asyncio.open_connection(host, port))
+
+	@classmethod
+	async def connect_unix(cls, path: str) -> "TrieClient":
+		"""
+		Connect to a server over a Unix socket.
+		:param path: the path of the socket
+		:return: the client
+		"""
+		return cls(*await asyncio.open_unix_connection(path))
+
+	async def _receive(self):
+		"""
+		Read the responses and resolve the futures of their requests.
+		"""
+		error = ConnectionError("Connection closed by the server")
+		try:
+			while line := await self.reader.readline():
+				response = json.loads(line)
+				if response["id"] is None and "error" in response:  # the server is closing the connection
+					error = TrieServerError(response["error"])
+					continue
+				future = self._pending.pop(response["id"], None)
+				if future is None or future.done():
+					continue
+				if "error" in response:
+					future.set_exception(TrieServerError(response["error"]))
+				else:
+					future.set_result(response["result"])
+		except Exception as exception:
+			error = exception
+		for future in self._pending.values():
+			if not future.done():
+				future.set_exception(error)
+		self._pending.clear()
+
+	async def _request(self, operation: str, **arguments) -> Any:
+		"""
+		Send a request and wait for its response.
+		:param operation: the operation
+		:param arguments: the arguments of the operation
+		:return: the result
+		"""
+		if self._receiver.done():
+			raise ConnectionError("Connection closed")
+		request_id = next(self._ids)
+		data = json.dumps({"id": request_id, "op": operation, **arguments}).encode("utf-8") + b"\n"
+		future = asyncio.get_running_loop().create_future()
+		self._pending[request_id] = future
+		self.writer.write(data)
+		await self.writer.drain()
+		return await future
+
+	async def search(self, key: Key) -> bool:
+		"""
+		Check whether a string is in the trie.
+		:param key: the string
+		:return: True if the string is in the trie, False otherwise
+		"""
+		return (await self._request("search", key=_text(key)))["found"]
+
+	async def get(self, key: Key, default: Any = None) -> Any:
+		"""
+		Get the value of a string.
+		:param key: the string
+		:param default: value returned if the string is not in the trie
+		:return: the value
+		"""
+		result = await self._request("search", key=_text(key))
+		return result["value"] if result["found"] else default
+
+	async def range_search(self, prefix: Key, limit: Optional[int] = None) -> list[str]:
+		"""
+		Search for the strings with a given prefix.
+		:param prefix: the prefix
+		:param limit: maximum number of strings to return, None for no limit
+		:return: list of strings, in lexicographic order
+		"""
+		return await self._request("range_search", prefix=_text(prefix), limit=limit)
+
+	async def insert(self, key: Key, value: Any = None):
+		"""
+		Insert a string, or replace the value of an existing one.
+		:param key: the string
+		:param value: the value, serializable as JSON
+		"""
+		await self._request("insert", key=_text(key), value=value)
+
+	async def remove(self, key: Key) -> bool:
+		"""
+		Remove a string.
+		:param key: the string
+		:return: True if the string was removed, False otherwise
+		"""
+		return await self._request("remove", key=_text(key))
+
+	async def close(self):
+		"""
+		Close the connection.
+		"""
+		self.writer.close()
+		try:
+			await self.writer.wait_closed()
+		except ConnectionError:
+			pass
+		await self._receiver
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.close()
+
+
+def _text(key: Key) -> str:
+	"""
+	Convert a key into the text sent over the protocol, keeping bytes that are not valid UTF-8 (surrogateescape).
+	:param key: the key
+	:return: the key as a string
+	"""
+	return decode_key(encode_key(key), str)
@@ -0,0 +1,407 @@
+import bisect
+import builtins
+import itertools
+import multiprocessing
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from .bulk import to_records
+from .children import ChildMap
+from .keys import Key, check_key_type, decode_key, encode_key
+from .patricia import PatriciaTrie
+
+_MISSING = object()
+
+
+def _serve(connection, child_map: Union[str, type[ChildMap]], weighted: bool):
+	"""
+	Worker process owning one shard: answer batched requests from the front-end until it sends None.
+	Keys cross the pipe encoded, so the shard trie always has bytes keys. An error is sent back as the name of its type
+	and its message, since the exception itself may not be picklable and failing to send it would kill the worker.
+	:param connection: the worker end of the pipe
+	:param child_map: the child map representation of the shard trie
+	:param weighted: whether the keys of the shard trie carry weights
+	"""
+	trie = PatriciaTrie(child_map=child_map, key_type=bytes, weighted=weighted)
+
+	def search_many(keys: list[bytes]) -> list[Optional[tuple[Any, Optional[float]]]]:
+		nodes = [trie.search(key) for key in keys]
+		return [(node.value, getattr(node, "weight", None)) if node is not None else None for node in nodes]
+
+	operations = {
+		"insert_many": trie.insert_many,
+		"search_many": search_many,
+		"contains_many": lambda keys: [key in trie for key in keys],
+		"remove_many": lambda keys: [trie.remove(key) for key in keys],
+		"iter_prefix": lambda q, limit: list(trie.iter_prefix(q, limit)),
+		"items": lambda: list(trie.items()),
+		"len": lambda: len(trie),
+		"clear": trie.clear,
+	}
+	while True:
+		request = connection.recv()
+		if request is None:
+			break
+		operation, args = request
+		try:
+			response = (True, operations[operation](*args))
+		except Exception as error:
+			response = (False, (type(error).__name__, str(error)))
+		connection.send(response)
+	connection.close()
+
+
+def _raise(name: str, message: str):
+	"""
+	Raise again an error of a worker process, from the name of its type and its message.
+	Built-in exceptions, such as the ValueError of a bad argument, keep their type; others become a RuntimeError.
+	:param name: the name of the type of the error
+	:param message: the message of the error
+	"""
+	error_type = getattr(builtins, name, None)
+	if isinstance(error_type, type) and issubclass(error_type, Exception):
+		raise error_type(message)
+	raise RuntimeError(f"{name}: {message}" if message else name)
+
+
+class ShardedTrie(MutableMapping):
+	"""
+	A trie partitioned across worker processes, to use more than one core despite the GIL.
+
+	The keys are partitioned into contiguous ranges by their leading bytes, one range per shard, and every shard is
+	a PatriciaTrie owned by its own worker process. Batched operations split their keys by shard, send every shard
+	its part over a pipe, and only then wait for the answers, so the shards work in parallel while the front-end
+	puts the results back together. Ranges rather than a hash keep the keys of a prefix together: a prefix query
+	reaches only the shards whose ranges it overlaps, usually one, and their sorted answers are concatenated in
+	shard order instead of merged. The price is balance, which depends on the boundaries: the default splits
+	the values of the first byte evenly, which suits random bytes but not text, so boundaries should be chosen
+	from a sample of the keys with split_points.
+
+	Single-key operations are round trips to one worker, so the batched ones (insert_many, search_many, get_many,
+	contains_many, remove_many) should be preferred.
+
+	Attributes:
+		key_type: the type of the keys returned by queries (str or bytes)
+		num_shards: the number of shards and worker processes
+		boundaries: the smallest key of the range of every shard but the first, as sorted encoded keys
+		weighted: whether keys carry weights
+	"""
+
+	def __init__(
+			self, num_shards: Optional[int] = None, boundaries: Optional[Iterable[Key]] = None, key_type: type = str,
+			child_map: Union[str, type[ChildMap]] = "sorted", weighted: bool = False
+	):
+		"""
+		Initializes a sharded trie and starts its worker processes.
+		:param num_shards: the number of shards, None for the number of CPUs, or for one more than the boundaries
+		:param boundaries: the smallest key of the range of every shard but the first, in increasing order,
+			such as the split_points of a sample of the keys; None to split the values of the first byte evenly
+		:param key_type: the type of the keys returned by queries, str or bytes; both are accepted as input
+		:param child_map: the child map representation of the shard tries
+		:param weighted: whether keys carry weights
+		"""
+		self.key_type = check_key_type(key_type)
+		if boundaries is None:
+			num_shards = num_shards or multiprocessing.cpu_count()
+			if num_shards > 256:
+				raise ValueError(f"num_shards must be at most 256 without boundaries, got {num_shards}")
+			self.boundaries = [bytes([256 * shard // num_shards]) for shard in range(1, num_shards)]
+		else:
+			self.boundaries = [encode_key(boundary) for boundary in boundaries]
+			if not all(a < b for a, b in zip([b""] + self.boundaries, self.boundaries)):
+				raise ValueError("boundaries must be non-empty and strictly increasing")
+			if num_shards is not None and num_shards != len(self.boundaries) + 1:
+				raise ValueError(f"{len(self.boundaries)} boundaries make {len(self.boundaries) + 1} shards, not {num_shards}")
+		self.num_shards = len(self.boundaries) + 1
+		self.weighted = weighted
+		self._connections = []
+		self._processes = []
+		for _ in range(self.num_shards):
+			connection, worker_connection = multiprocessing.Pipe()
+			process = multiprocessing.Process(target=_serve, args=(worker_connection, child_map, weighted), daemon=True)
+			process.start()
+			worker_connection.close()
+			self._connections.append(connection)
+			self._processes.append(process)
+
+	def _shard(self, s: bytes) -> int:
+		"""
+		Get the shard of an encoded key.
+		:param s: the encoded key
+		:return: the index of the shard
+		"""
+		return bisect.bisect_right(self.boundaries, s)
+
+	def _prefix_shards(self, q: bytes) -> range:
+		"""
+		Get the shards whose ranges hold the keys with a given prefix.
+		:param q: the encoded prefix
+		:return: the range of the indices of the shards
+		"""
+		end = q.rstrip(b"\xff")  # the keys with prefix q are below end once its last byte is incremented
+		if not end:
+			return range(self._shard(q), self.num_shards)
+		end = end[:-1] + bytes([end[-1] + 1])
+		return range(self._shard(q), bisect.bisect_left(self.boundaries, end) + 1)
+
+	@staticmethod
+	def split_points(sample: Iterable[Key], num_shards: int, prefix_length: int = 1) -> list[bytes]:
+		"""
+		Choose boundaries that balance the shards for keys like a sample, at quantiles of their leading bytes,
+		so that the keys sharing their first prefix_length bytes stay in one shard.
+		:param sample: a sample of the keys
+		:param num_shards: the number of shards wanted
+		:param prefix_length: the number of leading bytes the boundaries are made of
+		:return: the boundaries, fewer than num_shards - 1 if the sample has too few distinct leading bytes
+		"""
+		if num_shards < 1 or prefix_length < 1:
+			raise ValueError(f"num_shards and prefix_length must be positive, got {num_shards} and {prefix_length}")
+		prefixes = sorted(encode_key(key)[:prefix_length] for key in sample)
+		boundaries = []
+		for shard in range(1, num_shards):
+			boundary = prefixes[len(prefixes) * shard // num_shards] if prefixes else b""
+			if boundary and (not boundaries or boundary > boundaries[-1]):
+				boundaries.append(boundary)
+		return boundaries
+
+	def _call(self, requests: dict[int, tuple]) -> dict[int, Any]:
+		"""
+		Send requests to some shards, then wait for all of them, so that the shards work in parallel.
+		:param requests: (operation, arguments) pairs by shard
+		:return: the results by shard
+		"""
+		if self._connections is None:
+			raise ValueError(f"{type(self).__name__} is closed")
+		for shard, request in requests.items():
+			self._connections[shard].send(request)
+		results, error = {}, None
+		for shard in requests:
+			ok, result = self._connections[shard].recv()  # receive every answer, even after an error
+			if ok:
+				results[shard] = result
+			elif error is None:
+				error = result
+		if error is not None:
+			_raise(*error)
+		return results
+
+	def _broadcast(self, operation: str, *args) -> list[Any]:
+		"""
+		Send the same request to every shard.
+		:param operation: the operation
+		:param args: the arguments
+		:return: the results, in shard order
+		"""
+		results = self._call({shard: (operation, args) for shard in range(self.num_shards)})
+		return [results[shard] for shard in range(self.num_shards)]
+
+	def _split(self, keys: Iterable[Key]) -> tuple[dict[int, list[bytes]], list[tuple[int, int]]]:
+		"""
+		Split encoded keys by shard, remembering where every key went.
+		:param keys: the keys
+		:return: the keys of every shard, and the (shard, index in the shard) pair of every key
+		"""
+		parts, positions = {}, []
+		for key in keys:
+			s = encode_key(key)
+			shard = self._shard(s)
+			part = parts.setdefault(shard, [])
+			positions.append((shard, len(part)))
+			part.append(s)
+		return parts, positions
+
+	def _gather(self, operation: str, keys: Iterable[Key]) -> list[Any]:
+		"""
+		Run a per-key operation on a batch of keys and put the results back in the order of the keys.
+		:param operation: the operation
+		:param keys: the keys
+		:return: the results
+		"""
+		parts, positions = self._split(keys)
+		results = self._call({shard: (operation, (part,)) for shard, part in parts.items()})
+		return [results[shard][i] for shard, i in positions]
+
+	def insert_many(self, items: Iterable) -> int:
+		"""
+		Insert a batch of strings, or replace their values, in parallel across the shards, like Trie.insert_many.
+		:param items: keys, (key, value) pairs or (key, value, weight) triples
+		:return: the number of keys that were not in the trie before
+		"""
+		parts = {}
+		for record in to_records(items):
+			parts.setdefault(self._shard(record[0]), []).append(record)
+		return sum(self._call({shard: ("insert_many", (part,)) for shard, part in parts.items()}).values())
+
+	def search_many(self, keys: Iterable[Key]) -> list[Optional[tuple[Any, Optional[float]]]]:
+		"""
+		Search for a batch of strings in parallel across the shards.
+		The nodes stay in the worker processes, so every string found is answered with the contents of its node.
+		:param keys: the strings to search for
+		:return: list of the (value, weight) pair of every string, None for the strings that are not in the trie;
+			the weight is None unless the trie is weighted
+		"""
+		return self._gather("search_many", keys)
+
+	def get_many(self, keys: Iterable[Key], default: Any = None) -> list[Any]:
+		"""
+		Get the values of a batch of strings in parallel across the shards.
+		:param keys: the strings to look up
+		:param default: value returned for the strings that are not in the trie
+		:return: list of the values, in the order of the strings
+		"""
+		return [found[0] if found is not None else default for found in self.search_many(keys)]
+
+	def contains_many(self, keys: Iterable[Key]) -> list[bool]:
+		"""
+		Check a batch of strings in parallel across the shards.
+		:param keys: the strings to check
+		:return: list telling which strings are in the trie, in the order of the strings
+		"""
+		return self._gather("contains_many", keys)
+
+	def remove_many(self, keys: Iterable[Key]) -> list[bool]:
+		"""
+		Remove a batch of strings in parallel across the shards.
+		:param keys: the strings to remove
+		:return: list telling which strings were removed, in the order of the strings
+		"""
+		return self._gather("remove_many", keys)
+
+	def insert(self, s: Key, value: Any = None, weight: Optional[float] = None):
+		"""
+		Insert a string, or replace the value of an existing one.
+		:param s: string to insert
+		:param value: value stored with the string
+		:param weight: weight of the string in a weighted trie; None keeps the current weight (0 for a new string)
+		"""
+		self.insert_many([(s, value, weight)])
+
+	def remove(self, s: Key) -> bool:
+		"""
+		Remove a string.
+		:param s: string to remove
+		:return: True if the string was removed, False otherwise
+		"""
+		return self.remove_many([s])[0]
+
+	def iter_prefix(self, q: Key, limit: Optional[int] = None) -> Iterator[Key]:
+		"""
+		Iterate over the strings with a given prefix, in lexicographic order.
+		Only the shards whose ranges overlap the prefix are searched, at once,
+		and their sorted answers are concatenated in shard order.
+		:param q: prefix to search for
+		:param limit: maximum number of strings to return, None for no limit
+		:return: iterator of strings with the given prefix
+		"""
+		if limit is not None and limit < 0:
+			raise ValueError(f"limit must be non-negative, got {limit}")
+		q = encode_key(q)
+		shards = self._prefix_shards(q)
+		results = self._call({shard: ("iter_prefix", (q, limit)) for shard in shards})
+		paths = itertools.chain.from_iterable(results[shard] for shard in shards)
+		key_type = self.key_type
+		for count, path in enumerate(paths, 1):
+			if limit is not None and count > limit:
+				return
+			yield decode_key(path, key_type)
+
+	def range_search(self, q: Key) -> set[Key]:
+		"""
+		Search for all strings with a given prefix.
+		:param q: prefix to search for
+		:return: set of strings with the given prefix
+		"""
+		return set(self.iter_prefix(q))
+
+	def __getitem__(self, key: Key) -> Any:
+		value = self.get_many([key], _MISSING)[0]
+		if value is _MISSING:
+			raise KeyError(key)
+		return value
+
+	def __setitem__(self, key: Key, value: Any):
+		self.insert(key, value)
+
+	def __delitem__(self, key: Key):
+		if not self.remove(key):
+			raise KeyError(key)
+
+	def __contains__(self, key: object) -> bool:
+		try:
+			return self.contains_many([key])[0]
+		except TypeError:
+			return False
+
+	def __len__(self) -> int:
+		return sum(self._broadcast("len"))
+
+	def __iter__(self) -> Iterator[Key]:
+		return self.iter_prefix(b"")
+
+	def items(self) -> ItemsView:
+		return _ShardedItemsView(self)
+
+	def values(self) -> ValuesView:
+		return _ShardedValuesView(self)
+
+	def _items(self) -> Iterator[tuple[Key, Any]]:
+		"""
+		Get all (string, value) pairs from every shard at once, in lexicographic order.
+		:return: iterator of the pairs
+		"""
+		key_type = self.key_type
+		for s, value in itertools.chain.from_iterable(self._broadcast("items")):
+			yield decode_key(s, key_type), value
+
+	def clear(self):
+		"""
+		Remove all keys from every shard.
+		"""
+		self._broadcast("clear")
+
+	def close(self):
+		"""
+		Stop the worker processes. The trie cannot be used afterwards.
+		"""
+		if self._connections is None:
+			return
+		for connection in self._connections:
+			connection.send(None)
+			connection.close()
+		for process in self._processes:
+			process.join()
+		self._connections, self._processes = None, []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __del__(self):
+		try:
+			self.close()
+		except Exception:
+			pass
+
+	def __repr__(self) -> str:
+		return f"{type(self).__name__}({self.num_shards} shards)"
+
+
+class _ShardedItemsView(ItemsView):
+	"""
+	Items view that fetches the pairs of all shards in one round trip instead of looking every key up again.
+	"""
+
+	def __iter__(self) -> Iterator[tuple[Key, Any]]:
+		return self._mapping._items()
+
+
+class _ShardedValuesView(ValuesView):
+	"""
+	Values view that fetches the pairs of all shards in one round trip instead of looking every key up again.
+	"""
+
+	def __iter__(self) -> Iterator[Any]:
+		for _, value in self._mapping._items():
+			yield value
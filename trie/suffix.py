@@ -0,0 +1,233 @@
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+from .children import ChildMap
+from .keys import Key, check_key_type, decode_key, encode_key
+from .patricia import PatriciaTrie
+
+
+def suffix_array(text: np.ndarray) -> np.ndarray:
+	"""
+	Sort the suffixes of a text by prefix doubling: after round k, the suffixes are ranked by their first 2^k symbols.
+	Every round is a handful of vectorized sorts, and there are about log2 of the longest repeated substring rounds.
+	:param text: the symbols of the text, as non-negative integers
+	:return: the starting positions of the suffixes in sorted order
+	"""
+	n = len(text)
+	rank = np.unique(text, return_inverse=True)[1].astype(np.int64)
+	sa = np.argsort(rank, kind="stable")
+	k = 1
+	while n and rank[sa[-1]] < n - 1:  # some ranks are still shared
+		second = np.full(n, -1, dtype=np.int64)
+		second[:n - k] = rank[k:]
+		sa = np.lexsort((second, rank))
+		first_sorted, second_sorted = rank[sa], second[sa]
+		new_group = np.empty(n, dtype=bool)
+		new_group[0] = True
+		new_group[1:] = (first_sorted[1:] != first_sorted[:-1]) | (second_sorted[1:] != second_sorted[:-1])
+		rank = np.empty(n, dtype=np.int64)
+		rank[sa] = np.cumsum(new_group) - 1
+		k *= 2
+	return sa
+
+
+def lcp_array(text: np.ndarray, sa: np.ndarray) -> list[int]:
+	"""
+	Compute the longest common prefixes of adjacent sorted suffixes in linear time (Kasai et al.).
+	:param text: the symbols of the text
+	:param sa: the suffix array of the text
+	:return: list whose element r is the length of the common prefix of the suffixes sa[r - 1] and sa[r] (0 for r = 0)
+	"""
+	n = len(sa)
+	symbols, order = text.tolist(), sa.tolist()
+	rank = [0] * n
+	for r, i in enumerate(order):
+		rank[i] = r
+	lcp = [0] * n
+	h = 0
+	for i in range(n):
+		r = rank[i]
+		if r == 0:
+			h = 0
+			continue
+		j = order[r - 1]
+		while i + h < n and j + h < n and symbols[i + h] == symbols[j + h]:
+			h += 1
+		lcp[r] = h
+		if h:
+			h -= 1
+	return lcp
+
+
+class SuffixIndex:
+	"""
+	A generalized suffix tree of a set of keys, for substring search.
+
+	Every suffix of every key is a key of a Patricia trie, whose value lists the occurrences (key index, offset)
+	of that suffix, so the tree is built, searched and updated by the Patricia trie itself.
+	Finding a substring locates it as a prefix in the trie, and every occurrence is then a terminal node below,
+	so lookups cost the length of the substring plus the number of occurrences.
+	Patricia edge labels are read from the key of their node, so every distinct suffix is kept as a bytes object
+	by the leaf it ends at, which takes memory quadratic in the length of every key (small for words).
+	For str keys, only suffixes starting at a code point are indexed, and offsets count code points.
+
+	Attributes:
+		trie: the Patricia trie of the encoded suffixes
+		key_type: the type of the keys returned by queries (str or bytes)
+	"""
+
+	def __init__(
+			self, keys: Iterable[Key] = (), key_type: type = str, child_map: Union[str, type[ChildMap]] = "sorted"
+	):
+		"""
+		Initializes a suffix index of some keys.
+		The keys are indexed from the suffix array and the LCP array of their concatenation, in O(n log^2 n) time
+		for n bytes: the suffix array takes up to log n rounds of prefix doubling with an O(n log n) sort each
+		(fewer rounds when the longest repeated substring is short), then the LCP array and the tree take linear time.
+		:param keys: the keys to index
+		:param key_type: the type of the keys returned by queries, str or bytes; both are accepted as input
+		:param child_map: the child map representation, either a name ("array", "dict", "sorted", "adaptive")
+			or a ChildMap subclass
+		"""
+		self.key_type = check_key_type(key_type)
+		self.trie = PatriciaTrie(child_map=child_map, key_type=bytes)
+		self._keys: list[bytes] = []
+		self._indexes: dict[bytes, int] = {}
+		self._build([key for key in map(encode_key, keys) if self._add_key(key)])
+
+	def _add_key(self, s: bytes) -> bool:
+		"""
+		Register an encoded key.
+		:param s: the encoded key
+		:return: True if the key is new, False otherwise
+		"""
+		if s in self._indexes:
+			return False
+		self._indexes[s] = len(self._keys)
+		self._keys.append(s)
+		return True
+
+	def _suffix_starts(self, s: bytes) -> Iterator[int]:
+		"""
+		Get the offsets of the indexed suffixes of an encoded key.
+		:param s: the encoded key
+		:return: iterator of offsets
+		"""
+		if self.key_type is str:
+			return (i for i, b in enumerate(s) if b & 0xC0 != 0x80)  # not a UTF-8 continuation byte
+		return iter(range(len(s)))
+
+	def _build(self, keys: list[bytes]):
+		"""
+		Index new keys in an empty trie from the suffix array of their concatenation.
+		Key j is followed by the separator j and its bytes are shifted above all separators,
+		so the suffixes of every key sort in byte order and no common prefix crosses the end of a key.
+		The sorted suffixes, with their common prefixes from the LCP array, then fill the trie in a single pass.
+		:param keys: the encoded keys, the first of which has index 0
+		"""
+		if keys:
+			self.trie._load_sorted(self._sorted_suffixes(keys))
+
+	def _sorted_suffixes(self, keys: list[bytes]) -> Iterator[tuple[bytes, list, None, int]]:
+		"""
+		Get the distinct indexed suffixes of some keys in sorted order, as the records of PatriciaTrie._load_sorted.
+		A suffix shared by several keys is yielded once, and its occurrences are added to its list as they are found.
+		:param keys: the encoded keys, the first of which has index 0
+		:return: iterator of (suffix, list of occurrences, None, length of the common prefix with the previous suffix)
+		"""
+		count = len(keys)
+		text = np.concatenate([
+			np.append(np.frombuffer(s, dtype=np.uint8).astype(np.int64) + count, j) for j, s in enumerate(keys)
+		])
+		sa = suffix_array(text)
+		lcp = lcp_array(text, sa)
+		key_of = np.repeat(np.arange(count), [len(s) + 1 for s in keys]).tolist()
+		starts = np.cumsum([0] + [len(s) + 1 for s in keys]).tolist()
+		indexed = set()
+		for j, s in enumerate(keys):
+			indexed.update(starts[j] + i for i in self._suffix_starts(s))
+
+		h, length, occurrences = 0, -1, None
+		for r in range(count, len(sa)):  # the suffixes that start at a separator come first
+			h = min(h, lcp[r])
+			position = int(sa[r])
+			if position not in indexed:
+				continue
+			j = key_of[position]
+			s, i = keys[j], position - starts[j]
+			if h == length == len(s) - i:  # the same suffix as the previous one, in another key
+				occurrences.append((j, i))
+				continue
+			length, occurrences = len(s) - i, [(j, i)]
+			yield s[i:], occurrences, None, h
+			h = length
+
+	def add(self, key: Key):
+		"""
+		Index one more key by inserting its suffixes one by one, in time quadratic in its length.
+		:param key: the key to index
+		"""
+		s = encode_key(key)
+		if not self._add_key(s):
+			return
+		j = len(self._keys) - 1
+		for i in self._suffix_starts(s):
+			node, is_new = self.trie._insert(s[i:])
+			if is_new:
+				node.value = []
+			node.value.append((j, i))
+
+	def _occurrences(self, q: Key) -> Iterator[tuple[int, int]]:
+		"""
+		Get the occurrences of a substring.
+		:param q: the substring
+		:return: iterator of (key index, byte offset) pairs, in no particular order
+		"""
+		located = self.trie._locate(encode_key(q))
+		if located is None:
+			return
+		stack = [located[1]]
+		while stack:
+			node = stack.pop()
+			if node.terminal:
+				yield from node.value
+			stack.extend(node.children.values())
+
+	def substring_search(self, q: Key) -> set[Key]:
+		"""
+		Search for all keys containing a substring.
+		:param q: the substring
+		:return: set of keys containing the substring
+		"""
+		keys, key_type = self._keys, self.key_type
+		if not encode_key(q):  # every key contains the empty string, including the empty key
+			return set(self)
+		return {decode_key(keys[j], key_type) for j in {j for j, _ in self._occurrences(q)}}
+
+	def occurrences(self, q: Key) -> list[tuple[Key, int]]:
+		"""
+		Search for all occurrences of a substring.
+		:param q: the substring
+		:return: list of (key, offset) pairs, ordered by the indexing order of the keys and then by offset
+		"""
+		keys, key_type = self._keys, self.key_type
+		results = []
+		for j, i in sorted(self._occurrences(q)):
+			s = keys[j]
+			offset = len(s[:i].decode("utf-8", "surrogateescape")) if key_type is str else i
+			results.append((decode_key(s, key_type), offset))
+		return results
+
+	def __len__(self) -> int:
+		return len(self._keys)
+
+	def __iter__(self) -> Iterator[Key]:
+		key_type = self.key_type
+		return (decode_key(s, key_type) for s in self._keys)
+
+	def __contains__(self, key: object) -> bool:
+		try:
+			return encode_key(key) in self._indexes
+		except TypeError:
+			return False
@@ -0,0 +1,364 @@
+import os
+import pickle
+import re
+import struct
+import time
+import zlib
+from collections.abc import MutableMapping
+from typing import Any, BinaryIO, Iterator, Optional, Union
+
+from .base import Trie
+from .frozen import load
+from .keys import Key, encode_key
+from .patricia import PatriciaTrie
+
+WAL_MAGIC = b"PATWAL\r\n"
+"""First bytes of every write-ahead log file."""
+
+FSYNC_POLICIES = ("always", "batch", "never")
+"""When the write-ahead log is flushed to stable storage (see DurableTrie)."""
+
+_RECORD_HEADER = struct.Struct("<II")  # length of the payload, CRC-32 of the payload
+_INSERT, _REMOVE, _CLEAR = 0, 1, 2
+_FILE_NAME = re.compile(r"(snapshot|wal)-(\d+)\.(?:bin|log)$")
+
+
+def encode_record(operation: int, s: bytes = b"", value: Any = None, weight: Optional[float] = None) -> bytes:
+	"""
+	Encode a mutation as a write-ahead log record: a header with the length and the checksum of the payload,
+	followed by the pickled payload.
+	:param operation: the operation (insert, remove or clear)
+	:param s: the encoded key
+	:param value: the value of an insert
+	:param weight: the weight of an insert
+	:return: the record
+	"""
+	payload = pickle.dumps((operation, s, value, weight), protocol=pickle.HIGHEST_PROTOCOL)
+	return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_log(path: Union[str, os.PathLike]) -> tuple[list[tuple[int, bytes, Any, Optional[float]]], int]:
+	"""
+	Read the records of a write-ahead log file.
+	Reading stops at the first record that is incomplete or does not match its checksum, which is where
+	a crash interrupted the last write; nothing after it was ever acknowledged as durable.
+	:param path: path of the file
+	:return: list of (operation, encoded key, value, weight) records, and the length of the valid part of the file
+	"""
+	with open(path, "rb") as file:
+		data = file.read()
+	if len(data) < len(WAL_MAGIC):  # the file was being created
+		return [], 0
+	if not data.startswith(WAL_MAGIC):
+		raise ValueError(f"{os.fspath(path)} is not a write-ahead log")
+	records, offset = [], len(WAL_MAGIC)
+	while offset + _RECORD_HEADER.size <= len(data):
+		length, checksum = _RECORD_HEADER.unpack_from(data, offset)
+		start = offset + _RECORD_HEADER.size
+		payload = data[start: start + length]
+		if len(payload) < length or zlib.crc32(payload) != checksum:
+			break
+		records.append(pickle.loads(payload))
+		offset = start + length
+	return records, offset
+
+
+def _write_all(file: BinaryIO, data: bytes):
+	"""
+	Write all bytes to an unbuffered file, which may write only part of them at a time.
+	:param file: the file
+	:param data: the bytes to write
+	"""
+	view = memoryview(data)
+	while view:
+		written = file.write(view)
+		if not written:
+			raise OSError(f"Could not write to {file.name}")
+		view = view[written:]
+
+
+def _fsync_directory(path: Union[str, os.PathLike]):
+	"""
+	Flush the entries of a directory, so that files created, renamed or deleted in it survive a crash.
+	:param path: path of the directory
+	"""
+	if os.name != "posix":  # directories cannot be opened on Windows
+		return
+	descriptor = os.open(path, os.O_RDONLY)
+	try:
+		os.fsync(descriptor)
+	finally:
+		os.close(descriptor)
+
+
+class DurableTrie(MutableMapping):
+	"""
+	A trie whose mutations survive crashes, kept in a directory as a snapshot plus a write-ahead log.
+
+	Every insert or remove is first appended to the log as a checksummed record and only then applied to the trie.
+	When the log is flushed to stable storage depends on the fsync policy:
+		always: after every mutation, which is durable as soon as it returns
+		batch: group commit, once per group_size mutations or group_interval seconds, whichever comes first;
+			a crash of the machine loses at most the last group, but the cost of a flush is shared by the group
+		never: left to the operating system; a crash of the process loses nothing, a crash of the machine may
+	Records are written to the operating system right away under every policy. The interval of the batch policy
+	is checked when a mutation is logged, so an idle trie should call sync to bound the window.
+
+	A checkpoint compacts the log: the whole trie is saved as a new snapshot in the flat format (see Trie.save),
+	a new empty log is started, and the files of the previous generation are deleted. Checkpoints run
+	automatically every checkpoint_every mutations. Opening a directory recovers the trie by loading the latest
+	snapshot and replaying its log, up to the first torn or corrupt record, which is truncated away.
+	Every step of a checkpoint is atomic, so a crash at any point leaves either the old or the new generation.
+
+	Queries go to the trie attribute, which must not be mutated directly. Values must be picklable.
+	The trie is not thread-safe, and a directory must only be opened by one DurableTrie at a time.
+
+	Attributes:
+		directory: the directory holding the snapshot and the log
+		trie: the recovered trie, for queries
+		fsync: the fsync policy ("always", "batch" or "never")
+		group_size: the maximum number of mutations in a group commit
+		group_interval: the maximum age of the first mutation of a group commit, in seconds
+		checkpoint_every: the number of mutations between automatic checkpoints, None to disable them
+		generation: the generation of the current snapshot and log
+	"""
+
+	def __init__(
+			self, directory: Union[str, os.PathLike], trie_class: type[Trie] = PatriciaTrie, fsync: str = "batch",
+			group_size: int = 64, group_interval: float = 0.01, checkpoint_every: Optional[int] = 100_000, **kwargs
+	):
+		"""
+		Opens a durable trie, recovering it from the directory if it holds one.
+		:param directory: the directory holding the snapshot and the log, created if missing
+		:param trie_class: the class of the trie (PrefixTrie, PatriciaTrie or a subclass)
+		:param fsync: the fsync policy, "always", "batch" or "never"
+		:param group_size: the maximum number of mutations in a group commit
+		:param group_interval: the maximum age of the first mutation of a group commit, in seconds
+		:param checkpoint_every: the number of mutations between automatic checkpoints, None to disable them
+		:param kwargs: arguments of the trie constructor, which must be the same every time the directory is opened
+		"""
+		if fsync not in FSYNC_POLICIES:
+			raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of {', '.join(FSYNC_POLICIES)}")
+		if group_size < 1:
+			raise ValueError(f"group_size must be positive, got {group_size}")
+		if checkpoint_every is not None and checkpoint_every < 1:
+			raise ValueError(f"checkpoint_every must be positive, got {checkpoint_every}")
+		self.directory = os.fspath(directory)
+		self.fsync = fsync
+		self.group_size = group_size
+		self.group_interval = group_interval
+		self.checkpoint_every = checkpoint_every
+		self._trie_class = trie_class
+		self._kwargs = kwargs
+		self._file: Optional[BinaryIO] = None
+		self._unsynced = 0  # mutations written since the last flush
+		self._group_start = 0.0  # when the first of them was written
+		self._since_checkpoint = 0
+		os.makedirs(self.directory, exist_ok=True)
+		self._recover()
+
+	def _path(self, kind: str, generation: int) -> str:
+		"""
+		Get the path of a file of a generation.
+		:param kind: "snapshot" or "wal"
+		:param generation: the generation
+		:return: the path
+		"""
+		extension = "bin" if kind == "snapshot" else "log"
+		return os.path.join(self.directory, f"{kind}-{generation:010d}.{extension}")
+
+	def _recover(self):
+		"""
+		Load the latest snapshot, replay its log, truncate a torn tail and delete the files of other generations.
+		"""
+		snapshots = [
+			int(match.group(2)) for match in map(_FILE_NAME.match, os.listdir(self.directory))
+			if match is not None and match.group(1) == "snapshot"
+		]
+		self.generation = max(snapshots, default=0)
+		if snapshots:
+			with load(self._path("snapshot", self.generation), mmap=False) as frozen:
+				self.trie = self._trie_class.from_sorted(frozen._records(), **self._kwargs)
+		else:
+			self.trie = self._trie_class(**self._kwargs)
+
+		path = self._path("wal", self.generation)
+		if os.path.exists(path):
+			records, length = read_log(path)
+			for record in records:
+				self._apply(*record)
+			self._since_checkpoint = len(records)
+			if length < len(WAL_MAGIC):
+				self._file = self._create_log(self.generation)
+			else:
+				self._file = open(path, "r+b", buffering=0)
+				self._file.truncate(length)
+				self._file.seek(length)
+				os.fsync(self._file.fileno())
+		else:
+			self._file = self._create_log(self.generation)
+		self._remove_stale()
+
+	def _create_log(self, generation: int) -> BinaryIO:
+		"""
+		Create the empty log of a generation, durably.
+		:param generation: the generation
+		:return: the log file, open for appending
+		"""
+		file = open(self._path("wal", generation), "wb", buffering=0)
+		_write_all(file, WAL_MAGIC)
+		os.fsync(file.fileno())
+		_fsync_directory(self.directory)
+		return file
+
+	def _remove_stale(self):
+		"""
+		Delete the files of other generations and the leftovers of interrupted checkpoints.
+		"""
+		for name in os.listdir(self.directory):
+			match = _FILE_NAME.match(name)
+			if name.endswith(".tmp") or (match is not None and int(match.group(2)) != self.generation):
+				os.remove(os.path.join(self.directory, name))
+
+	def _apply(self, operation: int, s: bytes, value: Any, weight: Optional[float]):
+		"""
+		Apply a logged mutation to the trie.
+		:param operation: the operation
+		:param s: the encoded key
+		:param value: the value of an insert
+		:param weight: the weight of an insert
+		"""
+		if operation == _INSERT:
+			self.trie.insert(s, value, weight)
+		elif operation == _REMOVE:
+			self.trie.remove(s)
+		else:
+			self.trie.clear()
+
+	def _log(self, record: bytes):
+		"""
+		Append a record to the log and flush it according to the fsync policy.
+		If the record cannot be written entirely, the log is cut back to the end of the previous record,
+		so that later records are not stranded behind a torn one, and the error is raised.
+		:param record: the record
+		"""
+		if self._file is None:
+			raise ValueError(f"{type(self).__name__} is closed")
+		end = self._file.tell()
+		try:
+			_write_all(self._file, record)
+		except OSError:
+			self._file.truncate(end)
+			self._file.seek(end)
+			raise
+		if self._unsynced == 0:
+			self._group_start = time.monotonic()
+		self._unsynced += 1
+		self._since_checkpoint += 1
+		if self.fsync == "always" or (self.fsync == "batch" and (
+				self._unsynced >= self.group_size or time.monotonic() - self._group_start >= self.group_interval
+		)):
+			self.sync()
+
+	def _maybe_checkpoint(self):
+		"""
+		Checkpoint if enough mutations were logged since the last checkpoint.
+		"""
+		if self.checkpoint_every is not None and self._since_checkpoint >= self.checkpoint_every:
+			self.checkpoint()
+
+	def insert(self, s: Key, value: Any = None, weight: Optional[float] = None):
+		"""
+		Insert a string, or replace the value of an existing one, durably according to the fsync policy.
+		:param s: string to insert
+		:param value: value stored with the string, which must be picklable
+		:param weight: weight of the string in a weighted trie; None keeps the current weight (0 for a new string)
+		"""
+		s = encode_key(s)
+		self.trie._check_weight(weight)
+		self._log(encode_record(_INSERT, s, value, weight))
+		self.trie.insert(s, value, weight)
+		self._maybe_checkpoint()
+
+	def remove(self, s: Key) -> bool:
+		"""
+		Remove a string, durably according to the fsync policy.
+		:param s: string to remove
+		:return: True if the string was removed, False otherwise
+		"""
+		s = encode_key(s)
+		if s not in self.trie:  # nothing to log
+			return False
+		self._log(encode_record(_REMOVE, s))
+		self.trie.remove(s)
+		self._maybe_checkpoint()
+		return True
+
+	def clear(self):
+		"""
+		Remove all keys, with a single log record.
+		"""
+		self._log(encode_record(_CLEAR))
+		self.trie.clear()
+		self._maybe_checkpoint()
+
+	def sync(self):
+		"""
+		Flush the log to stable storage, making every mutation so far durable.
+		"""
+		if self._file is not None and self._unsynced:
+			os.fsync(self._file.fileno())
+			self._unsynced = 0
+
+	def checkpoint(self):
+		"""
+		Save the trie as a new snapshot, start a new empty log and delete the previous generation.
+		"""
+		if self._file is None:
+			raise ValueError(f"{type(self).__name__} is closed")
+		self.sync()
+		generation = self.generation + 1
+		self.trie.save(self._path("snapshot", generation))  # written atomically
+		file = self._create_log(generation)  # also makes the rename of the snapshot durable
+		self._file.close()
+		self._file, self.generation = file, generation
+		self._since_checkpoint = 0
+		self._remove_stale()
+		_fsync_directory(self.directory)
+
+	def close(self):
+		"""
+		Flush the log and close it. Queries on the trie attribute still work, mutations do not.
+		"""
+		if self._file is not None:
+			self.sync()
+			self._file.close()
+			self._file = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __getitem__(self, key: Key) -> Any:
+		return self.trie[key]
+
+	def __setitem__(self, key: Key, value: Any):
+		self.insert(key, value)
+
+	def __delitem__(self, key: Key):
+		if not self.remove(key):
+			raise KeyError(key)
+
+	def __contains__(self, key: object) -> bool:
+		return key in self.trie
+
+	def __len__(self) -> int:
+		return len(self.trie)
+
+	def __iter__(self) -> Iterator[Key]:
+		return iter(self.trie)
+
+	def __repr__(self) -> str:
+		return f"{type(self).__name__}({self.directory!r}, {len(self)} keys, generation {self.generation})"
@@ -0,0 +1,301 @@
+import heapq
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+Edges = Callable[[Any], list[tuple[bytes, Any]]]
+"""Get the (edge label, child) pairs of a node, in ascending order of the labels."""
+
+_UNBOUNDED, _BOUNDED, _EMIT = 0, 1, 2
+
+NO_WEIGHT = float("-inf")
+"""Maximum weight of a subtree without any keys."""
+
+
+def ordered_walk(
+		path: bytes, node: Any, edges: Edges, is_terminal: Callable[[Any], bool],
+		after: Optional[bytes] = None, reverse: bool = False
+) -> Iterator[tuple[bytes, Any]]:
+	"""
+	Walk the subtree of a node depth-first, lazily, in lexicographic order of the keys.
+	Subtrees that lie entirely on the wrong side of the cursor are skipped without being visited.
+	The walk only needs the edges of the nodes, so it works for any node representation.
+	:param path: the encoded path from the root to the node
+	:param node: the node to start from
+	:param edges: function returning the (edge label, child) pairs of a node in ascending order
+	:param is_terminal: function telling whether a key ends at a node
+	:param after: encoded cursor; only keys after it (before it if reverse) are returned
+	:param reverse: walk in descending instead of ascending order
+	:return: iterator of (encoded key, terminal node) pairs
+	"""
+	# Entries are (path, node, state), where state is _UNBOUNDED, _BOUNDED (subtree may cross the cursor)
+	# or _EMIT (reverse walks emit the key of a node after the keys of its descendants)
+	stack = [(path, node, _UNBOUNDED if after is None else _BOUNDED)]
+	while stack:
+		path, node, state = stack.pop()
+		if state == _EMIT:
+			yield path, node
+			continue
+		emit_self = is_terminal(node)
+		if state == _BOUNDED:
+			if after.startswith(path):  # the subtree contains the cursor
+				emit_self = emit_self and reverse and path != after
+				if reverse and path == after:  # all descendants are after the cursor
+					state = None
+			elif (path < after) != reverse:  # the subtree is entirely on the skipped side
+				emit_self, state = False, None
+			else:  # the subtree is entirely on the returned side
+				state = _UNBOUNDED
+		if not reverse and emit_self:
+			yield path, node
+		if reverse and emit_self:
+			stack.append((path, node, _EMIT))
+		if state is None:
+			continue
+		children = [(path + label, child, state) for label, child in edges(node)]
+		stack.extend(children if reverse else children[::-1])
+
+
+def best_first(
+		path: bytes, node: Any, edges: Edges, is_terminal: Callable[[Any], bool],
+		weight: Callable[[Any], float], max_weight: Callable[[Any], float], k: int
+) -> list[bytes]:
+	"""
+	Get the k keys with the highest weights in the subtree of a node.
+	The search is best-first over the cached maximum weights of the subtrees, so it only expands
+	the nodes on the paths to the returned keys and their siblings.
+	Keys with equal weights are returned in lexicographic order.
+	:param path: the encoded path from the root to the node
+	:param node: the node to start from
+	:param edges: function returning the (edge label, child) pairs of a node in ascending order
+	:param is_terminal: function telling whether a key ends at a node
+	:param weight: function returning the weight of the key ending at a terminal node
+	:param max_weight: function returning the maximum weight in the subtree of a node
+	:param k: number of keys to return
+	:return: list of at most k encoded keys, by descending weight
+	"""
+	results = []
+	# Entries are (-weight, path, is_subtree, node); a key is emitted once no subtree can beat it
+	heap = [(-max_weight(node), path, True, node)]
+	while heap and len(results) < k:
+		negative_weight, path, is_subtree, node = heapq.heappop(heap)
+		if not is_subtree:
+			results.append(path)
+			continue
+		if negative_weight == -NO_WEIGHT:  # no keys left
+			break
+		if is_terminal(node):
+			heapq.heappush(heap, (-weight(node), path, False, node))
+		for label, child in edges(node):
+			heapq.heappush(heap, (-max_weight(child), path + label, True, child))
+	return results
+
+
+def split_utf8(data: bytes) -> tuple[bytes, bytes]:
+	"""
+	Split UTF-8 data before a trailing incomplete character.
+	:param data: the data
+	:return: the data up to the last complete character, and the bytes of the incomplete character
+	"""
+	n = len(data)
+	i = n - 1
+	while i >= 0 and n - i <= 4 and data[i] & 0xC0 == 0x80:  # continuation bytes
+		i -= 1
+	if i < 0 or n - i > 4:
+		return data, b""
+	lead = data[i]
+	size = 1 if lead < 0xC0 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+	if i + size > n:
+		return data[:i], data[i:]
+	return data, b""
+
+
+def fuzzy_walk(
+		path: bytes, node: Any, edges: Edges, is_terminal: Callable[[Any], bool],
+		query: Sequence[int], max_distance: int, prefix: bool = False, code_points: bool = True
+) -> Iterator[tuple[bytes, Any, int]]:
+	"""
+	Walk the keys within a Levenshtein distance of a query, depth-first, in lexicographic order.
+	A row of the edit distance table is carried along every path and advanced one character at a time,
+	a whole edge label at once, and subtrees are pruned as soon as no cell of the row is within the distance,
+	since the minimum of the row never decreases along a path.
+	:param path: the encoded path from the root to the node
+	:param node: the node to start from
+	:param edges: function returning the (edge label, child) pairs of a node in ascending order
+	:param is_terminal: function telling whether a key ends at a node
+	:param query: the characters of the query (code points, or bytes)
+	:param max_distance: the maximum edit distance
+	:param prefix: match the query against the prefixes of the keys instead of the whole keys
+	:param code_points: compare code points of the UTF-8 keys instead of bytes
+	:return: iterator of (encoded key, terminal node, distance) triples; with prefix, the distance is
+		the smallest distance between the query and a prefix of the key
+	"""
+	n = len(query)
+	# Entries are (path, node, row, bytes of an incomplete character, best prefix distance so far);
+	# a row of None marks a subtree whose keys all match with the best distance
+	row = list(range(n + 1))
+	stack = [(path, node, row, b"", row[n])]
+	while stack:
+		path, node, row, pending, best = stack.pop()
+		if row is None:
+			for key, terminal_node in ordered_walk(path, node, edges, is_terminal):
+				yield key, terminal_node, best
+			continue
+		if is_terminal(node):
+			distance = _advance(query, row, characters(pending, code_points))[n] if pending else row[n]
+			if prefix:
+				distance = min(distance, best)
+			if distance <= max_distance:
+				yield path, node, distance
+		children = []
+		for label, child in edges(node):
+			data = pending + label
+			rest = b""
+			if code_points:
+				data, rest = split_utf8(data)
+			child_row, child_best = row, best
+			for unit in characters(data, code_points):
+				child_row = _advance(query, child_row, (unit,))
+				if child_row[n] < child_best:
+					child_best = child_row[n]
+				if min(child_row) > max_distance and (not prefix or child_best > max_distance):
+					child_row = None
+					break
+			else:
+				if prefix and child_best <= max_distance and min(child_row) >= child_best:
+					children.append((path + label, child, None, b"", child_best))  # the distance cannot improve
+				else:
+					children.append((path + label, child, child_row, rest, child_best))
+		stack.extend(reversed(children))
+
+
+def characters(data: bytes, code_points: bool) -> Sequence[int]:
+	"""
+	Get the characters compared by the edit distance.
+	:param data: encoded characters
+	:param code_points: decode the data into code points instead of comparing bytes
+	:return: the characters
+	"""
+	if code_points:
+		return [ord(c) for c in data.decode("utf-8", "surrogateescape")]
+	return data
+
+
+def _advance(query: Sequence[int], row: list[int], units: Iterable[int]) -> list[int]:
+	"""
+	Advance a row of the edit distance table by some characters of the key.
+	:param query: the characters of the query
+	:param row: the current row, whose cell j is the distance between query[:j] and the key so far
+	:param units: the next characters of the key
+	:return: the new row
+	"""
+	for unit in units:
+		previous = row
+		row = [previous[0] + 1]
+		for j, q in enumerate(query, 1):
+			row.append(min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (q != unit)))
+	return row
+
+
+def automaton_walk(
+		path: bytes, node: Any, edges: Edges, is_terminal: Callable[[Any], bool], automaton, code_points: bool = True
+) -> Iterator[tuple[bytes, Any]]:
+	"""
+	Walk the keys accepted by an automaton, depth-first, in lexicographic order.
+	The automaton reads every edge label as it is walked, and subtrees are pruned as soon as it reaches
+	the dead state, so only the nodes on paths it can still accept are visited.
+	:param path: the encoded path from the root to the node
+	:param node: the node to start from
+	:param edges: function returning the (edge label, child) pairs of a node in ascending order
+	:param is_terminal: function telling whether a key ends at a node
+	:param automaton: the automaton (see trie.pattern.Automaton)
+	:param code_points: read code points of the UTF-8 keys instead of bytes
+	:return: iterator of (encoded key, terminal node) pairs
+	"""
+	step, dead = automaton.step, automaton.DEAD
+	# Entries are (path, node, state, bytes of an incomplete character)
+	stack = [(path, node, automaton.start, b"")]
+	while stack:
+		path, node, state, pending = stack.pop()
+		if is_terminal(node):
+			final_state = state
+			for c in characters(pending, code_points):
+				final_state = step(final_state, c)
+			if automaton.accepts(final_state):
+				yield path, node
+		children = []
+		for label, child in edges(node):
+			data = pending + label
+			rest = b""
+			if code_points:
+				data, rest = split_utf8(data)
+			child_state = state
+			for c in characters(data, code_points):
+				child_state = step(child_state, c)
+				if child_state == dead:
+					break
+			else:
+				children.append((path + label, child, child_state, rest))
+		stack.extend(reversed(children))
+
+
+def rank_walk(
+		node: Any, edges: Edges, is_terminal: Callable[[Any], bool], count: Callable[[Any], int], q: bytes
+) -> int:
+	"""
+	Count the keys lexicographically smaller than a string, in a single walk down its path.
+	At every node on the path, the keys ending at the node and the subtrees of the children branching off
+	before the path are all smaller, and their sizes are read from the cached subtree counts.
+	:param node: the root of the subtree
+	:param edges: function returning the (edge label, child) pairs of a node in ascending order
+	:param is_terminal: function telling whether a key ends at a node
+	:param count: function returning the number of keys in the subtree of a node
+	:param q: the encoded string
+	:return: the number of keys smaller than the string
+	"""
+	rank, p, l = 0, 0, len(q)
+	while p < l:
+		if is_terminal(node):  # a proper prefix of the string
+			rank += 1
+		b = q[p]
+		for label, child in edges(node):
+			if label[0] < b:
+				rank += count(child)
+				continue
+			if label[0] > b:
+				return rank
+			segment = q[p: p + len(label)]
+			if segment == label:
+				p, node = p + len(label), child
+				break
+			# the string ends inside the edge or leaves it, before or after the whole subtree
+			return rank if segment < label else rank + count(child)
+		else:
+			return rank
+	return rank
+
+
+def select_walk(
+		node: Any, edges: Edges, is_terminal: Callable[[Any], bool], count: Callable[[Any], int], i: int
+) -> bytes:
+	"""
+	Get the key with a given rank, in a single walk down its path guided by the cached subtree counts.
+	:param node: the root of the subtree
+	:param edges: function returning the (edge label, child) pairs of a node in ascending order
+	:param is_terminal: function telling whether a key ends at a node
+	:param count: function returning the number of keys in the subtree of a node
+	:param i: the rank, between 0 and the number of keys in the subtree (excluded)
+	:return: the encoded key
+	"""
+	path = b""
+	while True:
+		if is_terminal(node):
+			if i == 0:
+				return path
+			i -= 1
+		for label, child in edges(node):
+			child_count = count(child)
+			if i < child_count:
+				path, node = path + label, child
+				break
+			i -= child_count
+		else:
+			raise IndexError("rank out of range")